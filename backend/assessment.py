@@ -0,0 +1,269 @@
+"""Full risk assessment assembled from the catastrophe model.
+
+``build_full_assessment`` runs ``catmodel.run_cat_model`` against a
+property's insured value and state and shapes the result the way the
+Full Assessment page renders it. The page splits each cat-modeling
+``details`` string on ``","``, so it always carries exactly two PMLs.
+
+Assessments are cached by ``assessment_key``, a hash of everything the
+result depends on: the property document, the exposure fields the model
+reads, the model version and the simulation parameters. The key doubles as
+the response's ETag. Any change to the inputs produces a new key, so stale
+results are never served; ``AssessmentCache.invalidate`` only reclaims
+their space. The server invalidates a property's entries when the change
+stream shows its property or exposure documents changing, and everything
+after a seed; without change streams, writes by other processes leave
+unreachable entries until the LRU or the persisted TTL drops them.
+"""
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import Binary
+
+from cache import SizedLRUCache
+from catmodel import CAT_MODEL_VERSION, DEFAULT_YEARS, PERILS, model_seed, risk_score, run_cat_model, severity
+from money import format_compact, format_millions, parse_money
+
+# Exposures whose insurable value is physical property the perils can damage
+PROPERTY_LOBS = ("Property", "Package", "Inland Marine")
+
+PERIL_LABELS = {
+    "earthquake": "Earthquake Risk",
+    "flood": "Flood Risk",
+    "hurricane": "Hurricane Risk",
+    "wildfire": "Wildfire Risk",
+}
+
+PERIL_DESCRIPTIONS = {
+    "earthquake": {
+        "high": "Significant seismic exposure for this location. Modeled ground shaking produces material structural losses at long return periods.",
+        "moderate": "Moderate seismic activity possible. Building age and construction type influence vulnerability. Regular structural assessments recommended.",
+        "low": "Low modeled seismic activity for this location. Structural losses are unlikely outside extreme events.",
+    },
+    "flood": {
+        "high": "High flood risk identified. Modeled event frequency and severity indicate repeated inundation losses.",
+        "moderate": "Moderate flood exposure. Heavy rainfall and riverine events can cause localized damage.",
+        "low": "Low modeled flood frequency for this location. Drainage and elevation appear adequate.",
+    },
+    "hurricane": {
+        "high": "Elevated hurricane exposure based on regional landfall frequency. Potential surge risk, vulnerable openings.",
+        "moderate": "Moderate tropical storm exposure. Wind damage possible in severe seasons.",
+        "low": "Little or no modeled hurricane exposure for this location.",
+    },
+    "wildfire": {
+        "high": "High wildfire exposure. Regional fire frequency and fuel loads drive significant modeled losses.",
+        "moderate": "Moderate wildfire exposure. Vegetation management and suppression systems reduce vulnerability.",
+        "low": "Low to urban location, adequate fire protection. Limited modeled wildfire activity.",
+    },
+}
+
+PERIL_RECOMMENDATIONS = {
+    "earthquake": "Seismic retrofitting, Foundation reinforcement",
+    "flood": "Implement flood barriers, Improve drainage, Consider relocation",
+    "hurricane": "Impact-resistant windows, Storm shutters, Secure doors",
+    "wildfire": "Maintain defensible space, Fire-resistant landscaping",
+}
+
+PERIL_MITIGATIONS = {
+    "earthquake": "Consider seismic retrofitting to reduce earthquake vulnerability exposure levels",
+    "flood": "Implement comprehensive flood mitigation measures including elevation and drainage improvements",
+    "hurricane": "Upgrade hurricane resistance with impact-resistant windows and reinforced doors",
+    "wildfire": "Create defensible space and use fire-resistant materials and landscaping",
+}
+
+# Exposure fields the model reads; only these take part in the cache key
+EXPOSURE_INPUT_PROJECTION = {"_id": 0, "lob": 1, "totalInsurableValue2025": 1, "totalInsurableValue2025Cents": 1}
+
+# Return periods shown beside the 100-year headline figure
+DETAIL_PERIODS = (250, 500)
+
+
+def insured_value_cents(exposures: List[dict]) -> int:
+    """Total 2025 insurable value, preferring property-type lines of business"""
+    property_exposures = [doc for doc in exposures if doc.get("lob") in PROPERTY_LOBS]
+    total = 0
+    for doc in property_exposures or exposures:
+        # Exposures written before the typed fields only carry the display string
+        cents = doc.get("totalInsurableValue2025Cents")
+        if cents is None:
+            cents = parse_money(doc.get("totalInsurableValue2025"))
+        total += cents or 0
+    return total
+
+
+def format_coordinates(location: Optional[dict]) -> str:
+    """GeoJSON point as the "lat,lng" string the page splits"""
+    if not location:
+        return "N/A,N/A"
+    lng, lat = location["coordinates"]
+    return f"{lat:.4f},{lng:.4f}"
+
+
+def build_full_assessment(
+    property_data: dict,
+    exposures: List[dict],
+    years: int = DEFAULT_YEARS,
+    seed: Optional[int] = None
+) -> dict:
+    """Run the cat model for one property and build the assessment document.
+
+    Runs the simulation synchronously; call it off the event loop.
+    """
+    property_id = property_data["id"]
+    tiv_cents = insured_value_cents(exposures)
+    if seed is None:
+        seed = model_seed(property_id)
+    results = run_cat_model(tiv_cents, property_data.get("state"), years=years, seed=seed)
+
+    components = []
+    modeling = []
+    for peril in PERILS:
+        result = results[peril]
+        score = risk_score(result["lossCost"])
+        level = severity(score)
+        components.append({
+            "name": PERIL_LABELS[peril],
+            "score": score,
+            "severity": level,
+            "description": PERIL_DESCRIPTIONS[peril][level],
+            "recommendation": PERIL_RECOMMENDATIONS[peril]
+        })
+        pml_cents = {period: int(round(value)) for period, value in result["pml"].items()}
+        modeling.append({
+            "type": PERIL_LABELS[peril],
+            "amount": format_compact(pml_cents[100]),
+            "details": ", ".join(f"PML ({period}yr): {format_compact(pml_cents[period])}" for period in DETAIL_PERIODS),
+            "aalCents": int(round(result["aal"])),
+            "pmlCents": {str(period): cents for period, cents in pml_cents.items()}
+        })
+
+    total_loss_cost = sum(result["lossCost"] for result in results.values())
+    overall = risk_score(total_loss_cost)
+    overall_level = severity(overall)
+    ranked = sorted(components, key=lambda c: c["score"], reverse=True)
+    drivers = [c for c in ranked if c["severity"] != "low"] or ranked[:1]
+    driver_names = " and ".join(c["name"].replace(" Risk", "").lower() for c in drivers[:2])
+    top_peril = next(peril for peril in PERILS if PERIL_LABELS[peril] == ranked[0]["name"])
+
+    mitigations = [
+        PERIL_MITIGATIONS[peril] for peril in sorted(PERILS, key=lambda p: results[p]["lossCost"], reverse=True)
+        if severity(risk_score(results[peril]["lossCost"])) != "low"
+    ]
+    mitigations.append("Annual risk assessment and insurance coverage review")
+
+    return {
+        "propertyId": property_id,
+        "propertyName": property_data.get("propertyName", property_data.get("customerName")),
+        "overallRiskScore": overall,
+        "riskAnalysisSummary": {
+            "moderateRisk": (
+                f"This property has been classified as {overall_level.upper()} RISK based on "
+                f"{years:,} years of simulated catastrophe losses. Modeled average annual loss is "
+                f"{format_compact(int(round(sum(r['aal'] for r in results.values()))))} against "
+                f"{format_millions(tiv_cents)} insured, with {driver_names} risk being the primary concerns."
+            ),
+            "recommendation": PERIL_MITIGATIONS[top_peril] + "."
+        },
+        "riskComponents": components,
+        "catastrophicRiskModeling": modeling,
+        "locationIntelligence": {
+            "address": property_data.get("propertyName", "N/A"),
+            "city": property_data.get("state", "N/A"),
+            "coordinates": format_coordinates(property_data.get("location")),
+            "buildingType": property_data.get("operation", "N/A"),
+            "yearBuilt": property_data.get("yearBuilt", "N/A"),
+            "constructionType": property_data.get("constructionType", "N/A")
+        },
+        "concentrationAnalysis": {
+            "totalInsuredValue": format_millions(tiv_cents),
+            "totalInsuredValueCents": tiv_cents,
+            "businessType": property_data.get("operation", "N/A"),
+            "sicCode": property_data.get("sicCode", "N/A"),
+            "constructionType": property_data.get("constructionType", "N/A")
+        },
+        "mitigationRecommendations": mitigations,
+        "model": {"years": years, "seed": str(seed)}
+    }
+
+
+def assessment_key(property_data: dict, exposures: List[dict], years: int, seed: Optional[int]) -> str:
+    """Hex digest identifying an assessment's inputs"""
+    inputs = {
+        "version": CAT_MODEL_VERSION,
+        "property": property_data,
+        "exposures": sorted(exposures, key=lambda doc: (doc.get("lob") or "", json.dumps(doc, sort_keys=True, default=str))),
+        "years": years,
+        "seed": seed,
+    }
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class AssessmentCache:
+    """Serialized assessments by content key.
+
+    Entries live in a byte-bounded in-process LRU and, when ``collection``
+    is given, in MongoDB so they survive restarts. Concurrent requests for
+    the same key share one computation, which runs in its own task so that
+    one cancelled request does not fail the others.
+    """
+
+    def __init__(self, max_bytes: int, collection=None):
+        self.memory = SizedLRUCache(max_bytes)
+        self.collection = collection
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    async def get(self, property_id: str, key: str) -> Optional[bytes]:
+        body = self.memory.get((property_id, key))
+        if body is None and self.collection is not None:
+            doc = await self.collection.find_one({"_id": key}, {"body": 1})
+            if doc is not None:
+                body = bytes(doc["body"])
+                self.memory.set((property_id, key), body)
+        return body
+
+    async def set(self, property_id: str, key: str, body: bytes) -> None:
+        self.memory.set((property_id, key), body)
+        if self.collection is not None:
+            await self.collection.replace_one(
+                {"_id": key},
+                {"propertyId": property_id, "body": Binary(body), "createdAt": datetime.now(timezone.utc)},
+                upsert=True
+            )
+
+    async def get_or_compute(self, property_id: str, key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        body = await self.get(property_id, key)
+        if body is not None:
+            return body
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(property_id, key, compute))
+            self._pending[key] = task
+            task.add_done_callback(partial(self._finished, key))
+        # A waiter that is cancelled, e.g. by its client disconnecting, leaves the task running
+        return await asyncio.shield(task)
+
+    async def _compute(self, property_id: str, key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        body = await compute()
+        await self.set(property_id, key, body)
+        return body
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        # Waiters re-raise a failure; mark it retrieved so one nobody awaited is not logged
+        if not task.cancelled():
+            task.exception()
+
+    async def invalidate(self, property_id: Optional[str] = None) -> None:
+        """Drop cached assessments for one property, or all of them"""
+        if property_id is None:
+            self.memory.clear()
+        else:
+            self.memory.evict(lambda cache_key: cache_key[0] == property_id)
+        if self.collection is not None:
+            await self.collection.delete_many({} if property_id is None else {"propertyId": property_id})
@@ -0,0 +1,128 @@
+"""Password hashing and signed access tokens.
+
+Passwords are bcrypt hashes with cost ``BCRYPT_ROUNDS``. Hashing and
+verification run on a dedicated pool of ``PASSWORD_HASH_WORKERS`` threads
+(bcrypt releases the GIL), so a burst of logins queues there instead of
+stalling the event loop.
+
+Tokens are HS256 JWTs that carry the user fields handlers need, so an
+authenticated request is verified without reading ``users``. Logging out
+records the token's ``jti`` in ``revoked_tokens``; lookups of that
+collection are cached in-process for ``REVOCATION_CACHE_SECONDS``.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+import bcrypt
+import jwt
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+JWT_ALGORITHM = "HS256"
+TOKEN_TTL_SECONDS = int(os.environ.get('TOKEN_TTL_SECONDS', str(12 * 60 * 60)))
+REVOCATION_CACHE_SECONDS = float(os.environ.get('REVOCATION_CACHE_SECONDS', '60'))
+
+JWT_SECRET = os.environ.get('JWT_SECRET')
+if not JWT_SECRET:
+    JWT_SECRET = secrets.token_urlsafe(32)
+    logger.warning("JWT_SECRET is not set; tokens will not survive a restart or be shared across workers")
+
+USER_CLAIMS = ("id", "username", "fullName", "role", "avatar")
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+revocation_cache = TTLCache(maxsize=10000, ttl=REVOCATION_CACHE_SECONDS)
+
+
+async def _run_hashing(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, func, *args)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def _check(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+def is_password_hash(stored: str) -> bool:
+    return stored.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hashing(_hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+    """Check a password against its stored value.
+
+    Returns ``(valid, needs_rehash)``; legacy plaintext records and hashes
+    made with a different cost factor need rehashing after a valid login.
+    """
+    if not stored:
+        return False, False
+    if not is_password_hash(stored):
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    valid = await _run_hashing(_check, password, stored)
+    return valid, valid and int(stored.split("$")[2]) != BCRYPT_ROUNDS
+
+
+def shutdown_hashing() -> None:
+    _hash_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_token(user: dict) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": user["id"],
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + timedelta(seconds=TOKEN_TTL_SECONDS),
+    }
+    claims.update({field: user.get(field) for field in USER_CLAIMS if field != "id"})
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Return the verified claims, or ``None`` for a bad or expired token"""
+    try:
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={"require": ["exp", "sub", "jti"]})
+    except jwt.PyJWTError:
+        return None
+
+
+def user_from_claims(claims: dict) -> dict:
+    user = {field: claims.get(field) for field in USER_CLAIMS if field != "id"}
+    user["id"] = claims["sub"]
+    return user
+
+
+async def is_revoked(revoked_tokens, jti: str) -> bool:
+    revoked = revocation_cache.get(jti)
+    if revoked is None:
+        revoked = await revoked_tokens.find_one({"jti": jti}, {"_id": 1}) is not None
+        revocation_cache.set(jti, revoked)
+    return revoked
+
+
+async def revoke(revoked_tokens, claims: dict) -> None:
+    expires_at = datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+    await revoked_tokens.update_one(
+        {"jti": claims["jti"]},
+        {"$set": {"jti": claims["jti"], "userId": claims["sub"], "expiresAt": expires_at}},
+        upsert=True
+    )
+    revocation_cache.set(claims["jti"], True)
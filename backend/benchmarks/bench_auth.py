@@ -0,0 +1,77 @@
+"""Authenticated request throughput: signed tokens vs the legacy users lookup.
+
+Usage (from backend/, with MONGO_URL and DB_NAME pointing at a scratch db):
+    python benchmarks/bench_auth.py --requests 5000 --concurrency 50
+
+Both paths are driven in-process through the ASGI app. The legacy path is
+reproduced on a benchmark-only route that resolves the user with
+``db.users.find_one({"id": token})`` as get_current_user used to.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+from auth import create_token  # noqa: E402
+
+legacy_router = APIRouter(prefix="/bench")
+
+
+async def legacy_current_user(credentials: HTTPAuthorizationCredentials = Depends(server.security)):
+    if not credentials:
+        return None
+    return await server.db.users.find_one({"id": credentials.credentials}, {"_id": 0})
+
+
+@legacy_router.get("/legacy-me")
+async def legacy_me(user=Depends(legacy_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return {"id": user["id"], "username": user["username"], "fullName": user["fullName"], "role": user["role"]}
+
+
+server.app.include_router(legacy_router)
+
+
+async def drive(client, path, token, total, concurrency):
+    headers = {"Authorization": f"Bearer {token}"}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def main(args):
+    user = {"id": str(uuid.uuid4()), "username": f"bench-{uuid.uuid4().hex[:6]}", "password": "x",
+            "fullName": "Bench User", "role": "UWR_B", "avatar": None}
+    await server.db.users.insert_one(dict(user))
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            legacy = await drive(client, "/bench/legacy-me", user["id"], args.requests, args.concurrency)
+            signed = await drive(client, "/api/auth/me", create_token(user), args.requests, args.concurrency)
+        print(f"legacy users lookup: {legacy:,.0f} req/s")
+        print(f"signed token:        {signed:,.0f} req/s ({signed / legacy:.1f}x)")
+    finally:
+        await server.db.users.delete_one({"id": user["id"]})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
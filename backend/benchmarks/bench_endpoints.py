@@ -0,0 +1,344 @@
+"""Throughput and latency percentiles for every /api route, with a regression gate.
+
+Usage (from backend/, with MONGO_URL and DB_NAME pointing at a scratch db):
+    python benchmarks/bench_endpoints.py --proposals 5000 --properties 1000 --save baseline.json
+    python benchmarks/bench_endpoints.py --proposals 5000 --properties 1000 --baseline baseline.json
+
+``--memory`` runs against an in-memory mongomock stand-in instead (needs
+``mongomock-motor``), which is useful for catching gross regressions in
+handler code but says little about query performance.
+
+The database is reseeded through /api/seed, so never point this at real
+data. Each route is then driven in-process through the ASGI app by
+``--concurrency`` workers for ``--requests`` requests after a short warm-up.
+Routes are selected with ``--routes`` (a regular expression matched against
+names like ``GET /api/proposals/{proposal_id}``).
+
+With ``--baseline`` the run exits non-zero when a route's p95 latency grows,
+or its throughput drops, by more than ``--threshold``. Latency changes under
+``--min-delta-ms`` are ignored as noise. Baselines are only comparable
+between runs on the same machine with the same data sizes.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import re
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi.routing import APIRoute
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+from auth import create_token  # noqa: E402
+from synthetic import PROPOSAL_STATUSES  # noqa: E402
+
+# Routes driven only during setup, or not at all, and why
+EXCLUDED = {
+    "POST /api/seed": "reseeds the database; used for setup",
+    "POST /api/proposals/reindex-search": "rewrites every proposal",
+    "POST /api/repricing/jobs": "starts a portfolio-wide background job; one runs during setup",
+    "GET /api/events": "long-lived event stream",
+}
+
+SAMPLE_CSV = b"Location Address,City,State,Zip,Building Value,Contents,TIV,Construction,Year Built\n" + \
+    b"1 Main St,Austin,TX,78701,1000000,250000,1250000,Frame,1998\n" * 20
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def use_memory_db():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("--memory needs mongomock-motor: pip install mongomock-motor")
+    server.client = AsyncMongoMockClient()
+    server.db = server.client["bench"]
+    # mongomock has no change streams
+    server.EVENTS_CHANGE_STREAMS = False
+    if server.assessment_cache.collection is not None:
+        server.assessment_cache.collection = server.db.assessment_cache
+
+
+def upload(name):
+    return {"files": {"file": (name, SAMPLE_CSV, "text/csv")}}
+
+
+def proposal_body(i):
+    return {
+        "title": f"Bench Tower {i}", "client": "Bench Holdings", "location": "Austin, TX",
+        "priority": "medium", "status": "to_do", "clientId": f"BENCH-{i}",
+        "firstNameInsured": "Bench", "businessType": "Office", "totalInsuredValue": "$12.5M",
+        "website": "https://example.com", "effectiveDate": "2026-01-01", "expirationDate": "2027-01-01"
+    }
+
+
+def scenarios(fx):
+    """(name, request factory) per route; a factory maps a request number to httpx arguments"""
+    props = fx["properties"]
+    prop = lambda i: props[i % len(props)]  # noqa: E731
+    lob = lambda i: prop(i)["lobs"][i % len(prop(i)["lobs"])]  # noqa: E731
+    proposal = lambda i: fx["proposals"][i % len(fx["proposals"])]  # noqa: E731
+    auth = {"Authorization": f"Bearer {fx['token']}"}
+    statuses = [status for status, _ in PROPOSAL_STATUSES]
+    searches = ["austin", "marriot", "medical center", "tampa resort", "horizn"]
+    doomed_proposals = iter(fx["doomed_proposals"])
+    doomed_documents = iter(fx["doomed_documents"])
+
+    return [
+        ("GET /api/", lambda i: {}),
+        ("POST /api/auth/login", lambda i: {"json": {"username": "LARA", "password": "password123", "role": "UWR_B"}}),
+        ("GET /api/auth/me", lambda i: {"headers": auth}),
+        ("POST /api/auth/logout", lambda i: {"headers": {"Authorization": f"Bearer {create_token(fx['user'])}"}}),
+        ("GET /api/proposals", lambda i: {"params": {"limit": 50}}),
+        ("GET /api/proposals?status", lambda i: {"params": {"status": statuses[i % len(statuses)], "limit": 50}}),
+        ("GET /api/proposals?search", lambda i: {"params": {"search": searches[i % len(searches)], "limit": 20}}),
+        ("GET /api/proposals/export", lambda i: {"params": {"format": ["ndjson", "csv"][i % 2]}}),
+        ("GET /api/proposals/{proposal_id}", lambda i: {"path": {"proposal_id": proposal(i)}}),
+        ("POST /api/proposals", lambda i: {"json": proposal_body(i), "headers": auth}),
+        ("PUT /api/proposals/{proposal_id}", lambda i: {
+            "path": {"proposal_id": proposal(i)}, "json": {"priority": ["low", "medium", "high"][i % 3]}
+        }),
+        ("POST /api/proposals/bulk", lambda i: {"headers": auth, "json": {"operations": [
+            {"op": "update", "id": proposal(i * 100 + k), "changes": {"priority": ["low", "medium", "high"][i % 3]}}
+            for k in range(min(100, len(fx["proposals"])))
+        ]}}),
+        ("DELETE /api/proposals/{proposal_id}", lambda i: {"path": {"proposal_id": next(doomed_proposals)}}),
+        ("GET /api/statistics", lambda i: {}),
+        ("GET /api/uwrc/statistics", lambda i: {}),
+        ("GET /api/uwrc/properties", lambda i: {}),
+        ("GET /api/uwrc/properties?state", lambda i: {"params": {"state": prop(i).get("state", "TX")}}),
+        ("GET /api/uwrc/properties/export", lambda i: {"params": {"format": ["ndjson", "csv"][i % 2]}}),
+        ("GET /api/uwrc/filters", lambda i: {}),
+        ("GET /api/properties/{property_id}", lambda i: {"path": {"property_id": prop(i)["id"]}}),
+        ("GET /api/properties/{property_id}/exposure/{lob}", lambda i: {
+            "path": {"property_id": prop(i)["id"], "lob": lob(i)}
+        }),
+        ("GET /api/properties/{property_id}/limits/{lob}", lambda i: {
+            "path": {"property_id": prop(i)["id"], "lob": lob(i)}
+        }),
+        ("GET /api/properties/{property_id}/whatif/{lob}", lambda i: {
+            "path": {"property_id": prop(i)["id"], "lob": lob(i)}
+        }),
+        ("POST /api/properties/{property_id}/whatif/{lob}", lambda i: {
+            "path": {"property_id": prop(i)["id"], "lob": lob(i)},
+            "json": {"coverages": [{"name": "Building", "limit": "$5.0M", "deductible": "$0.1M", "rate": 0.12}]}
+        }),
+        ("POST /api/properties/{property_id}/pricing/{lob}/surface", lambda i: {
+            "path": {"property_id": prop(i)["id"], "lob": lob(i)}, "json": {}
+        }),
+        ("GET /api/properties/{property_id}/multiline-quote", lambda i: {"path": {"property_id": prop(i)["id"]}}),
+        ("POST /api/properties/multiline-quotes", lambda i: {
+            "json": {"propertyIds": [prop(i + k)["id"] for k in range(50)]}
+        }),
+        ("GET /api/properties/{property_id}/bundle", lambda i: {"path": {"property_id": prop(i)["id"]}}),
+        ("GET /api/properties/{property_id}/full-assessment", lambda i: {
+            "path": {"property_id": prop(i)["id"]}, "params": {"years": fx["years"]}
+        }),
+        ("GET /api/repricing/jobs/{job_id}", lambda i: {"path": {"job_id": fx["job_id"]}}),
+        ("GET /api/repricing/jobs/{job_id}/progress", lambda i: {"path": {"job_id": fx["job_id"]}}),
+        ("GET /api/properties/{property_id}/documents", lambda i: {"path": {"property_id": prop(i)["id"]}}),
+        ("GET /api/properties/{property_id}/documents/{document_id}", lambda i: {
+            "path": {"property_id": fx["document"]["propertyId"], "document_id": fx["document"]["id"]}
+        }),
+        ("POST /api/properties/{property_id}/documents", lambda i: {
+            "path": {"property_id": prop(i)["id"]}, **upload(f"bench-{i}.csv")
+        }),
+        ("GET /api/properties/{property_id}/documents/{document_id}/download", lambda i: {
+            "path": {"property_id": fx["document"]["propertyId"], "document_id": fx["document"]["id"]}
+        }),
+        ("DELETE /api/properties/{property_id}/documents/{document_id}", lambda i: {
+            "path": next(doomed_documents)
+        }),
+        ("GET /api/accumulation", lambda i: {"params": {"propertyId": prop(i)["id"], "radius": 25}}),
+        ("GET /api/accumulation/hotspots", lambda i: {"params": {"cell": [0.5, 1, 5][i % 3]}}),
+        ("GET /api/metrics", lambda i: {}),
+    ]
+
+
+def route_template(name):
+    """"GET /api/proposals?search" -> ("GET", "/api/proposals")"""
+    method, path = name.split(" ", 1)
+    return method, path.split("?", 1)[0]
+
+
+def check_coverage(names):
+    covered = {route_template(name) for name in names} | {route_template(name) for name in EXCLUDED}
+    for route in server.app.routes:
+        if isinstance(route, APIRoute) and route.path.startswith("/api"):
+            for method in route.methods - {"HEAD"}:
+                if (method, route.path) not in covered:
+                    print(f"warning: {method} {route.path} has no benchmark scenario", file=sys.stderr)
+
+
+async def setup(client, args, wanted):
+    server.SEED_ALLOW_FORCE = True
+    response = await client.post("/api/seed", params={
+        "force": "true", "proposals": args.proposals, "properties": args.properties, "seed": args.seed
+    })
+    response.raise_for_status()
+    login = await client.post("/api/auth/login", json={"username": "LARA", "password": "password123", "role": "UWR_B"})
+    login.raise_for_status()
+    body = login.json()
+
+    fx = {"token": body["token"], "user": body["user"], "years": args.years}
+    fx["proposals"] = [p["id"] async for p in server.db.proposals.find({}, {"id": 1}).limit(1000)]
+    fx["properties"] = [p async for p in server.db.properties.find(
+        {"lobs.0": {"$exists": True}}, {"_id": 0, "id": 1, "lobs": 1, "state": 1}
+    ).limit(1000)]
+    if not fx["proposals"] or not fx["properties"]:
+        sys.exit("Seeding produced no proposals or properties; raise --proposals/--properties")
+    victims = args.warmup + args.requests
+    headers = {"Authorization": f"Bearer {fx['token']}"}
+
+    # Rows for the DELETE routes to remove, so they measure real deletes rather than 404s
+    fx["doomed_proposals"] = []
+    if wanted("DELETE /api/proposals/{proposal_id}"):
+        for i in range(victims):
+            created = await client.post("/api/proposals", json=proposal_body(i), headers=headers)
+            fx["doomed_proposals"].append(created.raise_for_status().json()["id"])
+    property_id = fx["properties"][0]["id"]
+    uploaded = await client.post(f"/api/properties/{property_id}/documents", **upload("bench.csv"))
+    fx["document"] = uploaded.raise_for_status().json()
+    fx["doomed_documents"] = []
+    if wanted("DELETE /api/properties/{property_id}/documents/{document_id}"):
+        for i in range(victims):
+            doc = await client.post(f"/api/properties/{property_id}/documents", **upload(f"doomed-{i}.csv"))
+            fx["doomed_documents"].append({"property_id": property_id, "document_id": doc.raise_for_status().json()["id"]})
+
+    # A finished job, so the progress stream sends one event and closes
+    job = await client.post("/api/repricing/jobs", json={"name": "bench", "rateFactor": 1.0, "dryRun": True},
+                            headers=headers)
+    fx["job_id"] = job.raise_for_status().json()["id"]
+    while (await client.get(f"/api/repricing/jobs/{fx['job_id']}")).json()["status"] not in server.TERMINAL_STATUSES:
+        await asyncio.sleep(0.1)
+    return fx
+
+
+async def drive(client, name, factory, total, concurrency, offset=0):
+    method, template = route_template(name)
+    latencies = []
+    errors = []
+    numbers = iter(range(offset, offset + total))
+
+    async def worker():
+        for i in numbers:
+            kwargs = factory(i)
+            url = template.format(**kwargs.pop("path", {}))
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors.append(f"{response.status_code} {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "firstError": errors[0] if errors else None,
+        "throughput": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Names of routes that regressed against the baseline, with the reason"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        slower = current["p95_ms"] - before["p95_ms"]
+        if slower > min_delta_ms and current["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['throughput']:,.0f} -> {current['throughput']:,.0f} req/s")
+    return regressions
+
+
+def report(results, baseline):
+    width = max(len(name) for name in results)
+    print(f"{'route':<{width}}  {'req/s':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'p95 vs base':>11}")
+    for name, row in results.items():
+        before = baseline.get(name)
+        change = f"{(row['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}%" if before and before["p95_ms"] else "new"
+        print(f"{name:<{width}}  {row['throughput']:>9,.0f}  {row['p50_ms']:>8.2f}  {row['p95_ms']:>8.2f}  "
+              f"{row['p99_ms']:>8.2f}  {change:>11}")
+
+
+async def main(args):
+    # One access log line per request would swamp the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.memory:
+        use_memory_db()
+    pattern = re.compile(args.routes) if args.routes else None
+    wanted = lambda name: pattern is None or bool(pattern.search(name))  # noqa: E731
+
+    baseline = {}
+    if args.baseline:
+        saved = json.loads(Path(args.baseline).read_text())
+        baseline = saved["routes"]
+        sizes = {key: saved["config"].get(key) for key in ("proposals", "properties", "concurrency")}
+        if sizes != {key: getattr(args, key) for key in sizes}:
+            print(f"warning: baseline was recorded with {sizes}", file=sys.stderr)
+
+    await server.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            fx = await setup(client, args, wanted)
+            plan = scenarios(fx)
+            check_coverage(name for name, _ in plan)
+            results = {}
+            for name, factory in plan:
+                if not wanted(name):
+                    continue
+                if args.warmup:
+                    await drive(client, name, factory, args.warmup, args.concurrency)
+                results[name] = await drive(client, name, factory, args.requests, args.concurrency, args.warmup)
+    finally:
+        await server.app.router.shutdown()
+
+    report(results, baseline)
+    failed = [f"{name}: {row['errors']} errors, first: {row['firstError']}" for name, row in results.items() if row["errors"]]
+    failed += compare(results, baseline, args.threshold, args.min_delta_ms)
+
+    if args.save:
+        config = {key: getattr(args, key) for key in ("proposals", "properties", "concurrency", "requests", "years")}
+        config.update(memory=args.memory, python=platform.python_version(), machine=platform.node())
+        Path(args.save).write_text(json.dumps({"config": config, "routes": results}, indent=2) + "\n")
+        print(f"Saved {len(results)} routes to {args.save}")
+    if failed:
+        print("\nFAILED:\n  " + "\n  ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per route")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per route")
+    parser.add_argument("--proposals", type=int, default=2000)
+    parser.add_argument("--properties", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=10_000, help="simulated years for full-assessment")
+    parser.add_argument("--routes", help="regular expression selecting routes by name")
+    parser.add_argument("--memory", action="store_true", help="use an in-memory mongomock database")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed fractional regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p95 changes smaller than this")
+    asyncio.run(main(parser.parse_args()))
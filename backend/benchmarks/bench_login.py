@@ -0,0 +1,86 @@
+"""Login burst: latency of unrelated endpoints while passwords are verified.
+
+Usage (from backend/, with MONGO_URL and DB_NAME pointing at a scratch db):
+    python benchmarks/bench_login.py --logins 200 --concurrency 20
+
+A burst of logins runs alongside a stream of GET /api/ probes that lasts
+until the burst is over. The run is
+repeated with bcrypt called inline on the event loop, which is what a
+naive hashed login would do, to show the difference in probe p99.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import bcrypt
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import auth  # noqa: E402
+import server  # noqa: E402
+
+
+async def inline_run_hashing(func, *args):
+    return func(*args)
+
+
+async def burst(client, user, logins, concurrency):
+    payload = {"username": user["username"], "password": "bench-password", "role": user["role"]}
+    remaining = iter(range(logins))
+    done = asyncio.Event()
+    latencies = []
+
+    async def login_worker():
+        for _ in remaining:
+            (await client.post("/api/auth/login", json=payload)).raise_for_status()
+
+    async def logins_then_stop():
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        done.set()
+
+    async def probe():
+        # Probes are scheduled at a fixed rate and timed from their intended
+        # start, so a stalled event loop shows up as latency
+        interval = 0.005
+        scheduled = time.perf_counter()
+        while True:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            (await client.get("/api/")).raise_for_status()
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled += interval
+            if done.is_set():
+                break
+
+    await asyncio.gather(probe(), logins_then_stop())
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return statistics.median(latencies), p99, latencies[-1]
+
+
+async def main(args):
+    user = {"id": str(uuid.uuid4()), "username": f"bench-{uuid.uuid4().hex[:6]}", "fullName": "Bench User",
+            "role": "UWR_B", "avatar": None,
+            "password": bcrypt.hashpw(b"bench-password", bcrypt.gensalt(auth.BCRYPT_ROUNDS)).decode()}
+    await server.db.users.insert_one(dict(user))
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            pooled = await burst(client, user, args.logins, args.concurrency)
+            auth._run_hashing = inline_run_hashing
+            inline = await burst(client, user, args.logins, args.concurrency)
+        print(f"bcrypt rounds={auth.BCRYPT_ROUNDS}, workers={auth.PASSWORD_HASH_WORKERS}, logins={args.logins}")
+        for name, (p50, p99, worst) in (("worker pool", pooled), ("inline", inline)):
+            print(f"{name:>11}: probe p50={p50:.2f}ms p99={p99:.2f}ms max={worst:.2f}ms")
+    finally:
+        await server.db.users.delete_one({"id": user["id"]})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""Compare the indexed proposal search with the legacy unanchored $regex path.
+
+Usage (from backend/):
+    python benchmarks/bench_search.py --docs 1000000 --mongo-url mongodb://localhost:27017
+
+The benchmark fills a scratch database with synthetic proposals, builds the
+search indexes and reports per-query latency percentiles for both paths,
+then how many proposals each query's fuzzy trigram lookup matches.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from search import build_search_fields, fuzzy_query, search_proposals, tokenize  # noqa: E402
+
+CITIES = ["Chicago, IL", "Austin, TX", "Boston, MA", "Miami, FL", "Seattle, WA", "Denver, CO",
+          "Phoenix, AZ", "Atlanta, GA", "Houston, TX", "Portland, OR", "Tampa, FL", "Omaha, NE"]
+KINDS = ["Office Tower", "Retail Plaza", "Medical Center", "Tech Campus", "Industrial Park",
+         "Distribution Hub", "Resort", "Convention Center", "Financial Plaza", "Brewery Complex"]
+CLIENTS = ["Marriott International", "Summit Commercial", "Apex Real Estate", "Horizon Investments",
+           "Pacific Northwest Tech", "Desert Healthcare", "Great Lakes Industrial", "Liberty Properties"]
+QUERIES = ["austin", "aus off", "marriot", "medcal center", "great lakes", "tampa resort", "horizn"]
+
+
+def legacy_query(search: str) -> dict:
+    return {"$or": [
+        {"title": {"$regex": search, "$options": "i"}},
+        {"client": {"$regex": search, "$options": "i"}},
+        {"location": {"$regex": search, "$options": "i"}}
+    ]}
+
+
+async def populate(collection, count: int, batch_size: int = 10000) -> None:
+    rng = random.Random(42)
+    await collection.drop()
+    batch = []
+    for i in range(count):
+        city = rng.choice(CITIES)
+        doc = {
+            "id": f"bench-{i}",
+            "title": f"{city.split(',')[0]} {rng.choice(KINDS)} {i % 97}",
+            "client": f"{rng.choice(CLIENTS)} {rng.choice(['Inc.', 'LLC', 'Group', 'Corp'])}",
+            "location": city,
+            "status": rng.choice(["to_do", "in_process", "completed"]),
+        }
+        doc.update(build_search_fields(doc))
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+    await collection.create_index("searchTokens")
+    await collection.create_index("searchGrams")
+
+
+async def time_queries(run, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            await run(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "mean": statistics.fmean(samples),
+    }
+
+
+async def main(args) -> None:
+    client = AsyncIOMotorClient(args.mongo_url)
+    collection = client[args.db_name].proposals
+    if not args.skip_populate:
+        print(f"Populating {args.docs} proposals...")
+        await populate(collection, args.docs)
+
+    async def regex_path(query):
+        await collection.find(legacy_query(query), {"_id": 0}).to_list(args.limit)
+
+    async def indexed_path(query):
+        await search_proposals(collection, query, {}, args.limit)
+
+    for name, run in (("regex", regex_path), ("indexed", indexed_path)):
+        result = await time_queries(run, args.repeats)
+        print(f"{name:>8}: p50={result['p50']:.2f}ms p99={result['p99']:.2f}ms mean={result['mean']:.2f}ms")
+    for query in QUERIES:
+        matched = await collection.count_documents(fuzzy_query(tokenize(query)))
+        print(f"fuzzy lookup {query!r}: {matched} proposals")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="bench_search")
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--skip-populate", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""CPU time to serialize list responses: response_model validation vs FastJSONResponse.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py --rows 1000 --repeat 200
+
+Documents come from the synthetic data generator and are shaped as the
+handlers' Mongo projections return them. The validated path reproduces what
+FastAPI does with a ``response_model`` (validate, dump to JSON-compatible
+Python, ``json.dumps``); untyped lists go through ``jsonable_encoder``
+instead. No database is involved.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+import responses  # noqa: E402
+from search import build_search_fields  # noqa: E402
+from synthetic import DataGenerator  # noqa: E402
+
+
+def project(doc, projection):
+    """Apply an inclusion or exclusion projection the way MongoDB would"""
+    if any(value == 1 for key, value in projection.items() if key != "_id"):
+        return {key: doc[key] for key, value in projection.items() if value == 1 and key in doc}
+    return {key: value for key, value in doc.items() if projection.get(key, 1) and key != "_id"}
+
+
+def cpu_ms(render, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        body = render()
+    return (time.process_time() - start) / repeat * 1000, len(body)
+
+
+def main(args):
+    generator = DataGenerator(seed=42)
+    # As stored: with the search arrays a projection must strip
+    stored = []
+    for i in range(args.rows):
+        proposal = generator.proposal(f"bench-{i}")
+        stored.append({**proposal, **build_search_fields(proposal)})
+    proposals = [project(doc, server.PROPOSAL_PROJECTION) for doc in stored]
+    properties = [generator.property(f"prop-{i}")["properties"][0] for i in range(args.rows)]
+    page_adapter = TypeAdapter(server.ProposalPage)
+
+    def validated_page():
+        page = page_adapter.validate_python(server.ProposalPage(items=proposals))
+        return JSONResponse(page_adapter.dump_python(page, mode="json")).body
+
+    cases = [
+        ("proposals, response_model", validated_page),
+        ("proposals, FastJSONResponse", lambda: responses.FastJSONResponse({"items": proposals, "next_cursor": None}).body),
+        ("properties, jsonable_encoder", lambda: JSONResponse(jsonable_encoder(properties)).body),
+        ("properties, FastJSONResponse", lambda: responses.FastJSONResponse(properties).body),
+    ]
+    print(f"{args.rows} rows per response, {args.repeat} responses each")
+    baseline = None
+    for name, render in cases:
+        ms, size = cpu_ms(render, args.repeat)
+        if name.endswith("FastJSONResponse"):
+            print(f"{name:<32} {ms:8.2f} ms CPU  {size / 1024:7.0f} KB  ({baseline / ms:.1f}x)")
+        else:
+            baseline = ms
+            print(f"{name:<32} {ms:8.2f} ms CPU  {size / 1024:7.0f} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=100)
+    main(parser.parse_args())
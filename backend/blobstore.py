@@ -0,0 +1,134 @@
+"""Content-addressed, chunked blob storage in MongoDB.
+
+A blob is split into fixed-size chunks. Each chunk is stored once in
+``blob_chunks`` under its SHA-256, so identical files, and identical
+chunks across files, take no extra space. The manifest in ``blobs`` is
+keyed by the whole file's SHA-256 and lists the chunk hashes in order. It
+also counts the documents referencing it.
+
+Hashes are computed while the upload streams through ``BlobWriter``. Only
+one chunk is buffered at a time, and ranged reads fetch only the chunks
+they overlap.
+
+Chunks are never deleted inline, because another blob may share them.
+``collect_garbage`` removes chunks no manifest references once they are
+older than a grace period, which also covers chunks left by aborted
+uploads.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from bson import Binary
+from pymongo import DeleteOne
+
+BLOB_CHUNK_SIZE = int(os.environ.get('BLOB_CHUNK_SIZE', str(1024 * 1024)))
+ORPHAN_GRACE = timedelta(days=1)
+
+
+class BlobTooLarge(ValueError):
+    pass
+
+
+def format_size(size: int) -> str:
+    """Human-readable size in the style the documents list shows ("2.5 MB")"""
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class BlobWriter:
+    """Hash and store a stream of bytes; ``close`` returns the blob's manifest"""
+
+    def __init__(self, db, max_bytes: Optional[int] = None, chunk_size: int = BLOB_CHUNK_SIZE):
+        self.db = db
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.chunks = []
+        self._digest = hashlib.sha256()
+        self._buffer = bytearray()
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise BlobTooLarge(f"Blob exceeds {self.max_bytes} bytes")
+        self._digest.update(data)
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            await self._store_chunk(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+
+    async def _store_chunk(self, chunk: bytes) -> None:
+        key = hashlib.sha256(chunk).hexdigest()
+        await self.db.blob_chunks.update_one(
+            {"_id": key},
+            {"$setOnInsert": {"data": Binary(chunk), "size": len(chunk)},
+             "$set": {"touchedAt": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        self.chunks.append(key)
+
+    async def close(self) -> dict:
+        if self._buffer:
+            await self._store_chunk(bytes(self._buffer))
+            self._buffer.clear()
+        blob_id = self._digest.hexdigest()
+        # A concurrent or earlier upload of the same bytes shares its manifest
+        await self.db.blobs.update_one(
+            {"_id": blob_id},
+            {"$setOnInsert": {
+                "size": self.size,
+                "chunkSize": self.chunk_size,
+                "chunks": self.chunks,
+                "createdAt": datetime.now(timezone.utc)
+            }, "$inc": {"refs": 1}},
+            upsert=True
+        )
+        return {"id": blob_id, "size": self.size}
+
+
+async def get_blob(db, blob_id: str) -> Optional[dict]:
+    return await db.blobs.find_one({"_id": blob_id})
+
+
+async def read_blob(db, blob: dict, start: int, end: int) -> AsyncIterator[bytes]:
+    """Yield bytes ``start`` through ``end`` (inclusive) of a blob"""
+    chunk_size = blob["chunkSize"]
+    first, last = start // chunk_size, end // chunk_size
+    for index in range(first, last + 1):
+        doc = await db.blob_chunks.find_one({"_id": blob["chunks"][index]}, {"data": 1})
+        data = doc["data"]
+        offset = index * chunk_size
+        lo = start - offset if index == first else 0
+        hi = end - offset + 1 if index == last else len(data)
+        yield bytes(data[lo:hi])
+
+
+async def release_blob(db, blob_id: str) -> None:
+    """Drop one reference; the manifest goes with the last one"""
+    await db.blobs.update_one({"_id": blob_id}, {"$inc": {"refs": -1}})
+    await db.blobs.delete_one({"_id": blob_id, "refs": {"$lte": 0}})
+
+
+async def collect_garbage(db, grace: timedelta = ORPHAN_GRACE, batch_size: int = 1000) -> int:
+    """Delete chunks that no manifest references and were last written before the grace period"""
+    referenced = set()
+    async for blob in db.blobs.find({}, {"chunks": 1}):
+        referenced.update(blob["chunks"])
+
+    cutoff = datetime.now(timezone.utc) - grace
+    deleted = 0
+    batch = []
+    async for chunk in db.blob_chunks.find({"touchedAt": {"$lt": cutoff}}, {"_id": 1}).batch_size(batch_size):
+        if chunk["_id"] not in referenced:
+            batch.append(DeleteOne({"_id": chunk["_id"], "touchedAt": {"$lt": cutoff}}))
+        if len(batch) >= batch_size:
+            deleted += (await db.blob_chunks.bulk_write(batch, ordered=False)).deleted_count
+            batch = []
+    if batch:
+        deleted += (await db.blob_chunks.bulk_write(batch, ordered=False)).deleted_count
+    return deleted
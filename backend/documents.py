@@ -0,0 +1,155 @@
+"""Background document processing.
+
+The ``documents`` collection is the queue. An upload is stored with
+``status: "queued"``. Workers claim the oldest queued document with an
+atomic ``find_one_and_update`` that sets ``status: "processing"`` and a
+lease. They copy its blob to a temporary file and run
+``extraction.extract_document`` on a process pool. The result, the
+confidence and ``completed`` or ``failed`` are then written back.
+
+Claims are atomic, so any number of workers, in this process or others,
+can share the queue. A worker that dies leaves its lease to expire, after
+which the document is claimed again, up to ``DOCUMENT_MAX_ATTEMPTS``
+times. ``queue_depth`` backs the upload endpoint's back-pressure check.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from blobstore import get_blob, read_blob
+from extraction import extract_document
+from queries import DOCUMENT_CLAIM_SORT, document_claim_filter
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_WORKERS = int(os.environ.get('DOCUMENT_WORKERS', '2'))
+DOCUMENT_QUEUE_LIMIT = int(os.environ.get('DOCUMENT_QUEUE_LIMIT', '100'))
+DOCUMENT_LEASE_SECONDS = int(os.environ.get('DOCUMENT_LEASE_SECONDS', '600'))
+DOCUMENT_MAX_ATTEMPTS = 3
+# Idle workers re-check the queue this often in case a wake-up was missed
+DOCUMENT_POLL_SECONDS = 5.0
+
+_pool: Optional[ProcessPoolExecutor] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=DOCUMENT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_wakeup() -> asyncio.Event:
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+    return _wakeup
+
+
+def notify_workers() -> None:
+    """Wake idle workers after queuing a document"""
+    _get_wakeup().set()
+
+
+async def queue_depth(db) -> int:
+    return await db.documents.count_documents({"status": "queued"})
+
+
+async def claim_document(db) -> Optional[dict]:
+    now = datetime.now(timezone.utc)
+    return await db.documents.find_one_and_update(
+        document_claim_filter(now),
+        {"$set": {
+            "status": "processing",
+            "startedAt": now.isoformat(),
+            "leaseExpiresAt": now + timedelta(seconds=DOCUMENT_LEASE_SECONDS)
+        }, "$inc": {"attempts": 1}},
+        sort=DOCUMENT_CLAIM_SORT,
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _spool_blob(db, blob: dict) -> str:
+    """Copy a blob to a temporary file the worker process can open"""
+    handle = tempfile.NamedTemporaryFile(delete=False)
+    try:
+        if blob["size"]:
+            async for data in read_blob(db, blob, 0, blob["size"] - 1):
+                await asyncio.to_thread(handle.write, data)
+    finally:
+        handle.close()
+    return handle.name
+
+
+async def process_document(db, doc: dict) -> None:
+    if doc["attempts"] > DOCUMENT_MAX_ATTEMPTS:
+        # Lease expired on every attempt, e.g. the worker keeps dying on this file
+        await _finish(db, doc, "failed", {"error": f"Gave up after {DOCUMENT_MAX_ATTEMPTS} attempts"})
+        return
+    blob = await get_blob(db, doc["sha256"]) if doc.get("sha256") else None
+    if blob is None:
+        await _finish(db, doc, "failed", {"error": "Document content is missing"})
+        return
+
+    path = await _spool_blob(db, blob)
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            get_pool(), partial(extract_document, path, doc["name"], doc.get("contentType"))
+        )
+    except Exception as exc:
+        logger.exception("Extraction failed for document %s", doc["id"])
+        status = "failed" if doc["attempts"] >= DOCUMENT_MAX_ATTEMPTS else "queued"
+        await _finish(db, doc, status, {"error": str(exc)})
+        return
+    finally:
+        os.unlink(path)
+    await _finish(db, doc, "completed", {"extraction": result, "confidence": result["confidence"]})
+
+
+async def _finish(db, doc: dict, status: str, fields: dict) -> None:
+    update = {"status": status, **fields}
+    if status != "queued":
+        update["processedAt"] = datetime.now(timezone.utc).isoformat()
+    # Only the worker holding the lease may settle the document
+    await db.documents.update_one(
+        {"id": doc["id"], "status": "processing", "leaseExpiresAt": doc["leaseExpiresAt"]},
+        {"$set": update, "$unset": {"leaseExpiresAt": ""}}
+    )
+
+
+async def document_worker(db) -> None:
+    wakeup = _get_wakeup()
+    while True:
+        # Cleared before claiming so a document queued meanwhile still wakes us
+        wakeup.clear()
+        try:
+            doc = await claim_document(db)
+        except Exception:
+            logger.exception("Could not claim a document")
+            doc = None
+        if doc is None:
+            try:
+                await asyncio.wait_for(wakeup.wait(), DOCUMENT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await process_document(db, doc)
+        except Exception:
+            logger.exception("Processing document %s failed", doc["id"])
@@ -0,0 +1,147 @@
+"""Server-sent event fan-out for dashboard updates.
+
+Published events go into one ring buffer, already encoded as SSE
+messages, so each is serialized once however many clients are connected.
+Every subscriber is just a position in that buffer and a waiter on a
+shared ``asyncio.Event``, a few KB per idle connection. A subscriber that
+falls more than the buffer behind, or reconnects with a ``Last-Event-ID``
+from another process or an earlier run, gets a ``resync`` event and
+should refetch.
+
+Events come from MongoDB change streams when the deployment supports
+them (a replica set), which also covers writes made by other processes.
+Otherwise ``EventLog.local`` stays set and handlers publish their own
+writes.
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Set
+
+from pymongo.errors import OperationFailure
+
+from responses import dumps
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUFFER_SIZE = 1024
+HEARTBEAT_SECONDS = 15.0
+RETRY_MS = 5000
+
+# Change stream errors meaning "not available here" rather than "try again"
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324, 20}
+CHANGE_STREAM_HISTORY_LOST = 286
+
+ALL_TOPICS = "*"
+
+
+class EventLog:
+    def __init__(self, size: int = EVENT_BUFFER_SIZE):
+        # Restarts and other processes number events independently
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.events: deque = deque(maxlen=size)
+        self.subscribers = 0
+        self.local = True
+        self._published = asyncio.Event()
+
+    def publish(self, topic: str, event: str, data) -> None:
+        self.seq += 1
+        message = f"id: {self.epoch}.{self.seq}\nevent: {event}\ndata: ".encode() + dumps(data) + b"\n\n"
+        self.events.append((self.seq, topic, message))
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    def waiter(self) -> asyncio.Event:
+        """Set at the next publish"""
+        return self._published
+
+    def resync(self) -> None:
+        """Tell every subscriber to refetch, e.g. after a bulk load"""
+        self.publish(ALL_TOPICS, "resync", {})
+
+    def position(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence number a reconnecting client resumes after, if it is from this log"""
+        if not last_event_id:
+            return self.seq
+        epoch, _, seq = last_event_id.partition(".")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        return int(seq)
+
+    def since(self, seq: int) -> Optional[list]:
+        """Events after ``seq``, or None when some were already dropped"""
+        if seq == self.seq:
+            return []
+        if not self.events or seq < self.events[0][0] - 1:
+            return None
+        return [event for event in self.events if event[0] > seq]
+
+
+async def event_stream(log: EventLog, topics: Set[str], last_event_id: Optional[str] = None,
+                       heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+    log.subscribers += 1
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        cursor = log.position(last_event_id)
+        while True:
+            # Taken before reading so a publish in between still wakes us
+            waiter = log.waiter()
+            events = log.since(cursor) if cursor is not None else None
+            if events is None:
+                cursor = log.seq
+                yield f"id: {log.epoch}.{cursor}\nevent: resync\ndata: {{}}\n\n".encode()
+                continue
+            if events:
+                cursor = events[-1][0]
+                chunk = b"".join(message for _, topic, message in events if topic in topics or topic == ALL_TOPICS)
+                if chunk:
+                    yield chunk
+                continue
+            try:
+                await asyncio.wait_for(waiter.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield b": keepalive\n\n"
+    finally:
+        log.subscribers -= 1
+
+
+async def watch_changes(db, log: EventLog, collections: Iterable[str],
+                        on_change: Callable[[dict], Awaitable[None]], retry_seconds: float = 5.0) -> None:
+    """Feed ``on_change`` from a database change stream; returns if change streams are unsupported"""
+    pipeline = [
+        {"$match": {
+            "ns.coll": {"$in": list(collections)},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+        }},
+        {"$project": {"fullDocument._id": 0, "fullDocument.searchTokens": 0, "fullDocument.searchGrams": 0,
+                      "fullDocument.searchParts": 0}}
+    ]
+    resume_token = None
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                log.local = False
+                logger.info("Publishing events from change streams")
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    try:
+                        await on_change(change)
+                    except Exception:
+                        logger.exception("Could not publish change %s", change.get("_id"))
+        except OperationFailure as exc:
+            log.local = True
+            if exc.code in CHANGE_STREAMS_UNSUPPORTED:
+                logger.info("Change streams unavailable (%s); publishing this process's writes only", exc)
+                return
+            if exc.code == CHANGE_STREAM_HISTORY_LOST:
+                resume_token = None
+            logger.warning("Change stream failed: %s", exc)
+        except Exception:
+            log.local = True
+            logger.exception("Change stream failed")
+        # Whatever happened while disconnected is unknown to subscribers
+        log.resync()
+        await asyncio.sleep(retry_seconds)
@@ -0,0 +1,76 @@
+"""Streaming bulk export of query results as NDJSON or CSV.
+
+Rows are encoded while the Mongo cursor is iterated and flushed every
+``batch_size`` documents, the same size the cursor fetches, so memory
+stays flat however many rows match. The first bytes go out as soon as
+the first batch arrives, and a CSV header goes out before that.
+"""
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Callable, List, Optional
+
+from responses import dumps
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"), default=str)
+    return str(value)
+
+
+async def stream_ndjson(cursor, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    buffer = []
+    async for doc in cursor.batch_size(batch_size):
+        buffer.append(dumps(doc))
+        if len(buffer) >= batch_size:
+            yield b"\n".join(buffer) + b"\n"
+            buffer = []
+    if buffer:
+        yield b"\n".join(buffer) + b"\n"
+
+
+async def stream_csv(cursor, columns: List[str], batch_size: int = EXPORT_BATCH_SIZE,
+                     row: Optional[Callable[[dict], dict]] = None) -> AsyncIterator[bytes]:
+    """CSV with one column per name in ``columns``; lists are joined with "; ".
+
+    ``row`` maps a document to a flat dict first, e.g. to split out nested
+    fields.
+    """
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    yield out.getvalue().encode()
+    out.seek(0)
+    out.truncate()
+
+    count = 0
+    async for doc in cursor.batch_size(batch_size):
+        values = row(doc) if row else doc
+        writer.writerow([_cell(values.get(column)) for column in columns])
+        count += 1
+        if count % batch_size == 0:
+            yield out.getvalue().encode()
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode()
+
+
+def stream_export(cursor, fmt: str, columns: List[str],
+                  csv_row: Optional[Callable[[dict], dict]] = None) -> AsyncIterator[bytes]:
+    if fmt == "csv":
+        return stream_csv(cursor, columns, row=csv_row)
+    return stream_ndjson(cursor)
@@ -0,0 +1,159 @@
+"""Structured-data extraction from uploaded documents.
+
+Runs in worker processes, so every function takes a file path and returns
+plain data. Tabular files (CSV, XLSX) are matched against the columns of a
+statement of values (SOV) and of a loss run; the share of a template's
+columns found is the extraction confidence. PDFs are scored on the same
+vocabulary found in their text, read with ``pypdf``.
+"""
+import csv
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from pypdf import PdfReader
+
+# Column vocabulary per document type; each entry lists accepted spellings
+TEMPLATES: Dict[str, Dict[str, tuple]] = {
+    "sov": {
+        "address": ("address", "street", "location"),
+        "city": ("city",),
+        "state": ("state", "st"),
+        "zip": ("zip", "zipcode", "postal"),
+        "buildingValue": ("building", "buildingvalue", "bldg"),
+        "contentsValue": ("contents", "contentsvalue", "bpp"),
+        "businessIncome": ("businessincome", "bi", "timeelement", "businessinterruption"),
+        "totalInsuredValue": ("tiv", "totalinsuredvalue", "totalvalue", "total"),
+        "construction": ("construction", "constructiontype", "isoconstruction"),
+        "yearBuilt": ("yearbuilt", "yrbuilt", "year"),
+        "occupancy": ("occupancy", "use"),
+        "sprinklered": ("sprinklered", "sprinkler", "sprinklers"),
+    },
+    "loss_run": {
+        "claimNumber": ("claim", "claimnumber", "claimno", "claimid"),
+        "lossDate": ("dateofloss", "lossdate", "dol", "date"),
+        "description": ("description", "cause", "causeofloss"),
+        "paid": ("paid", "totalpaid", "paidloss"),
+        "reserve": ("reserve", "outstanding", "reserves"),
+        "incurred": ("incurred", "totalincurred"),
+        "status": ("status", "claimstatus", "open"),
+    },
+}
+
+TEXT_SAMPLE_CHARS = 200_000
+XLSX_NS = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _normalize(header: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", header.lower())
+
+
+def match_columns(headers: List[str]) -> dict:
+    """Best-fitting template for a header row, with the fields it covers"""
+    # Whole headers and their words, so "Location Address" matches "address"
+    normalized = set()
+    for header in headers:
+        if header:
+            normalized.add(_normalize(header))
+            normalized.update(_normalize(word) for word in header.split())
+    best = {"documentType": "unknown", "fields": [], "confidence": 0}
+    for doc_type, fields in TEMPLATES.items():
+        found = [field for field, spellings in fields.items() if normalized & set(spellings)]
+        confidence = round(100 * len(found) / len(fields))
+        if confidence > best["confidence"]:
+            best = {"documentType": doc_type, "fields": found, "confidence": confidence}
+    return best
+
+
+def _scan_rows(rows: Iterator[List[str]]) -> dict:
+    headers = next(rows, [])
+    count = sum(1 for row in rows if any(cell.strip() for cell in row if cell))
+    return {"columns": headers, "rows": count, **match_columns(headers)}
+
+
+def extract_csv(path: str) -> dict:
+    with open(path, newline="", encoding="utf-8", errors="replace") as handle:
+        sample = handle.read(64 * 1024)
+        handle.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        return _scan_rows(csv.reader(handle, dialect))
+
+
+def _xlsx_rows(path: str) -> Iterator[List[str]]:
+    """Rows of the first worksheet, read incrementally"""
+    with zipfile.ZipFile(path) as archive:
+        shared = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            with archive.open("xl/sharedStrings.xml") as handle:
+                for _, element in ElementTree.iterparse(handle):
+                    if element.tag == f"{{{XLSX_NS['s']}}}si":
+                        shared.append("".join(text.text or "" for text in element.iter(f"{{{XLSX_NS['s']}}}t")))
+                        element.clear()
+        sheets = sorted(name for name in archive.namelist() if re.fullmatch(r"xl/worksheets/sheet\d+\.xml", name))
+        if not sheets:
+            return
+        with archive.open(sheets[0]) as handle:
+            for _, element in ElementTree.iterparse(handle):
+                if element.tag != f"{{{XLSX_NS['s']}}}row":
+                    continue
+                row = []
+                for cell in element.iter(f"{{{XLSX_NS['s']}}}c"):
+                    value = cell.find("s:v", XLSX_NS)
+                    inline = cell.find("s:is/s:t", XLSX_NS)
+                    if cell.get("t") == "s" and value is not None:
+                        row.append(shared[int(value.text)])
+                    elif inline is not None:
+                        row.append(inline.text or "")
+                    else:
+                        row.append(value.text if value is not None and value.text else "")
+                element.clear()
+                yield row
+
+
+def extract_xlsx(path: str) -> dict:
+    return _scan_rows(_xlsx_rows(path))
+
+
+def extract_pdf(path: str) -> dict:
+    reader = PdfReader(path)
+    text = []
+    length = 0
+    for page in reader.pages:
+        if length >= TEXT_SAMPLE_CHARS:
+            break
+        page_text = page.extract_text() or ""
+        text.append(page_text)
+        length += len(page_text)
+    # Treat runs of words as candidate headers, so "Date of Loss" matches "dateofloss"
+    phrases = re.findall(r"[A-Za-z][A-Za-z ]{1,30}", " ".join(text))
+    return {"pages": len(reader.pages), "textChars": length, **match_columns(phrases)}
+
+
+EXTRACTORS = {
+    ".csv": extract_csv,
+    ".txt": extract_csv,
+    ".xlsx": extract_xlsx,
+    ".pdf": extract_pdf,
+}
+
+
+def extractor_for(name: str, content_type: Optional[str]):
+    suffix = ("." + name.rsplit(".", 1)[-1].lower()) if "." in name else ""
+    if suffix in EXTRACTORS:
+        return EXTRACTORS[suffix]
+    if content_type == "application/pdf":
+        return extract_pdf
+    if content_type in ("text/csv", "text/plain"):
+        return extract_csv
+    return None
+
+
+def extract_document(path: str, name: str, content_type: Optional[str]) -> dict:
+    extractor = extractor_for(name, content_type)
+    if extractor is None:
+        return {"documentType": "unknown", "fields": [], "confidence": 0, "error": "Unsupported file type"}
+    return extractor(path)
@@ -0,0 +1,166 @@
+"""Property locations and insured-value accumulation.
+
+Properties carry a GeoJSON ``location`` point, backed by a 2dsphere index,
+and ``tivCents``: the insured value the cat model runs against. Accumulation
+around a point is a ``$geoWithin`` query on that index. Portfolio hotspots
+come from one aggregation that buckets locations into a lat/lng grid. Its
+cells are ``cell_miles`` tall and narrow towards the poles, which is close
+enough for ranking concentrations.
+"""
+import hashlib
+from typing import List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from assessment import insured_value_cents
+from queries import within_radius
+
+MILES_PER_DEGREE = 69.0
+
+# Approximate population-weighted centers, used for properties without coordinates
+STATE_CENTERS = {
+    "Alaska": (61.2, -149.9),
+    "Arizona": (33.4, -112.0),
+    "California": (35.5, -119.4),
+    "Colorado": (39.7, -105.0),
+    "Florida": (27.8, -81.6),
+    "Georgia": (33.7, -84.4),
+    "Hawaii": (21.3, -157.8),
+    "Illinois": (41.3, -88.4),
+    "Louisiana": (30.6, -91.5),
+    "Massachusetts": (42.3, -71.4),
+    "Michigan": (42.8, -84.2),
+    "Missouri": (38.4, -92.2),
+    "Nevada": (36.5, -115.5),
+    "New Jersey": (40.4, -74.4),
+    "New York": (41.5, -74.6),
+    "North Carolina": (35.6, -79.4),
+    "Ohio": (40.5, -82.7),
+    "Oklahoma": (35.6, -97.2),
+    "Oregon": (44.7, -122.7),
+    "Pennsylvania": (40.5, -76.8),
+    "South Carolina": (34.0, -81.0),
+    "Tennessee": (35.8, -86.4),
+    "Texas": (30.8, -97.3),
+    "Utah": (40.5, -111.9),
+    "Virginia": (37.8, -77.8),
+    "Washington": (47.3, -122.0),
+}
+US_CENTER = (39.8, -98.6)
+
+# Spread of fallback locations around a state's center, in degrees
+FALLBACK_JITTER_DEGREES = 0.5
+
+
+def point(lat: float, lng: float) -> dict:
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def coordinates(property_data: dict) -> Optional[Tuple[float, float]]:
+    """(lat, lng) of a property, if it has a location"""
+    location = property_data.get("location")
+    if not location:
+        return None
+    lng, lat = location["coordinates"]
+    return lat, lng
+
+
+def fallback_location(property_id: str, state: Optional[str]) -> dict:
+    """A stable point near the state's center for properties lacking coordinates"""
+    lat, lng = STATE_CENTERS.get(state or "", US_CENTER)
+    digest = hashlib.sha256(property_id.encode()).digest()
+    dlat = (int.from_bytes(digest[:4], "big") / 2**32 - 0.5) * 2 * FALLBACK_JITTER_DEGREES
+    dlng = (int.from_bytes(digest[4:8], "big") / 2**32 - 0.5) * 2 * FALLBACK_JITTER_DEGREES
+    return point(round(lat + dlat, 6), round(lng + dlng, 6))
+
+
+async def accumulation(properties, lat: float, lng: float, radius_miles: float, top: int = 10) -> dict:
+    """Insured value within ``radius_miles`` of a point, with its largest locations"""
+    pipeline = [
+        {"$match": within_radius(lat, lng, radius_miles)},
+        {"$facet": {
+            "totals": [{"$group": {"_id": None, "count": {"$sum": 1}, "tivCents": {"$sum": "$tivCents"}}}],
+            "largest": [
+                {"$sort": {"tivCents": -1}},
+                {"$limit": top},
+                {"$project": {"_id": 0, "id": 1, "propertyName": 1, "state": 1, "location": 1, "tivCents": 1}}
+            ]
+        }}
+    ]
+    result = (await properties.aggregate(pipeline).to_list(1))[0]
+    totals = result["totals"][0] if result["totals"] else {"count": 0, "tivCents": 0}
+    return {
+        "count": totals["count"],
+        "tivCents": totals["tivCents"],
+        "largest": result["largest"]
+    }
+
+
+async def hotspots(properties, cell_miles: float, limit: int) -> List[dict]:
+    """The grid cells holding the most insured value across the portfolio"""
+    cell = cell_miles / MILES_PER_DEGREE
+    pipeline = [
+        {"$match": {"location": {"$exists": True}, "tivCents": {"$gt": 0}}},
+        {"$project": {
+            "tivCents": 1,
+            "lng": {"$arrayElemAt": ["$location.coordinates", 0]},
+            "lat": {"$arrayElemAt": ["$location.coordinates", 1]}
+        }},
+        {"$group": {
+            "_id": {
+                "lat": {"$floor": {"$divide": ["$lat", cell]}},
+                "lng": {"$floor": {"$divide": ["$lng", cell]}}
+            },
+            "count": {"$sum": 1},
+            "tivCents": {"$sum": "$tivCents"},
+            "latWeighted": {"$sum": {"$multiply": ["$lat", "$tivCents"]}},
+            "lngWeighted": {"$sum": {"$multiply": ["$lng", "$tivCents"]}}
+        }},
+        {"$sort": {"tivCents": -1}},
+        {"$limit": limit}
+    ]
+    cells = []
+    async for row in properties.aggregate(pipeline):
+        cells.append({
+            # Value-weighted center of the cell's locations
+            "lat": round(row["latWeighted"] / row["tivCents"], 6),
+            "lng": round(row["lngWeighted"] / row["tivCents"], 6),
+            "count": row["count"],
+            "tivCents": row["tivCents"]
+        })
+    return cells
+
+
+async def backfill_property_locations(db, batch_size: int = 1000) -> int:
+    """Set ``tivCents`` and a fallback ``location`` on properties missing them"""
+    updated = 0
+    query = {"$or": [{"location": {"$exists": False}}, {"tivCents": {"$exists": False}}]}
+    cursor = db.properties.find(query, {"_id": 0, "id": 1, "state": 1, "location": 1, "tivCents": 1})
+    batch = []
+
+    async def flush():
+        property_ids = [doc["id"] for doc in batch]
+        exposures = await db.exposures.find(
+            {"propertyId": {"$in": property_ids}}, {"_id": 0, "propertyId": 1, "lob": 1, "totalInsurableValue2025": 1, "totalInsurableValue2025Cents": 1}
+        ).to_list(None)
+        by_property = {}
+        for exposure in exposures:
+            by_property.setdefault(exposure["propertyId"], []).append(exposure)
+        writes = []
+        for doc in batch:
+            fields = {}
+            if "tivCents" not in doc:
+                fields["tivCents"] = insured_value_cents(by_property.get(doc["id"], []))
+            if "location" not in doc:
+                fields["location"] = fallback_location(doc["id"], doc.get("state"))
+            writes.append(UpdateOne({"id": doc["id"]}, {"$set": fields}))
+        return (await db.properties.bulk_write(writes, ordered=False)).modified_count
+
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            updated += await flush()
+            batch = []
+    if batch:
+        updated += await flush()
+    return updated
@@ -0,0 +1,206 @@
+"""Declared MongoDB indexes and a collection-scan detector.
+
+``INDEXES`` is the single list of indexes each collection needs.
+``reconcile_indexes`` creates missing ones and rebuilds any whose
+definition changed; it is idempotent and runs at startup.
+
+``HOT_QUERIES`` holds the filters and sorts the API handlers issue, built
+with the same ``queries`` and ``search`` functions the handlers call.
+``find_collection_scans`` explains each one and reports those whose
+winning plan contains a ``COLLSCAN`` stage; with ``INDEX_CHECK=true`` the
+server refuses to start when any are found.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo import ASCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
+
+from queries import (
+    DOCUMENT_CLAIM_SORT, PROPERTY_EXPORT_SORT, document_claim_filter, keyset_after, match_all, property_filters,
+    proposal_filters, proposal_sort, within_radius
+)
+from search import fuzzy_query, prefix_query, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Fields the proposal queue can be ordered by. Each one is backed by a
+# (field, id) and a (status, field, id) index so a page is a bounded index scan.
+# totalInsuredValueCents also serves the list's insured value range filter.
+PROPOSAL_SORT_FIELDS = ("createdAt", "updatedAt", "title", "client", "totalInsuredValueCents")
+
+
+def _proposal_indexes() -> List[IndexModel]:
+    indexes = [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("searchTokens", ASCENDING)], name="search_tokens"),
+        IndexModel([("searchGrams", ASCENDING)], name="search_grams"),
+        IndexModel([("effectiveOn", ASCENDING)], name="effective_on"),
+    ]
+    for field in PROPOSAL_SORT_FIELDS:
+        indexes.append(IndexModel([(field, ASCENDING), ("id", ASCENDING)], name=f"page_{field}"))
+        indexes.append(IndexModel(
+            [("status", ASCENDING), (field, ASCENDING), ("id", ASCENDING)], name=f"page_status_{field}"
+        ))
+    return indexes
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "proposals": _proposal_indexes(),
+    "properties": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("state", ASCENDING)], name="state"),
+        IndexModel([("lobs", ASCENDING)], name="lobs"),
+        IndexModel([("customerId", ASCENDING)], name="customer_id"),
+        IndexModel([("location", GEOSPHERE)], name="location_2dsphere"),
+    ],
+    "exposures": [
+        IndexModel([("propertyId", ASCENDING), ("lob", ASCENDING)], name="property_lob"),
+    ],
+    "limits": [
+        IndexModel([("propertyId", ASCENDING), ("lob", ASCENDING)], name="property_lob"),
+    ],
+    "whatif": [
+        IndexModel([("propertyId", ASCENDING), ("lob", ASCENDING)], name="property_lob_unique", unique=True),
+    ],
+    "documents": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("propertyId", ASCENDING)], name="property_id"),
+        IndexModel([("status", ASCENDING), ("queuedAt", ASCENDING)], name="status_queued_at"),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("username", ASCENDING), ("role", ASCENDING)], name="username_role"),
+    ],
+    "repricing_jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "revoked_tokens": [
+        IndexModel([("jti", ASCENDING)], name="jti_unique", unique=True),
+        IndexModel([("expiresAt", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "blob_chunks": [
+        IndexModel([("touchedAt", ASCENDING)], name="touched_at"),
+    ],
+    "assessment_cache": [
+        IndexModel([("propertyId", ASCENDING)], name="property_id"),
+        IndexModel([("createdAt", ASCENDING)], name="created_at_ttl", expireAfterSeconds=30 * 24 * 3600),
+    ],
+}
+
+# (collection, filter, sort) for every query on a request hot path. Composed
+# filters and sorts come from the builders the handlers call; plain key
+# lookups are listed as they are written.
+_SAMPLE_DATE = datetime(2025, 1, 1)
+HOT_QUERIES = [
+    ("proposals", {"id": "x"}, None),
+    ("proposals", {}, proposal_sort("createdAt", "desc")),
+    ("proposals", match_all(proposal_filters(status="to_do")), proposal_sort("createdAt", "desc")),
+    ("proposals", match_all(proposal_filters(status="to_do")), proposal_sort("title", "asc")),
+    ("proposals", keyset_after("createdAt", "desc", "2025-01-01T00:00:00", "x"), proposal_sort("createdAt", "desc")),
+    ("proposals", match_all(proposal_filters(min_tiv_cents=500_000_000)),
+     proposal_sort("totalInsuredValueCents", "desc")),
+    ("proposals", match_all(proposal_filters(effective_from=_SAMPLE_DATE, effective_to=datetime(2025, 3, 31))), None),
+    ("proposals", prefix_query(tokenize("aus")), None),
+    ("proposals", fuzzy_query(tokenize("aus")), None),
+    ("properties", {"id": "x"}, None),
+    ("properties", property_filters(state="Texas"), None),
+    ("properties", property_filters(lob="Property"), None),
+    ("properties", property_filters(customer_id="CLT-001"), None),
+    ("properties", {}, PROPERTY_EXPORT_SORT),
+    ("properties", within_radius(41.88, -87.63, 5), None),
+    ("exposures", {"propertyId": "x", "lob": "Property"}, None),
+    ("limits", {"propertyId": "x", "lob": "Property"}, None),
+    ("whatif", {"propertyId": "x", "lob": "Property"}, None),
+    ("exposures", {"propertyId": "x"}, None),
+    ("limits", {"propertyId": "x"}, None),
+    ("whatif", {"propertyId": "x"}, None),
+    ("whatif", {"propertyId": {"$in": ["x", "y"]}}, None),
+    ("properties", {"id": {"$in": ["x", "y"]}}, None),
+    ("documents", {"propertyId": "x"}, None),
+    ("documents", {"id": "x", "propertyId": "x"}, None),
+    ("documents", document_claim_filter(_SAMPLE_DATE), DOCUMENT_CLAIM_SORT),
+    ("users", {"username": "x", "role": "UWR_B"}, None),
+    ("revoked_tokens", {"jti": "x"}, None),
+    ("repricing_jobs", {"id": "x"}, None),
+]
+
+
+def _same_definition(existing: dict, model: IndexModel) -> bool:
+    wanted = model.document
+    # Special index types (e.g. "2dsphere") are strings, directions are numbers
+    existing_key = [
+        (field, direction if isinstance(direction, str) else int(direction))
+        for field, direction in existing["key"]
+    ]
+    if existing_key != list(wanted["key"].items()):
+        return False
+    for option in ("unique", "expireAfterSeconds", "sparse", "partialFilterExpression"):
+        if existing.get(option) != wanted.get(option):
+            return False
+    return True
+
+
+async def reconcile_indexes(db, drop_undeclared: bool = False) -> Dict[str, List[str]]:
+    """Bring every collection's indexes in line with ``INDEXES``.
+
+    Returns the names of the indexes created, rebuilt or dropped. A failure
+    on one index (e.g. duplicates blocking a unique index) is logged and
+    does not stop the others.
+    """
+    report: Dict[str, List[str]] = {"created": [], "rebuilt": [], "dropped": [], "failed": []}
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        declared = set()
+        for model in models:
+            name = model.document["name"]
+            declared.add(name)
+            label = f"{collection_name}.{name}"
+            try:
+                if name in existing:
+                    if _same_definition(existing[name], model):
+                        continue
+                    await collection.drop_index(name)
+                    await collection.create_indexes([model])
+                    report["rebuilt"].append(label)
+                elif any(_same_definition(info, model) for info in existing.values()):
+                    # Already built under another name
+                    declared.update(n for n, info in existing.items() if _same_definition(info, model))
+                    continue
+                else:
+                    await collection.create_indexes([model])
+                    report["created"].append(label)
+            except OperationFailure as exc:
+                logger.error("Could not build index %s: %s", label, exc)
+                report["failed"].append(label)
+        if drop_undeclared:
+            for name in existing:
+                if name != "_id_" and name not in declared:
+                    await collection.drop_index(name)
+                    report["dropped"].append(f"{collection_name}.{name}")
+    return report
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            yield from _stages(child)
+
+
+async def find_collection_scans(db) -> List[str]:
+    """Explain every hot query and describe those that scan a whole collection"""
+    scans = []
+    for collection_name, query, sort in HOT_QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explained = await cursor.explain()
+        plan = explained.get("queryPlanner", {}).get("winningPlan", {})
+        # Newer servers wrap the classic plan in queryPlan
+        plan = plan.get("queryPlan", plan)
+        if "COLLSCAN" in _stages(plan):
+            scans.append(f"{collection_name}: filter={query} sort={sort}")
+    return scans
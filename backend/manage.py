@@ -0,0 +1,183 @@
+"""Maintenance commands for the Risk Intel Pro database.
+
+Usage (from backend/):
+    python manage.py rebuild-uwrc-rollup
+    python manage.py generate-data --proposals 1000000 --properties 1000000 --drop
+    python manage.py migrate-types --dry-run
+"""
+import asyncio
+import os
+import time
+from datetime import timedelta
+from typing import List, Optional
+from pathlib import Path
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from assessment import AssessmentCache
+from blobstore import collect_garbage
+from geo import backfill_property_locations
+from indexes import find_collection_scans, reconcile_indexes
+from rollups import backfill_property_premiums, rebuild_uwrc_rollup, reconcile_proposal_counters
+from search import rebuild_search_index
+from synthetic import BATCH_SIZE, DEFAULT_SEED, populate
+from typed_fields import TYPED_FIELDS, migrate_typed_fields
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+cli = typer.Typer(help="Risk Intel Pro maintenance commands")
+
+
+def get_db():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client, client[os.environ['DB_NAME']]
+
+
+def run(job):
+    """Run an async job against the configured database"""
+    async def wrapper():
+        client, db = get_db()
+        try:
+            return await job(db)
+        finally:
+            client.close()
+    return asyncio.run(wrapper())
+
+
+@cli.command("rebuild-uwrc-rollup")
+def rebuild_uwrc_rollup_command(batch_size: int = 1000):
+    """Backfill numeric property premiums and rebuild the UWR_C dashboard rollup"""
+    async def job(db):
+        backfilled = await backfill_property_premiums(db.properties, batch_size)
+        rollup = await rebuild_uwrc_rollup(db.properties, db.counters)
+        typer.echo(f"Backfilled {backfilled} premiums; rollup covers {rollup['count']} properties")
+    run(job)
+
+
+@cli.command("reconcile-statistics")
+def reconcile_statistics_command():
+    """Recompute the proposal status counters"""
+    async def job(db):
+        counts = await reconcile_proposal_counters(db.proposals, db.counters)
+        typer.echo(f"Proposal counters: {counts}")
+    run(job)
+
+
+@cli.command("reindex-search")
+def reindex_search_command(batch_size: int = 1000):
+    """Backfill proposal search tokens and trigrams"""
+    async def job(db):
+        updated = await rebuild_search_index(db.proposals, batch_size)
+        typer.echo(f"Reindexed {updated} proposals")
+    run(job)
+
+
+@cli.command("backfill-locations")
+def backfill_locations_command(batch_size: int = 1000):
+    """Set insured values and fallback coordinates on properties missing them"""
+    async def job(db):
+        updated = await backfill_property_locations(db, batch_size)
+        typer.echo(f"Backfilled {updated} properties")
+    run(job)
+
+
+@cli.command("gc-blobs")
+def gc_blobs_command(grace_hours: float = 24.0):
+    """Delete stored document chunks that no blob references"""
+    async def job(db):
+        deleted = await collect_garbage(db, timedelta(hours=grace_hours))
+        typer.echo(f"Deleted {deleted} unreferenced chunks")
+    run(job)
+
+
+@cli.command("migrate-types")
+def migrate_types_command(
+    collection: Optional[List[str]] = typer.Option(None, help="Only these collections; repeatable"),
+    batch_size: int = 1000,
+    dry_run: bool = typer.Option(False, help="Count the documents needing conversion without writing")
+):
+    """Store integer cents and BSON dates next to the money and date display strings"""
+    unknown = set(collection or []) - set(TYPED_FIELDS)
+    if unknown:
+        raise typer.BadParameter(f"No typed fields for {', '.join(sorted(unknown))}", param_hint="--collection")
+
+    async def job(db):
+        reports = await migrate_typed_fields(db, collection or None, batch_size, dry_run)
+        verb = "need conversion" if dry_run else "converted"
+        for name, report in reports.items():
+            typer.echo(
+                f"{name}: {report['converted']:,} {verb}, {report['skipped']:,} changed meanwhile, "
+                f"{report['unparsed']:,} unparseable values, {report['integers']:,} float cents"
+            )
+        if not dry_run:
+            # Indexes on the typed fields, in case no server has created them yet
+            await reconcile_indexes(db)
+            if "properties" in reports:
+                # Premiums may have been rewritten as integers
+                await rebuild_uwrc_rollup(db.properties, db.counters)
+            if {"properties", "exposures"} & set(reports):
+                # Assessment keys hash these documents, so every stored one is now unreachable
+                await AssessmentCache(0, db.assessment_cache).invalidate()
+    run(job)
+
+
+@cli.command("generate-data")
+def generate_data_command(
+    users: int = 100,
+    proposals: int = 100_000,
+    properties: int = 100_000,
+    seed: int = DEFAULT_SEED,
+    batch_size: int = BATCH_SIZE,
+    drop: bool = typer.Option(False, help="Drop existing data and rebuild indexes after loading"),
+    password: str = "password123"
+):
+    """Fill the database with reproducible synthetic data at any volume"""
+    # auth reads its settings at import; load them from .env first
+    from auth import hash_password, shutdown_hashing
+
+    async def job(db):
+        started = time.perf_counter()
+        password_hash = await hash_password(password)
+
+        def progress(label, count):
+            typer.echo(f"\r{label}: {count:,}", nl=False)
+
+        written = await populate(
+            db, users=users, proposals=proposals, properties=properties, seed=seed,
+            password_hash=password_hash, drop=drop, batch_size=batch_size, progress=progress
+        )
+        typer.echo("\rLoading rollups...          ")
+        await reconcile_proposal_counters(db.proposals, db.counters)
+        await rebuild_uwrc_rollup(db.properties, db.counters)
+        elapsed = time.perf_counter() - started
+        for collection, count in written.items():
+            typer.echo(f"{collection}: {count:,}")
+        typer.echo(f"Wrote {sum(written.values()):,} documents in {elapsed:.1f}s")
+    try:
+        run(job)
+    finally:
+        shutdown_hashing()
+
+
+@cli.command("check-indexes")
+def check_indexes_command(drop_undeclared: bool = False):
+    """Reconcile declared indexes and fail if any hot query scans a collection"""
+    async def job(db):
+        report = await reconcile_indexes(db, drop_undeclared=drop_undeclared)
+        for action, names in report.items():
+            if names:
+                typer.echo(f"{action}: {', '.join(names)}")
+        return await find_collection_scans(db)
+    scans = run(job)
+    for scan in scans:
+        typer.echo(f"COLLSCAN {scan}", err=True)
+    if scans:
+        raise typer.Exit(code=1)
+    typer.echo("No collection scans on hot queries")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,238 @@
+"""Request and MongoDB command metrics in Prometheus text format.
+
+``MetricsMiddleware`` times every HTTP request and labels it with the
+matched route template, so ``/api/proposals/abc`` and ``/api/proposals/xyz``
+share one series. While a request runs, its ``RequestStats`` sit in a
+context variable. Motor runs each pymongo call in a thread with a copy of
+the caller's context, so ``CommandMetrics``, a pymongo command listener,
+finds the stats of the request that issued the command and counts the
+command against it. Tasks a request starts copy its context too; work that
+outlives the request runs through ``outside_request`` so its commands count
+as background.
+
+Everything is plain counters behind one lock, cheap enough to leave on in
+production. Requests slower than ``slow_ms`` are logged with their Mongo
+command breakdown, except streamed responses (event streams, exports), whose
+duration is how long the client kept reading.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Labels for commands issued outside a request (workers, startup) and for
+# requests no route matched, which would otherwise add a series per path
+BACKGROUND = ("", "background")
+UNMATCHED = "unmatched"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            # One count per bucket plus +Inf, then the sum
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, name: str, help_text: str, label_names: Tuple[str, ...]) -> list:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            base = _labels(label_names, labels)
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                running += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{{{base}{',' if base else ''}le=\"{le}\"}} {running}")
+            lines.append(f"{name}_sum{{{base}}} {series[-1]:.9g}")
+            lines.append(f"{name}_count{{{base}}} {running}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _counter(name: str, help_text: str, label_names: Tuple[str, ...], series: dict) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for labels, value in sorted(series.items()):
+        lines.append(f"{name}{{{_labels(label_names, labels)}}} {value:g}")
+    return lines
+
+
+class RequestStats:
+    """Mongo commands issued on behalf of one request: name -> [count, seconds, failures]"""
+    __slots__ = ("commands", "command_seconds", "by_command")
+
+    def __init__(self):
+        self.commands = 0
+        self.command_seconds = 0.0
+        self.by_command: Dict[str, list] = {}
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+async def outside_request(awaitable):
+    """Await ``awaitable`` with its Mongo commands counted as background work.
+
+    Wrap coroutines passed to ``asyncio.create_task`` from a request: the
+    task gets a copy of the request's context, and this clears the stats in
+    that copy only.
+    """
+    _current.set(None)
+    return await awaitable
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[tuple, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.round_trips = Histogram(ROUND_TRIP_BUCKETS)
+        self.in_progress = 0
+        self.commands: Dict[tuple, int] = {}
+        self.command_seconds: Dict[tuple, float] = {}
+        self.command_failures: Dict[tuple, int] = {}
+        self.command_latency = Histogram(COMMAND_BUCKETS)
+
+    def _add_commands(self, method: str, route: str, name: str, count: int, seconds: float, failures: int) -> None:
+        key = (method, route, name)
+        self.commands[key] = self.commands.get(key, 0) + count
+        self.command_seconds[key] = self.command_seconds.get(key, 0.0) + seconds
+        if failures:
+            self.command_failures[key] = self.command_failures.get(key, 0) + failures
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self.lock:
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe((method, route), seconds)
+            self.round_trips.observe((method, route), stats.commands)
+            for name, (count, command_seconds, failures) in stats.by_command.items():
+                self._add_commands(method, route, name, count, command_seconds, failures)
+
+    def record_command(self, name: str, seconds: float, failed: bool) -> None:
+        # Commands of a request are attributed to its route when it finishes
+        stats = _current.get()
+        with self.lock:
+            self.command_latency.observe((name,), seconds)
+            if stats is None:
+                self._add_commands(*BACKGROUND, name, 1, seconds, int(failed))
+                return
+            stats.commands += 1
+            stats.command_seconds += seconds
+            entry = stats.by_command.get(name)
+            if entry is None:
+                entry = stats.by_command[name] = [0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += int(failed)
+
+    def render(self) -> str:
+        route = ("method", "route")
+        command = ("method", "route", "command")
+        with self.lock:
+            lines = _counter("http_requests_total", "HTTP requests by route and status code.",
+                             ("method", "route", "status"), self.requests)
+            lines += self.latency.render("http_request_duration_seconds",
+                                         "Time from request start to the end of the response body.", route)
+            lines += self.round_trips.render("http_request_mongo_commands",
+                                             "MongoDB commands issued per request.", route)
+            lines += ["# HELP http_requests_in_progress Requests currently being served.",
+                      "# TYPE http_requests_in_progress gauge",
+                      f"http_requests_in_progress {self.in_progress}"]
+            lines += _counter("mongo_commands_total", "MongoDB commands by the route that issued them.",
+                              command, self.commands)
+            lines += _counter("mongo_command_failures_total", "Failed MongoDB commands by route.",
+                              command, self.command_failures)
+            lines += _counter("mongo_command_seconds_total", "Time spent in MongoDB commands by route.",
+                              command, self.command_seconds)
+            lines += self.command_latency.render("mongo_command_duration_seconds",
+                                                 "MongoDB command round-trip time.", ("command",))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """pymongo listener feeding the registry; runs on Motor's executor threads"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        registry.record_command(event.command_name, event.duration_micros / 1e6, False)
+
+    def failed(self, event):
+        registry.record_command(event.command_name, event.duration_micros / 1e6, True)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and Mongo round trips per route"""
+
+    def __init__(self, app, slow_ms: float = 1000.0):
+        self.app = app
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        status = 500
+        streamed = False
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status, streamed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and message.get("more_body"):
+                streamed = True
+            await send(message)
+
+        start = time.perf_counter()
+        with registry.lock:
+            registry.in_progress += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - start
+            _current.reset(token)
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED)
+            method = scope["method"]
+            with registry.lock:
+                registry.in_progress -= 1
+            registry.record_request(method, path, status, seconds, stats)
+            if seconds * 1000 >= self.slow_ms and not streamed:
+                logger.warning(
+                    "Slow request %s %s (%s): %.0f ms, status %s, %d Mongo commands in %.0f ms: %s",
+                    method, scope["path"], path, seconds * 1000, status, stats.commands,
+                    stats.command_seconds * 1000,
+                    ", ".join(f"{name} x{entry[0]}" for name, entry in stats.by_command.items()) or "none"
+                )
@@ -0,0 +1,60 @@
+"""Money helpers.
+
+Amounts are stored as integer cents; display strings such as ``"$12.5M"``
+are parsed once at write time and produced again only for responses.
+"""
+import math
+from typing import Optional, Union
+
+_SUFFIXES = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+
+# Cents are stored as BSON int64
+MAX_CENTS = 2 ** 63 - 1
+
+
+def _cents(cents: Union[int, float]) -> Optional[int]:
+    if isinstance(cents, float):
+        if not math.isfinite(cents):
+            return None
+        cents = int(round(cents))
+    return cents if abs(cents) <= MAX_CENTS else None
+
+
+def parse_money(value: Union[str, int, float, None]) -> Optional[int]:
+    """Convert ``"$12.5M"``, ``"$336K"``, ``"$1,250"`` or a number of dollars to cents.
+
+    Returns None for anything that is not a finite amount fitting in int64 cents.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return _cents(value * 100)
+    text = value.strip().replace("$", "").replace(",", "").upper()
+    if not text:
+        return None
+    multiplier = 1
+    if text[-1] in _SUFFIXES:
+        multiplier = _SUFFIXES[text[-1]]
+        text = text[:-1]
+    try:
+        return _cents(float(text) * multiplier * 100)
+    except ValueError:
+        return None
+
+
+def format_millions(cents: Optional[int], places: int = 1) -> str:
+    """Format cents the way the UI displays large amounts, e.g. ``"$12.5M"``"""
+    return f"${(cents or 0) / 100_000_000:.{places}f}M"
+
+
+def format_compact(cents: Optional[int]) -> str:
+    """Format cents with a K/M/B suffix, e.g. ``"$336K"`` or ``"$1.2M"``"""
+    dollars = abs(cents or 0) / 100
+    sign = "-" if (cents or 0) < 0 else ""
+    if dollars >= 999_950_000:
+        return f"{sign}${dollars / 1e9:.1f}B"
+    if dollars >= 999_500:
+        return f"{sign}${dollars / 1e6:.1f}M"
+    if dollars >= 1_000:
+        return f"{sign}${dollars / 1e3:.0f}K"
+    return f"{sign}${dollars:.0f}"
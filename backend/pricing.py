@@ -0,0 +1,136 @@
+"""Vectorized what-if pricing.
+
+The rating formula matches the What-If page:
+
+    premium = limit x base rate x rate factor / (1 + deductible in $M / 100)
+
+All amounts are integer cents. Every function accepts NumPy arrays and
+broadcasts, so a whole grid of limits and deductibles for every coverage
+of a LOB is priced in one call.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from money import format_millions, parse_money
+
+BASE_RATE = 0.025
+DEFAULT_DEDUCTIBLE_CENTS = 500_000_000  # $5M, the What-If page's starting deductible
+CENTS_PER_MILLION = 100_000_000
+
+DEFAULT_LIMIT_FACTORS = [round(0.5 + 0.1 * i, 1) for i in range(11)]
+DEFAULT_DEDUCTIBLES_M = [0.0, 1.0, 2.5, 5.0, 10.0, 25.0]
+MAX_SURFACE_POINTS = 10_000
+
+# Saved totals may differ from the server's figure by the UI's $0.01M rounding
+PREMIUM_TOLERANCE_CENTS = 1_000_000
+
+
+class PricingError(ValueError):
+    pass
+
+
+def premium_cents(limit_cents, deductible_cents, base_rate: float = BASE_RATE, rate_factor=1.0) -> np.ndarray:
+    """Premium in cents for broadcastable arrays of limits and deductibles"""
+    limit = np.asarray(limit_cents, dtype=np.float64)
+    deductible_m = np.asarray(deductible_cents, dtype=np.float64) / CENTS_PER_MILLION
+    premium = limit * base_rate * np.asarray(rate_factor, dtype=np.float64) / (1.0 + deductible_m / 100.0)
+    return np.rint(premium).astype(np.int64)
+
+
+def premium_surface(
+    limit_cents: Sequence[int],
+    limit_factors: Sequence[float],
+    deductible_cents: Sequence[int],
+    base_rate: float = BASE_RATE
+) -> np.ndarray:
+    """Price each coverage at every (limit factor, deductible) point.
+
+    Returns an int64 array shaped (coverages, limit factors, deductibles).
+    """
+    limits = np.asarray(limit_cents, dtype=np.float64)[:, None, None]
+    factors = np.asarray(limit_factors, dtype=np.float64)[None, :, None]
+    deductibles = np.asarray(deductible_cents, dtype=np.float64)[None, None, :]
+    return premium_cents(limits * factors, deductibles, base_rate)
+
+
+def coverage_limits(coverages: List[dict]) -> np.ndarray:
+    limits = []
+    for coverage in coverages:
+        cents = parse_money(coverage.get("limit"))
+        if cents is None:
+            raise PricingError(f"Coverage '{coverage.get('name')}' has no numeric limit")
+        limits.append(cents)
+    return np.asarray(limits, dtype=np.int64)
+
+
+def price_coverages(coverages: List[dict], base_rate: float = BASE_RATE) -> Tuple[List[dict], int]:
+    """Recompute every coverage's premium; returns the priced coverages and total cents"""
+    if not coverages:
+        return [], 0
+    limits = coverage_limits(coverages)
+    deductibles = []
+    for coverage in coverages:
+        if coverage.get("deductible") is None:
+            deductibles.append(DEFAULT_DEDUCTIBLE_CENTS)
+            continue
+        cents = parse_money(coverage["deductible"])
+        if cents is None:
+            raise PricingError(f"Coverage '{coverage.get('name')}' has no numeric deductible")
+        deductibles.append(cents)
+    premiums = premium_cents(limits, deductibles, base_rate)
+
+    priced = []
+    for coverage, premium in zip(coverages, premiums.tolist()):
+        priced.append({
+            **coverage,
+            "premium": format_millions(premium, 2),
+            "premiumCents": premium
+        })
+    return priced, int(premiums.sum())
+
+
+def reprice_batch(items: List[Tuple[tuple, List[dict]]], rate_factor: float, base_rate: float = BASE_RATE):
+    """Reprice many (key, coverages) pairs in one vectorized pass.
+
+    Runs in a worker process, so it only takes and returns plain data.
+    Returns ``(key, priced coverages, total cents)`` for each item that
+    could be priced and the keys of those that could not.
+    """
+    limits: List[int] = []
+    deductibles: List[int] = []
+    offsets = [0]
+    priceable = []
+    skipped = []
+    for key, coverages in items:
+        try:
+            item_limits = coverage_limits(coverages).tolist()
+            item_deductibles = [
+                DEFAULT_DEDUCTIBLE_CENTS if c.get("deductible") is None else parse_money(c["deductible"])
+                for c in coverages
+            ]
+        except PricingError:
+            skipped.append(key)
+            continue
+        if not coverages or None in item_deductibles:
+            skipped.append(key)
+            continue
+        limits.extend(item_limits)
+        deductibles.extend(item_deductibles)
+        offsets.append(len(limits))
+        priceable.append((key, coverages))
+
+    if not priceable:
+        return [], skipped
+    premiums = premium_cents(limits, deductibles, base_rate, rate_factor)
+    totals = np.add.reduceat(premiums, offsets[:-1])
+
+    results = []
+    for index, (key, coverages) in enumerate(priceable):
+        item_premiums = premiums[offsets[index]:offsets[index + 1]].tolist()
+        priced = [
+            {**coverage, "premium": format_millions(premium, 2), "premiumCents": premium}
+            for coverage, premium in zip(coverages, item_premiums)
+        ]
+        results.append((key, priced, int(totals[index])))
+    return results, skipped
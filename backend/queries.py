@@ -0,0 +1,96 @@
+"""MongoDB filters and sorts shared by the API handlers and the index check.
+
+Handlers build their queries with these functions and ``indexes.HOT_QUERIES``
+explains queries built by the same functions, so the collection-scan check
+follows the handlers when a query changes. Request parsing and HTTP errors
+stay in the handlers; everything here takes already-typed values.
+"""
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+EARTH_RADIUS_MILES = 3963.2
+
+
+def match_all(filters: List[dict]) -> dict:
+    """One filter requiring every filter in ``filters``"""
+    if not filters:
+        return {}
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+
+def proposal_filters(
+    status: Optional[str] = None,
+    min_tiv_cents: Optional[int] = None,
+    max_tiv_cents: Optional[int] = None,
+    effective_from: Optional[datetime] = None,
+    effective_to: Optional[datetime] = None,
+) -> List[dict]:
+    """Status and range filters over the typed insured value and effective date"""
+    filters = []
+    if status and status != "all":
+        filters.append({"status": status})
+    for field, op, value in (
+        ("totalInsuredValueCents", "$gte", min_tiv_cents),
+        ("totalInsuredValueCents", "$lte", max_tiv_cents),
+        ("effectiveOn", "$gte", effective_from),
+        ("effectiveOn", "$lte", effective_to),
+    ):
+        if value is not None:
+            filters.append({field: {op: value}})
+    return filters
+
+
+def proposal_sort(sort: str, order: str) -> List[Tuple[str, int]]:
+    direction = -1 if order == "desc" else 1
+    return [(sort, direction), ("id", direction)]
+
+
+def keyset_after(sort: str, order: str, value: Any, last_id: str) -> dict:
+    """Rows strictly after the (sort key, id) pair ending the previous page.
+
+    MongoDB sorts a missing or null key before every value, and range
+    operators never match null, so nulls are matched explicitly: ascending
+    they come first, descending last.
+    """
+    op = "$lt" if order == "desc" else "$gt"
+    if value is None:
+        after = [{sort: None, "id": {op: last_id}}]
+        if order != "desc":
+            after.append({sort: {"$ne": None}})
+        return {"$or": after}
+    after = [{sort: {op: value}}, {sort: value, "id": {op: last_id}}]
+    if order == "desc":
+        after.append({sort: None})
+    return {"$or": after}
+
+
+def property_filters(state: Optional[str] = None, lob: Optional[str] = None,
+                     customer_id: Optional[str] = None) -> dict:
+    """UWR_C property list filters; "All" means no filter"""
+    query = {}
+    if state and state != "All":
+        query["state"] = state
+    if lob and lob != "All":
+        query["lobs"] = lob
+    if customer_id and customer_id != "All":
+        query["customerId"] = customer_id
+    return query
+
+
+# Exports page through properties in id order
+PROPERTY_EXPORT_SORT = [("id", 1)]
+
+
+def within_radius(lat: float, lng: float, radius_miles: float) -> dict:
+    return {"location": {"$geoWithin": {"$centerSphere": [[lng, lat], radius_miles / EARTH_RADIUS_MILES]}}}
+
+
+# Workers take the oldest queued document, or one whose lease ran out
+DOCUMENT_CLAIM_SORT = [("queuedAt", 1)]
+
+
+def document_claim_filter(now: datetime) -> dict:
+    return {"$or": [
+        {"status": "queued"},
+        {"status": "processing", "leaseExpiresAt": {"$lt": now}},
+    ]}
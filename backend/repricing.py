@@ -0,0 +1,163 @@
+"""Portfolio repricing jobs.
+
+A job applies a rate factor (e.g. 1.08 for "+8% base rate") to every
+property/LOB pair matching its filters. Properties are read in chunks;
+each chunk's coverages are priced on a process pool by
+``pricing.reprice_batch`` and written back to ``whatif`` with one
+unordered bulk write. Progress is recorded on the job document in
+``repricing_jobs`` after every chunk, which is what the progress stream
+polls.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from money import format_millions
+from pricing import reprice_batch
+from typed_fields import with_typed_fields
+
+logger = logging.getLogger(__name__)
+
+REPRICING_WORKERS = int(os.environ.get('REPRICING_WORKERS', str(os.cpu_count() or 2)))
+REPRICING_CHUNK_SIZE = int(os.environ.get('REPRICING_CHUNK_SIZE', '500'))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    # Spawned workers only import the pricing module, not the web app
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=REPRICING_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def property_query(filters: dict) -> dict:
+    query = {}
+    if filters.get("state"):
+        query["state"] = filters["state"]
+    if filters.get("customerId"):
+        query["customerId"] = filters["customerId"]
+    if filters.get("lobs"):
+        query["lobs"] = {"$in": filters["lobs"]}
+    return query
+
+
+async def _reprice_chunk(db, job: dict, properties: list) -> dict:
+    wanted_lobs = set(job["filters"].get("lobs") or [])
+    pairs = [
+        (prop["id"], lob) for prop in properties for lob in prop.get("lobs", [])
+        if not wanted_lobs or lob in wanted_lobs
+    ]
+    property_ids = [prop["id"] for prop in properties]
+    by_property = {"propertyId": {"$in": property_ids}}
+    exposures, whatifs = await asyncio.gather(
+        db.exposures.find(by_property, {"_id": 0, "propertyId": 1, "lob": 1, "coverages": 1}).to_list(None),
+        db.whatif.find(by_property, {"_id": 0, "propertyId": 1, "lob": 1, "coverages": 1, "totalPremiumCents": 1}).to_list(None)
+    )
+    exposure_by_key = {(doc["propertyId"], doc["lob"]): doc for doc in exposures}
+    whatif_by_key = {(doc["propertyId"], doc["lob"]): doc for doc in whatifs}
+
+    # Reprice the underwriter's saved selections where they exist
+    items = []
+    premium_before = 0
+    for key in pairs:
+        source = whatif_by_key.get(key) or exposure_by_key.get(key)
+        if source and source.get("coverages"):
+            items.append((key, source["coverages"]))
+            premium_before += (whatif_by_key.get(key) or {}).get("totalPremiumCents") or 0
+
+    loop = asyncio.get_running_loop()
+    results, skipped = await loop.run_in_executor(
+        get_pool(), partial(reprice_batch, items, job["rateFactor"])
+    )
+
+    if results and not job.get("dryRun"):
+        now = datetime.now(timezone.utc).isoformat()
+        await db.whatif.bulk_write([
+            UpdateOne(
+                {"propertyId": property_id, "lob": lob},
+                {"$set": with_typed_fields("whatif", {
+                    "propertyId": property_id,
+                    "lob": lob,
+                    "coverages": coverages,
+                    "totalPremiumCents": total,
+                    "totalPremium": format_millions(total, 2),
+                    "rateFactor": job["rateFactor"],
+                    "repricingJobId": job["id"],
+                    "updatedAt": now
+                })},
+                upsert=True
+            )
+            for (property_id, lob), coverages, total in results
+        ], ordered=False)
+
+    return {
+        "processedProperties": len(properties),
+        "repriced": len(results),
+        "skipped": len(skipped) + len(pairs) - len(items),
+        "premiumBeforeCents": premium_before,
+        "premiumAfterCents": sum(total for _, _, total in results)
+    }
+
+
+async def run_repricing_job(db, job_id: str) -> None:
+    job = await db.repricing_jobs.find_one({"id": job_id}, {"_id": 0})
+    query = property_query(job["filters"])
+    try:
+        total = await db.properties.count_documents(query)
+        await db.repricing_jobs.update_one({"id": job_id}, {"$set": {
+            "status": "running",
+            "totalProperties": total,
+            "startedAt": datetime.now(timezone.utc).isoformat()
+        }})
+
+        # Keep a few chunks in flight so reads, pricing and writes overlap
+        in_flight = asyncio.Semaphore(REPRICING_WORKERS * 2)
+        tasks = []
+
+        async def process(chunk):
+            try:
+                progress = await _reprice_chunk(db, job, chunk)
+                await db.repricing_jobs.update_one({"id": job_id}, {"$inc": progress})
+            finally:
+                in_flight.release()
+
+        chunk = []
+        cursor = db.properties.find(query, {"_id": 0, "id": 1, "lobs": 1}).batch_size(REPRICING_CHUNK_SIZE)
+        async for prop in cursor:
+            chunk.append(prop)
+            if len(chunk) >= REPRICING_CHUNK_SIZE:
+                await in_flight.acquire()
+                tasks.append(asyncio.create_task(process(chunk)))
+                chunk = []
+        if chunk:
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(process(chunk)))
+        await asyncio.gather(*tasks)
+
+        await db.repricing_jobs.update_one({"id": job_id}, {"$set": {
+            "status": "completed",
+            "finishedAt": datetime.now(timezone.utc).isoformat()
+        }})
+    except Exception as exc:
+        logger.exception("Repricing job %s failed", job_id)
+        await db.repricing_jobs.update_one({"id": job_id}, {"$set": {
+            "status": "failed",
+            "error": str(exc),
+            "finishedAt": datetime.now(timezone.utc).isoformat()
+        }})
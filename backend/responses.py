@@ -0,0 +1,29 @@
+"""Fast JSON responses for large lists of trusted documents.
+
+By default FastAPI validates a handler's return value against its
+``response_model``, dumps it to plain Python and encodes that with the
+standard ``json`` module, once per document. For documents read straight
+from MongoDB with a projection matching the model, that work re-checks
+data the database already shaped. Handlers opt in by returning a
+``FastJSONResponse``, which encodes the documents to bytes in one call.
+FastAPI passes a returned ``Response`` through untouched, so
+``response_model`` still documents the endpoint.
+
+Encoding uses ``orjson``, which also handles the datetimes stored in
+documents.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,111 @@
+"""Materialized statistics kept in the ``counters`` collection.
+
+Counters are adjusted with ``$inc`` alongside each write so dashboards can
+read them with a single ``_id`` lookup. The writes are not transactional
+with the documents they count, so a periodic reconciliation recomputes them
+from the source collection with an aggregation.
+
+The UWR_C rollup is not adjusted per write: properties are written by
+loaders outside the API, and change events carry no pre-image to diff
+against. It is rebuilt whole, ``UWRC_ROLLUP_REBUILD_SECONDS`` after
+property changes arrive on the change stream, or, without change streams,
+when read once older than that. It can therefore lag the properties by
+about that long. ``/api/uwrc/statistics`` reports when it was built as
+``asOf``.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+from money import parse_money
+
+PROPOSAL_COUNTER_ID = "proposal_statistics"
+
+
+async def count_proposals_by_status(proposals) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    async for row in proposals.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+        if row["_id"] is not None:
+            counts[row["_id"]] = row["count"]
+    return counts
+
+
+async def read_proposal_counters(counters) -> Optional[Dict[str, int]]:
+    doc = await counters.find_one({"_id": PROPOSAL_COUNTER_ID}, {"byStatus": 1})
+    if doc is None:
+        return None
+    return {status: count for status, count in doc.get("byStatus", {}).items() if count}
+
+
+async def record_proposal_status(counters, old: Optional[str], new: Optional[str]) -> None:
+    """Move one proposal between status buckets; ``None`` means created or deleted"""
+    if old == new:
+        return
+    inc = {}
+    if old is not None:
+        inc[f"byStatus.{old}"] = -1
+    if new is not None:
+        inc[f"byStatus.{new}"] = 1
+    await counters.update_one({"_id": PROPOSAL_COUNTER_ID}, {"$inc": inc}, upsert=True)
+
+
+async def adjust_proposal_counters(counters, deltas: Dict[str, int]) -> None:
+    """Apply the net per-status changes of a batch of writes in one update"""
+    inc = {f"byStatus.{status}": count for status, count in deltas.items() if count}
+    if inc:
+        await counters.update_one({"_id": PROPOSAL_COUNTER_ID}, {"$inc": inc}, upsert=True)
+
+
+async def reconcile_proposal_counters(proposals, counters) -> Dict[str, int]:
+    """Recompute the status counters from the proposals collection"""
+    counts = await count_proposals_by_status(proposals)
+    await counters.replace_one(
+        {"_id": PROPOSAL_COUNTER_ID},
+        {"byStatus": counts, "reconciledAt": datetime.now(timezone.utc).isoformat()},
+        upsert=True
+    )
+    return counts
+
+
+UWRC_ROLLUP_ID = "uwrc_statistics"
+
+
+async def backfill_property_premiums(properties, batch_size: int = 1000) -> int:
+    """Store ``premiumCents`` on properties that only carry the display string"""
+    updated = 0
+    batch = []
+    cursor = properties.find({"premiumCents": {"$exists": False}}, {"_id": 1, "premium": 1})
+    async for doc in cursor.batch_size(batch_size):
+        cents = parse_money(doc.get("premium")) or 0
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"premiumCents": cents}}))
+        if len(batch) >= batch_size:
+            updated += (await properties.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await properties.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+
+async def rebuild_uwrc_rollup(properties, counters) -> dict:
+    """Recompute the UWR_C dashboard rollup in one aggregation"""
+    pipeline = [{"$facet": {
+        "byType": [{"$group": {"_id": "$type", "count": {"$sum": 1}}}],
+        "byStatus": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+        "totals": [{"$group": {"_id": None, "count": {"$sum": 1}, "premiumCents": {"$sum": "$premiumCents"}}}]
+    }}]
+    result = (await properties.aggregate(pipeline).to_list(1))[0]
+    totals = result["totals"][0] if result["totals"] else {"count": 0, "premiumCents": 0}
+    rollup = {
+        "byType": {row["_id"]: row["count"] for row in result["byType"] if row["_id"] is not None},
+        "byStatus": {row["_id"]: row["count"] for row in result["byStatus"] if row["_id"] is not None},
+        "count": totals["count"],
+        "premiumCents": totals["premiumCents"],
+        "reconciledAt": datetime.now(timezone.utc).isoformat()
+    }
+    await counters.replace_one({"_id": UWRC_ROLLUP_ID}, rollup, upsert=True)
+    return rollup
+
+
+async def read_uwrc_rollup(counters) -> Optional[dict]:
+    return await counters.find_one({"_id": UWRC_ROLLUP_ID}, {"_id": 0})
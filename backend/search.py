@@ -0,0 +1,237 @@
+"""Proposal search index.
+
+Every proposal carries two derived, indexed arrays built from its title,
+client and location:
+
+- ``searchTokens``: normalized words, queried with anchored prefix regexes
+  (``^term``) that MongoDB answers from the multikey index.
+- ``searchGrams``: padded trigrams of those words, used to find fuzzy
+  candidates when the prefix lookup comes up short. Lookups match on the
+  query's interior trigrams and require half of them to be shared, so a
+  typo reads a few narrow index ranges rather than every token that starts
+  with the same letter.
+
+Candidates are ranked in Python by how well each query term matches the
+document's tokens (exact > prefix > trigram similarity). The database
+orders them first, prefix matches by how many terms match a token exactly
+and fuzzy ones by how many trigrams they share, so the bounded candidate
+sets hold the best matches however common a prefix is.
+
+``searchParts`` keeps each field's own tokens and trigrams, so an update
+changing some of the fields rebuilds both arrays inside MongoDB (see
+``search_update``) without first reading the fields it leaves alone.
+"""
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+from pymongo import UpdateOne
+
+SEARCH_FIELDS = ("title", "client", "location")
+SEARCH_PROJECTION = {"searchTokens": 0, "searchGrams": 0, "searchParts": 0}
+
+# Fuzzy matching only considers this many trigram candidates, the ones
+# sharing the most trigrams, which keeps the lookup bounded on large collections.
+FUZZY_CANDIDATES = 500
+FUZZY_THRESHOLD = 0.4
+# Share of the query's trigrams a fuzzy candidate must contain
+FUZZY_MIN_OVERLAP = 0.5
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in normalize(text).split(" ") if t]
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _search_part(text: str) -> Dict[str, List[str]]:
+    tokens = list(dict.fromkeys(tokenize(text)))
+    grams: Set[str] = set()
+    for token in tokens:
+        grams |= trigrams(token)
+    return {"tokens": tokens, "grams": sorted(grams)}
+
+
+def build_search_fields(doc: dict) -> dict:
+    """Derive the indexed search arrays for a proposal document"""
+    parts = {field: _search_part(doc.get(field, "")) for field in SEARCH_FIELDS}
+    tokens: List[str] = []
+    grams: Set[str] = set()
+    for part in parts.values():
+        tokens += [token for token in part["tokens"] if token not in tokens]
+        grams.update(part["grams"])
+    return {"searchTokens": tokens, "searchGrams": sorted(grams), "searchParts": parts}
+
+
+def search_update(changes: dict) -> List[dict]:
+    """An update pipeline setting ``changes`` and, if they touch a search field, the search arrays.
+
+    The arrays are the union of every field's part, the changed fields' parts
+    computed here and the others' read from the stored document. A document
+    indexed before parts were stored contributes its whole old arrays until
+    ``rebuild_search_index`` runs, so it may match too much but never too little.
+    """
+    values = {key: {"$literal": value} for key, value in changes.items()}
+    changed = [field for field in SEARCH_FIELDS if field in changes]
+    if not changed:
+        return [{"$set": values}]
+    for field in changed:
+        values[f"searchParts.{field}"] = {"$literal": _search_part(changes[field])}
+    return [
+        {"$set": values},
+        {"$set": {
+            array: {"$setUnion": [
+                {"$ifNull": [f"$searchParts.{field}.{key}", {"$ifNull": [f"${array}", []]}]} for field in SEARCH_FIELDS
+            ]}
+            for array, key in (("searchTokens", "tokens"), ("searchGrams", "grams"))
+        }},
+    ]
+
+
+def prefix_query(terms: Iterable[str]) -> dict:
+    """Every query term must prefix one of the document's tokens"""
+    return {"$and": [{"searchTokens": {"$regex": f"^{re.escape(t)}"}} for t in terms]}
+
+
+def query_grams(terms: Iterable[str]) -> List[str]:
+    """The trigrams a fuzzy lookup matches on.
+
+    Padded word-start and word-end grams such as ``"  a"`` or ``" ab"`` are
+    shared by a large fraction of all tokens, so each term contributes only
+    its interior grams; terms too short to have any keep the padded ones.
+    """
+    grams: Set[str] = set()
+    for term in terms:
+        padded = trigrams(term)
+        grams |= {gram for gram in padded if " " not in gram} or padded
+    return sorted(grams)
+
+
+def fuzzy_min_rank(grams: List[str]) -> int:
+    return max(1, math.ceil(len(grams) * FUZZY_MIN_OVERLAP))
+
+
+def fuzzy_query(terms: Iterable[str]) -> dict:
+    return {"searchGrams": {"$in": query_grams(terms)}}
+
+
+def _ranked_pipeline(query: dict, field: str, values: List[str], limit: int, projection: dict,
+                     tie_break: str = "title", min_rank: int = 0) -> List[dict]:
+    """Match ``query``, then keep the ``limit`` documents whose ``field`` shares the most ``values``.
+
+    Documents sharing fewer than ``min_rank`` values are dropped. With
+    ``tie_break="_size"``, of equally ranked documents those with the
+    shortest ``field`` come first: more of it matched.
+    """
+    if any(value == 0 for key, value in projection.items() if key != "_id"):
+        projection = {**projection, "_rank": 0, "_size": 0}
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {
+            "_rank": {"$size": {"$filter": {"input": f"${field}", "cond": {"$in": ["$$this", values]}}}},
+            "_size": {"$size": f"${field}"}
+        }},
+    ]
+    if min_rank:
+        pipeline.append({"$match": {"_rank": {"$gte": min_rank}}})
+    return pipeline + [
+        {"$sort": {"_rank": -1, tie_break: 1}},
+        {"$limit": limit},
+        {"$project": projection},
+    ]
+
+
+def _similarity(a: str, b: str) -> float:
+    ga, gb = trigrams(a), trigrams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+def score(terms: List[str], tokens: List[str]) -> float:
+    """Average best-match score of each query term against the document tokens"""
+    if not terms or not tokens:
+        return 0.0
+    total = 0.0
+    for term in terms:
+        best = 0.0
+        for token in tokens:
+            if token == term:
+                best = 1.0
+                break
+            if token.startswith(term):
+                best = max(best, 0.8)
+            else:
+                best = max(best, min(_similarity(term, token), 0.75))
+        total += best
+    return total / len(terms)
+
+
+async def search_proposals(
+    collection, search: str, base_query: dict, limit: int, fields: Optional[Iterable[str]] = None
+) -> List[dict]:
+    """Return up to ``limit`` proposals matching ``search``, best match first.
+
+    ``fields`` restricts the returned documents to those fields.
+    """
+    terms = tokenize(search)
+    if not terms:
+        return []
+
+    if fields is None:
+        projection = {"_id": 0, "searchGrams": 0, "searchParts": 0}
+    else:
+        projection = {"_id": 0, "searchTokens": 1, **{field: 1 for field in fields}}
+    # Every prefix match scores by how many terms equal a token, then title,
+    # so the first ``limit`` in that order are the best prefix matches
+    prefix = {"$and": [base_query, prefix_query(terms)]} if base_query else prefix_query(terms)
+    candidates = await collection.aggregate(
+        _ranked_pipeline(prefix, "searchTokens", sorted(set(terms)), limit, projection)
+    ).to_list(limit)
+
+    # Fall back to trigram overlap for typos and partial words
+    if len(candidates) < limit:
+        seen = {c["id"] for c in candidates}
+        fuzzy = {"$and": [base_query, fuzzy_query(terms)]} if base_query else fuzzy_query(terms)
+        grams = query_grams(terms)
+        pipeline = _ranked_pipeline(fuzzy, "searchGrams", grams, FUZZY_CANDIDATES, projection, "_size",
+                                    fuzzy_min_rank(grams))
+        async for doc in collection.aggregate(pipeline):
+            if doc["id"] not in seen:
+                candidates.append(doc)
+
+    ranked = []
+    for doc in candidates:
+        relevance = score(terms, doc.pop("searchTokens", []))
+        if relevance >= FUZZY_THRESHOLD:
+            ranked.append((relevance, doc))
+    ranked.sort(key=lambda item: (-item[0], item[1].get("title", "")))
+    return [doc for _, doc in ranked[:limit]]
+
+
+async def rebuild_search_index(collection, batch_size: int = 1000) -> int:
+    """Backfill the search arrays and parts on every proposal; returns the number updated"""
+    updated = 0
+    batch = []
+    projection = {"_id": 1, **{f: 1 for f in SEARCH_FIELDS}}
+    async for doc in collection.find({}, projection).batch_size(batch_size):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": build_search_fields(doc)}))
+        if len(batch) >= batch_size:
+            result = await collection.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await collection.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    return updated
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -6,17 +7,64 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+import asyncio
+import base64
+import json
 import uuid
+from urllib.parse import quote
 from datetime import datetime, timezone
 
+from assessment import EXPOSURE_INPUT_PROJECTION, AssessmentCache, assessment_key, build_full_assessment
+from auth import (
+    create_token, decode_token, hash_password, is_revoked, revoke, shutdown_hashing, user_from_claims,
+    verify_password
+)
+from blobstore import BlobTooLarge, BlobWriter, format_size, get_blob, read_blob, release_blob
+from cache import TTLCache
+from catmodel import DEFAULT_YEARS, MAX_YEARS
+from events import EventLog, event_stream, watch_changes
+from documents import (
+    DOCUMENT_QUEUE_LIMIT, DOCUMENT_WORKERS, document_worker, notify_workers, queue_depth,
+    shutdown_pool as shutdown_document_pool
+)
+from export import EXPORT_FORMATS, stream_export
+from geo import accumulation, coordinates, hotspots
+from indexes import PROPOSAL_SORT_FIELDS, find_collection_scans, reconcile_indexes
+from metrics import CommandMetrics, MetricsMiddleware, outside_request, registry as metrics_registry
+from money import format_millions, parse_money
+from pricing import (
+    BASE_RATE, DEFAULT_DEDUCTIBLES_M, DEFAULT_LIMIT_FACTORS, MAX_SURFACE_POINTS, PREMIUM_TOLERANCE_CENTS,
+    PricingError, coverage_limits, premium_surface, price_coverages
+)
+from queries import PROPERTY_EXPORT_SORT, keyset_after, match_all, property_filters, proposal_filters, proposal_sort
+from repricing import TERMINAL_STATUSES, run_repricing_job, shutdown_pool
+from responses import FastJSONResponse
+from rollups import (
+    adjust_proposal_counters, count_proposals_by_status, read_proposal_counters, read_uwrc_rollup,
+    rebuild_uwrc_rollup, reconcile_proposal_counters, record_proposal_status
+)
+from search import (
+    SEARCH_PROJECTION, build_search_fields, prefix_query, rebuild_search_index, search_proposals, search_update,
+    tokenize
+)
+from synthetic import DATA_COLLECTIONS, DEFAULT_SEED, populate
+from typed_fields import parse_date, typed_values, with_typed_fields
+from uploads import FilePart, UploadError, stream_file_field
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Per-route request timings and Mongo command counts, served at /api/metrics
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '1000'))
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[CommandMetrics()] if METRICS_ENABLED else [])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -27,6 +75,47 @@ api_router = APIRouter(prefix="/api")
 
 security = HTTPBearer(auto_error=False)
 
+# Maintain O(1) statistics counters alongside proposal writes and reconcile
+# them from the collection every STATISTICS_RECONCILE_SECONDS
+STATISTICS_COUNTERS = os.environ.get('STATISTICS_COUNTERS', 'false').lower() == 'true'
+STATISTICS_RECONCILE_SECONDS = int(os.environ.get('STATISTICS_RECONCILE_SECONDS', '300'))
+
+# Fail startup when a hot query would scan a whole collection (dev/test)
+INDEX_CHECK = os.environ.get('INDEX_CHECK', 'false').lower() == 'true'
+
+background_tasks: List[asyncio.Task] = []
+
+# UWR_C filter facets change only when properties are written; the TTL is a
+# backstop for writes made outside this process
+FILTER_CACHE_SECONDS = float(os.environ.get('FILTER_CACHE_SECONDS', '300'))
+filter_cache = TTLCache(maxsize=1, ttl=FILTER_CACHE_SECONDS)
+
+# Portfolio hotspots scan every location; keep them until properties change
+HOTSPOT_CACHE_SECONDS = float(os.environ.get('HOTSPOT_CACHE_SECONDS', '300'))
+hotspot_cache = TTLCache(maxsize=64, ttl=HOTSPOT_CACHE_SECONDS)
+
+# Rendered full assessments, keyed on a hash of their inputs; optionally
+# persisted to the assessment_cache collection so they survive restarts
+ASSESSMENT_CACHE_BYTES = int(os.environ.get('ASSESSMENT_CACHE_BYTES', str(64 * 1024 * 1024)))
+ASSESSMENT_CACHE_PERSIST = os.environ.get('ASSESSMENT_CACHE_PERSIST', 'false').lower() == 'true'
+assessment_cache = AssessmentCache(
+    ASSESSMENT_CACHE_BYTES, db.assessment_cache if ASSESSMENT_CACHE_PERSIST else None
+)
+
+# Dashboard push channel; fed by change streams when the deployment has them
+EVENTS_CHANGE_STREAMS = os.environ.get('EVENTS_CHANGE_STREAMS', 'true').lower() == 'true'
+STATISTICS_PUSH_SECONDS = float(os.environ.get('STATISTICS_PUSH_SECONDS', '1.0'))
+# Property writes seen on the change stream rebuild the UWR_C rollup once
+# per UWRC_ROLLUP_REBUILD_SECONDS; it is a full aggregation over properties.
+# Without change streams, reads rebuild it once it is older than that.
+UWRC_ROLLUP_REBUILD_SECONDS = float(os.environ.get('UWRC_ROLLUP_REBUILD_SECONDS', '30'))
+event_log = EventLog()
+
+async def invalidate_property_caches(property_id: Optional[str] = None):
+    filter_cache.clear()
+    hotspot_cache.clear()
+    await assessment_cache.invalidate(property_id)
+
 # ============= MODELS =============
 
 # User Models
@@ -97,6 +186,64 @@ class ProposalUpdate(BaseModel):
     effectiveDate: Optional[str] = None
     expirationDate: Optional[str] = None
 
+class ProposalPage(BaseModel):
+    items: List[Proposal]
+    next_cursor: Optional[str] = None
+
+# Exactly the Proposal fields, so list pages can skip response validation
+PROPOSAL_PROJECTION = {"_id": 0, **{name: 1 for name in Proposal.model_fields}}
+
+# Bulk operations are validated one by one so a bad item fails alone
+MAX_BULK_OPERATIONS = 10_000
+
+class BulkProposalRequest(BaseModel):
+    operations: List[dict] = Field(min_length=1, max_length=MAX_BULK_OPERATIONS)
+
+class BulkCreate(BaseModel):
+    op: Literal["create"]
+    proposal: ProposalCreate
+
+class BulkUpdate(BaseModel):
+    op: Literal["update"]
+    id: str
+    changes: ProposalUpdate
+
+class BulkDelete(BaseModel):
+    op: Literal["delete"]
+    id: str
+
+BULK_OPERATION = TypeAdapter(Annotated[Union[BulkCreate, BulkUpdate, BulkDelete], Field(discriminator="op")])
+
+class MultilineQuoteBatchRequest(BaseModel):
+    propertyIds: List[str] = Field(max_length=1000)
+
+class PricingSurfaceRequest(BaseModel):
+    limitFactors: List[float] = Field(default_factory=lambda: list(DEFAULT_LIMIT_FACTORS), min_length=1)
+    deductibles: List[float] = Field(default_factory=lambda: list(DEFAULT_DEDUCTIBLES_M), min_length=1)  # $M
+    baseRate: float = Field(default=BASE_RATE, gt=0)
+
+# Amounts are display strings like "$12.5M" or numbers of dollars
+MoneyInput = Optional[Union[str, int, float]]
+
+class WhatIfCoverage(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    name: Optional[str] = None
+    limit: MoneyInput = None
+    deductible: MoneyInput = None
+
+class WhatIfSave(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    coverages: List[WhatIfCoverage] = []
+    totalPremium: MoneyInput = None
+
+class RepricingJobCreate(BaseModel):
+    name: Optional[str] = None
+    state: Optional[str] = None
+    customerId: Optional[str] = None
+    lobs: List[str] = []
+    rateFactor: float = Field(gt=0)  # e.g. 1.08 for +8% base rate
+    dryRun: bool = False
+
 class Statistics(BaseModel):
     totalSubmissions: int
     pendingSubmissions: int
@@ -109,10 +256,12 @@ class Statistics(BaseModel):
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials:
         return None
-    token = credentials.credentials
-    # Simple token validation (in production, use JWT)
-    user = await db.users.find_one({"id": token}, {"_id": 0})
-    return user
+    # Signed token carries the user fields; only revocations touch the db,
+    # and those lookups are cached
+    claims = decode_token(credentials.credentials)
+    if not claims or await is_revoked(db.revoked_tokens, claims["jti"]):
+        return None
+    return user_from_claims(claims)
 
 @api_router.post("/auth/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
@@ -122,13 +271,23 @@ async def login(login_data: LoginRequest):
         "role": login_data.role
     }, {"_id": 0})
     
-    if not user or user.get("password") != login_data.password:
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    valid, needs_rehash = await verify_password(login_data.password, user.get("password"))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Return user ID as token (simplified - use JWT in production)
+    # Upgrade plaintext or outdated hashes transparently
+    if needs_rehash:
+        await db.users.update_one(
+            {"id": user["id"]},
+            {"$set": {"password": await hash_password(login_data.password)}}
+        )
+    
     return LoginResponse(
         success=True,
-        token=user["id"],
+        token=create_token(user),
         user={
             "id": user["id"],
             "username": user["username"],
@@ -138,6 +297,13 @@ async def login(login_data: LoginRequest):
         }
     )
 
+@api_router.post("/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    claims = decode_token(credentials.credentials) if credentials else None
+    if claims:
+        await revoke(db.revoked_tokens, claims)
+    return {"success": True, "message": "Logged out"}
+
 @api_router.get("/auth/me")
 async def get_me(user = Depends(get_current_user)):
     if not user:
@@ -152,31 +318,131 @@ async def get_me(user = Depends(get_current_user)):
 
 # ============= PROPOSALS =============
 
-@api_router.get("/proposals", response_model=List[Proposal])
+def encode_cursor(sort: str, order: str, value: Any, last_id: str) -> str:
+    payload = json.dumps([sort, order, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        c_sort, c_order, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if c_sort != sort or c_order != order:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+    return value, last_id
+
+def check_proposal_sort(sort: str, order: str):
+    if sort not in PROPOSAL_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(PROPOSAL_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+
+def parse_proposal_filters(status: Optional[str], min_tiv: Optional[str], max_tiv: Optional[str],
+                           effective_from: Optional[str], effective_to: Optional[str]) -> List[dict]:
+    """Parse the list's range parameters into ``queries.proposal_filters``"""
+    def parsed(value: Optional[str], parse, kind: str):
+        if value is None:
+            return None
+        result = parse(value)
+        if result is None:
+            raise HTTPException(status_code=400, detail=f"Invalid {kind}: {value}")
+        return result
+    return proposal_filters(
+        status,
+        parsed(min_tiv, parse_money, "amount"),
+        parsed(max_tiv, parse_money, "amount"),
+        parsed(effective_from, parse_date, "date"),
+        parsed(effective_to, parse_date, "date"),
+    )
+
+def export_response(stream, fmt: str, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream, media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    )
+
+@api_router.get("/proposals", response_model=ProposalPage)
 async def get_proposals(
     status: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    sort: str = "createdAt",
+    order: str = "desc",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    minTiv: Optional[str] = None,
+    maxTiv: Optional[str] = None,
+    effectiveFrom: Optional[str] = None,
+    effectiveTo: Optional[str] = None
 ):
-    query = {}
+    check_proposal_sort(sort, order)
     
-    # Filter by status
-    if status and status != "all":
-        query["status"] = status
+    # Amounts like "$5M" or "5000000"; dates like "10/26/2025" or "2025-10-26"
+    filters = parse_proposal_filters(status, minTiv, maxTiv, effectiveFrom, effectiveTo)
     
-    # Search by title, client, or location
+    # Search by title, client, or location; results are ranked by relevance
+    # rather than paged by sort key
     if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"client": {"$regex": search, "$options": "i"}},
-            {"location": {"$regex": search, "$options": "i"}}
-        ]
+        proposals = await search_proposals(db.proposals, search, match_all(filters), limit, fields=Proposal.model_fields)
+        return FastJSONResponse({"items": proposals, "next_cursor": None})
+    
+    # Resume strictly after the last (sort key, id) pair of the previous page
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort, order)
+        filters.append(keyset_after(sort, order, value, last_id))
+    
+    query = match_all(filters)
+    
+    # Typed sort keys are not Proposal fields; read them for the cursor only
+    projection = PROPOSAL_PROJECTION if sort in PROPOSAL_PROJECTION else {**PROPOSAL_PROJECTION, sort: 1}
+    
+    # Fetch one extra row to know whether another page exists
+    proposals = await db.proposals.find(query, projection) \
+        .sort(proposal_sort(sort, order)) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
     
-    proposals = await db.proposals.find(query, {"_id": 0}).to_list(1000)
-    return proposals
+    next_cursor = None
+    if len(proposals) > limit:
+        proposals = proposals[:limit]
+        last = proposals[-1]
+        next_cursor = encode_cursor(sort, order, last.get(sort), last["id"])
+    if projection is not PROPOSAL_PROJECTION:
+        for proposal in proposals:
+            proposal.pop(sort, None)
+    
+    return FastJSONResponse({"items": proposals, "next_cursor": next_cursor})
+
+# Declared before /proposals/{proposal_id} so "export" is not taken for an id
+@api_router.get("/proposals/export")
+async def export_proposals(
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: str = "createdAt",
+    order: str = "desc",
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    minTiv: Optional[str] = None,
+    maxTiv: Optional[str] = None,
+    effectiveFrom: Optional[str] = None,
+    effectiveTo: Optional[str] = None
+):
+    """Stream every matching proposal as NDJSON or CSV.
+    
+    ``search`` matches word prefixes like the list's indexed search, without
+    its typo tolerance or relevance ranking; rows follow ``sort``.
+    """
+    check_proposal_sort(sort, order)
+    filters = parse_proposal_filters(status, minTiv, maxTiv, effectiveFrom, effectiveTo)
+    if search:
+        terms = tokenize(search)
+        filters.append(prefix_query(terms) if terms else {"id": {"$in": []}})
+    
+    cursor = db.proposals.find(match_all(filters), PROPOSAL_PROJECTION).sort(proposal_sort(sort, order))
+    return export_response(stream_export(cursor, fmt, list(Proposal.model_fields)), fmt, "proposals")
 
 @api_router.get("/proposals/{proposal_id}", response_model=Proposal)
 async def get_proposal(proposal_id: str):
-    proposal = await db.proposals.find_one({"id": proposal_id}, {"_id": 0})
+    proposal = await db.proposals.find_one({"id": proposal_id}, {"_id": 0, **SEARCH_PROJECTION})
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     return proposal
@@ -190,43 +456,240 @@ async def create_proposal(proposal_data: ProposalCreate, user = Depends(get_curr
     proposal_dict["createdBy"] = user["fullName"]
     proposal = Proposal(**proposal_dict)
     
-    doc = proposal.model_dump()
+    doc = with_typed_fields("proposals", proposal.model_dump())
+    doc.update(build_search_fields(doc))
     await db.proposals.insert_one(doc)
+    if STATISTICS_COUNTERS:
+        await record_proposal_status(db.counters, None, doc["status"])
+    if event_log.local:
+        publish_proposal_event("created", proposal.id, proposal.model_dump())
     return proposal
 
+def proposal_changes(proposal_data: ProposalUpdate) -> dict:
+    """The fields an update sets: those provided with their typed copies, plus updatedAt"""
+    update_data = {k: v for k, v in proposal_data.model_dump().items() if v is not None}
+    update_data.update(typed_values("proposals", update_data))
+    update_data["updatedAt"] = datetime.now(timezone.utc).isoformat()
+    return update_data
+
 @api_router.put("/proposals/{proposal_id}", response_model=Proposal)
 async def update_proposal(proposal_id: str, proposal_data: ProposalUpdate):
-    # Get existing proposal
-    existing = await db.proposals.find_one({"id": proposal_id}, {"_id": 0})
+    update_data = proposal_changes(proposal_data)
+    
+    # The document before the update gives the old status, and the pipeline
+    # only sets the given values plus the search arrays, so the result is
+    # known without reading it back
+    existing = await db.proposals.find_one_and_update(
+        {"id": proposal_id},
+        search_update(update_data),
+        projection=PROPOSAL_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
     if not existing:
         raise HTTPException(status_code=404, detail="Proposal not found")
-    
-    # Update only provided fields
-    update_data = {k: v for k, v in proposal_data.model_dump().items() if v is not None}
-    update_data["updatedAt"] = datetime.now(timezone.utc).isoformat()
-    
-    await db.proposals.update_one({"id": proposal_id}, {"$set": update_data})
-    
-    # Return updated proposal
-    updated = await db.proposals.find_one({"id": proposal_id}, {"_id": 0})
+    updated = {**existing, **{k: v for k, v in update_data.items() if k in Proposal.model_fields}}
+    if STATISTICS_COUNTERS and "status" in update_data:
+        await record_proposal_status(db.counters, existing.get("status"), update_data["status"])
+    if event_log.local:
+        publish_proposal_event("updated", proposal_id, updated)
     return updated
 
 @api_router.delete("/proposals/{proposal_id}")
 async def delete_proposal(proposal_id: str):
-    result = await db.proposals.delete_one({"id": proposal_id})
-    if result.deleted_count == 0:
+    deleted = await db.proposals.find_one_and_delete({"id": proposal_id}, projection={"status": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Proposal not found")
+    if STATISTICS_COUNTERS:
+        await record_proposal_status(db.counters, deleted.get("status"), None)
+    if event_log.local:
+        publish_proposal_event("deleted", proposal_id, None)
     return {"success": True, "message": "Proposal deleted"}
 
+BULK_BATCH_SIZE = 1000
+BULK_EXISTING_PROJECTION = {"_id": 0, "id": 1, "status": 1}
+BULK_STATUSES = ("created", "updated", "deleted", "not_found", "invalid", "failed")
+
+def validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+async def write_proposal_batch(batch, user: dict, results: list, status_deltas: Dict[str, int]) -> bool:
+    """Run one batch of validated (index, operation) pairs as a single unordered bulk_write.
+    
+    Updates and deletes only apply while the proposal keeps the status read
+    before the batch, so every write that matched moved the counters as
+    recorded. The bulk result only counts matches. When fewer matched than
+    were sent, the batch's updates are told apart by their shared
+    ``updatedAt``, and updates that did not apply and deletes of proposals
+    still present are retried one at a time.
+    
+    Returns False when deletes cannot be attributed because another client
+    deleted some of the same proposals meanwhile; the counters then need
+    reconciling.
+    """
+    ids = [op.id for _, op in batch if op.op != "create"]
+    existing = {}
+    if ids:
+        async for doc in db.proposals.find({"id": {"$in": ids}}, BULK_EXISTING_PROJECTION):
+            existing[doc["id"]] = doc.get("status")
+    
+    updated_at = datetime.now(timezone.utc).isoformat()
+    writes = []
+    pending = []  # [index, result, old status, new status, update] per write
+    for index, op in batch:
+        if op.op == "create":
+            doc = Proposal(**op.proposal.model_dump(), createdBy=user["fullName"]).model_dump()
+            doc = with_typed_fields("proposals", doc)
+            doc.update(build_search_fields(doc))
+            writes.append(InsertOne(doc))
+            pending.append([index, {"index": index, "op": op.op, "id": doc["id"], "status": "created"},
+                            None, doc["status"], None])
+            continue
+        if op.id not in existing:
+            results[index] = {"index": index, "op": op.op, "id": op.id, "status": "not_found"}
+            continue
+        old = existing[op.id]
+        guard = {"id": op.id, "status": old}
+        if op.op == "update":
+            update_data = {**proposal_changes(op.changes), "updatedAt": updated_at}
+            writes.append(UpdateOne(guard, search_update(update_data)))
+            pending.append([index, {"index": index, "op": op.op, "id": op.id, "status": "updated"},
+                            old, update_data.get("status", old), update_data])
+        else:
+            writes.append(DeleteOne(guard))
+            pending.append([index, {"index": index, "op": op.op, "id": op.id, "status": "deleted"}, old, None, None])
+    
+    errors = {}
+    matched = removed = 0
+    if writes:
+        try:
+            outcome = await db.proposals.bulk_write(writes, ordered=False)
+            matched, removed = outcome.matched_count, outcome.deleted_count
+        except BulkWriteError as exc:
+            errors = {error["index"]: error.get("errmsg", "Write failed") for error in exc.details.get("writeErrors", [])}
+            matched, removed = exc.details.get("nMatched", 0), exc.details.get("nRemoved", 0)
+    
+    for position, entry in enumerate(pending):
+        if position in errors:
+            entry[1].update(status="failed", error=errors[position])
+    written = [entry for position, entry in enumerate(pending) if position not in errors]
+    updates = [entry for entry in written if entry[1]["op"] == "update"]
+    deletes = [entry for entry in written if entry[1]["op"] == "delete"]
+    retry = []
+    unattributed = set()
+    if matched < len(updates):
+        applied = set()
+        async for doc in db.proposals.find(
+            {"id": {"$in": [entry[1]["id"] for entry in updates]}, "updatedAt": updated_at}, {"_id": 0, "id": 1}
+        ):
+            applied.add(doc["id"])
+        retry += [entry for entry in updates if entry[1]["id"] not in applied]
+    if removed < len(deletes):
+        present = set()
+        async for doc in db.proposals.find({"id": {"$in": [entry[1]["id"] for entry in deletes]}}, {"_id": 0, "id": 1}):
+            present.add(doc["id"])
+        retry += [entry for entry in deletes if entry[1]["id"] in present]
+        gone = [entry for entry in deletes if entry[1]["id"] not in present]
+        if not removed:
+            for entry in gone:
+                entry[1]["status"] = "not_found"
+        elif len(gone) != removed:
+            unattributed = {entry[1]["id"] for entry in gone}
+    
+    for entry in retry:
+        proposal_id = entry[1]["id"]
+        if entry[4] is not None:
+            before = await db.proposals.find_one_and_update(
+                {"id": proposal_id}, search_update(entry[4]), projection={"_id": 0, "status": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+        else:
+            before = await db.proposals.find_one_and_delete({"id": proposal_id}, projection={"_id": 0, "status": 1})
+        if before is None:
+            entry[1]["status"] = "not_found"
+            continue
+        entry[2] = before.get("status")
+        if entry[4] is not None:
+            entry[3] = entry[4].get("status", entry[2])
+    
+    for index, result, old, new, _ in pending:
+        results[index] = result
+        if result["status"] in ("failed", "not_found") or result["id"] in unattributed or old == new:
+            continue
+        for status, change in ((old, -1), (new, 1)):
+            if status is not None:
+                status_deltas[status] = status_deltas.get(status, 0) + change
+    return not unattributed
+
+@api_router.post("/proposals/bulk")
+async def bulk_write_proposals(request: BulkProposalRequest, user = Depends(get_current_user)):
+    """Apply many creates, updates and deletes as unordered bulk writes.
+    
+    Operations are ``{"op": "create", "proposal": {...}}``,
+    ``{"op": "update", "id": ..., "changes": {...}}`` or
+    ``{"op": "delete", "id": ...}``. Each is validated and reported on its
+    own. Writes are unordered, so a proposal may appear in only one operation
+    per request.
+    """
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    results: List[Optional[dict]] = [None] * len(request.operations)
+    valid = []
+    seen = set()
+    for index, raw in enumerate(request.operations):
+        try:
+            op = BULK_OPERATION.validate_python(raw)
+        except ValidationError as exc:
+            results[index] = {"index": index, "op": raw.get("op"), "status": "invalid", "error": validation_message(exc)}
+            continue
+        if op.op != "create":
+            if op.id in seen:
+                results[index] = {"index": index, "op": op.op, "id": op.id, "status": "invalid",
+                                  "error": "Proposal appears in more than one operation"}
+                continue
+            seen.add(op.id)
+        valid.append((index, op))
+    
+    status_deltas: Dict[str, int] = {}
+    attributed = True
+    for start in range(0, len(valid), BULK_BATCH_SIZE):
+        attributed &= await write_proposal_batch(valid[start:start + BULK_BATCH_SIZE], user, results, status_deltas)
+    if STATISTICS_COUNTERS:
+        if attributed:
+            await adjust_proposal_counters(db.counters, status_deltas)
+        else:
+            await reconcile_proposal_counters(db.proposals, db.counters)
+    
+    summary = {status: 0 for status in BULK_STATUSES}
+    for result in results:
+        summary[result["status"]] += 1
+        if event_log.local and result["status"] in ("created", "updated", "deleted"):
+            # Without the documents; subscribers refetch what they show
+            publish_proposal_event(result["status"], result["id"], None)
+    return {**summary, "results": results}
+
+@api_router.post("/proposals/reindex-search")
+async def reindex_proposal_search():
+    """Backfill search tokens and trigrams on existing proposals"""
+    updated = await rebuild_search_index(db.proposals)
+    return {"success": True, "updated": updated}
+
 @api_router.get("/statistics", response_model=Statistics)
 async def get_statistics():
-    # Get all proposals
-    proposals = await db.proposals.find({}, {"_id": 0}).to_list(1000)
+    if STATISTICS_COUNTERS:
+        counts = await read_proposal_counters(db.counters)
+        if counts is None:
+            counts = await reconcile_proposal_counters(db.proposals, db.counters)
+    else:
+        counts = await count_proposals_by_status(db.proposals)
     
-    total = len(proposals)
-    pending = len([p for p in proposals if p["status"] == "to_do"])
-    in_process = len([p for p in proposals if p["status"] == "in_process"])
-    completed = len([p for p in proposals if p["status"] == "completed"])
+    total = sum(counts.values())
+    pending = counts.get("to_do", 0)
+    in_process = counts.get("in_process", 0)
+    completed = counts.get("completed", 0)
     
     # Calculate hit ratio (completed / total * 100)
     hit_ratio = (completed / total * 100) if total > 0 else 0
@@ -241,33 +704,41 @@ async def get_statistics():
 
 # ============= UWR_C DASHBOARD APIs =============
 
+def rollup_age_seconds(rollup: dict) -> float:
+    built = rollup.get("reconciledAt")
+    if not built:
+        return float("inf")
+    return (datetime.now(timezone.utc) - datetime.fromisoformat(built)).total_seconds()
+
 @api_router.get("/uwrc/statistics")
 async def get_uwrc_statistics():
-    """Get statistics for UWR_C dashboard"""
-    # Get property data
-    properties = await db.properties.find({}, {"_id": 0}).to_list(1000)
+    """Get statistics for UWR_C dashboard.
     
-    # Calculate statistics
-    new_business = len([p for p in properties if p.get("type") == "new_business"])
-    renewals = len([p for p in properties if p.get("type") == "renewal"])
-    endorsements = len([p for p in properties if p.get("type") == "endorsement"])
+    Served from the materialized rollup, which may lag property writes by
+    up to ``refreshSeconds``; ``asOf`` is when it was built.
+    """
+    # Read the materialized rollup; build it on first use, and without a
+    # change stream to trigger rebuilds, once it is older than the refresh interval
+    rollup = await read_uwrc_rollup(db.counters)
+    if rollup is None or event_log.local and rollup_age_seconds(rollup) > UWRC_ROLLUP_REBUILD_SECONDS:
+        rollup = await rebuild_uwrc_rollup(db.properties, db.counters)
     
-    pending_submissions = len([p for p in properties if p.get("status") == "pending"])
-    
-    # Calculate potential premium
-    total_premium = sum([float(p.get("premium", "0").replace("$", "").replace("M", "").replace(",", "")) for p in properties])
+    by_type = rollup.get("byType", {})
+    by_status = rollup.get("byStatus", {})
+    total = rollup.get("count", 0)
     
     # Calculate hit ratio
-    completed = len([p for p in properties if p.get("status") == "completed"])
-    hit_ratio = (completed / len(properties) * 100) if len(properties) > 0 else 0
+    hit_ratio = (by_status.get("completed", 0) / total * 100) if total > 0 else 0
     
     return {
-        "newBusiness": new_business,
-        "renewals": renewals,
-        "endorsements": endorsements,
-        "pendingSubmissions": pending_submissions,
-        "potentialPremium": f"${total_premium:.1f}M",
-        "hitRatio": round(hit_ratio, 1)
+        "newBusiness": by_type.get("new_business", 0),
+        "renewals": by_type.get("renewal", 0),
+        "endorsements": by_type.get("endorsement", 0),
+        "pendingSubmissions": by_status.get("pending", 0),
+        "potentialPremium": format_millions(rollup.get("premiumCents", 0)),
+        "hitRatio": round(hit_ratio, 1),
+        "asOf": rollup.get("reconciledAt"),
+        "refreshSeconds": UWRC_ROLLUP_REBUILD_SECONDS
     }
 
 @api_router.get("/uwrc/properties")
@@ -277,38 +748,112 @@ async def get_uwrc_properties(
     customerId: Optional[str] = None
 ):
     """Get properties for UWR_C dashboard with filters"""
-    query = {}
-    
-    if state and state != "All":
-        query["state"] = state
-    if lob and lob != "All":
-        query["lobs"] = lob
-    if customerId and customerId != "All":
-        query["customerId"] = customerId
-    
+    query = property_filters(state, lob, customerId)
     properties = await db.properties.find(query, {"_id": 0}).to_list(1000)
-    return properties
+    return FastJSONResponse(properties)
+
+PROPERTY_EXPORT_COLUMNS = [
+    "id", "propertyName", "customerName", "customerId", "product", "lobs", "state", "type", "status",
+    "operation", "sicCode", "effectiveDate", "premium", "premiumCents", "tivCents", "yearBuilt",
+    "constructionType", "latitude", "longitude"
+]
+
+def property_export_row(property_data: dict) -> dict:
+    lat, lng = coordinates(property_data) or (None, None)
+    return {**property_data, "latitude": lat, "longitude": lng}
+
+@api_router.get("/uwrc/properties/export")
+async def export_uwrc_properties(
+    state: Optional[str] = None,
+    lob: Optional[str] = None,
+    customerId: Optional[str] = None,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """Stream every matching property as NDJSON or CSV, in id order"""
+    query = property_filters(state, lob, customerId)
+    cursor = db.properties.find(query, {"_id": 0}).sort(PROPERTY_EXPORT_SORT)
+    stream = stream_export(cursor, fmt, PROPERTY_EXPORT_COLUMNS, csv_row=property_export_row)
+    return export_response(stream, fmt, "properties")
 
 @api_router.get("/uwrc/filters")
 async def get_uwrc_filters():
     """Get available filter options"""
-    properties = await db.properties.find({}, {"_id": 0}).to_list(1000)
+    filters = filter_cache.get("filters")
+    if filters is not None:
+        return filters
     
-    # Extract unique states
-    states = list(set([p.get("state") for p in properties if p.get("state")]))
-    states.sort()
+    # Each distinct is answered from the field's index
+    generation = filter_cache.generation
+    states, lobs, customer_ids = await asyncio.gather(
+        db.properties.distinct("state"),
+        db.properties.distinct("lobs"),
+        db.properties.distinct("customerId")
+    )
     
-    # Extract unique customer IDs
-    customer_ids = list(set([p.get("customerId") for p in properties if p.get("customerId")]))
-    customer_ids.sort()
+    filters = {
+        "states": ["All"] + sorted(value for value in states if value),
+        "lobs": ["All"] + sorted(value for value in lobs if value),
+        "customerIds": ["All"] + sorted(value for value in customer_ids if value)
+    }
+    filter_cache.set("filters", filters, generation=generation)
+    return filters
+
+# ============= PROPERTY DETAILS APIs =============
+
+def default_exposure(property_id: str, lob: str) -> dict:
+    return {
+        "propertyId": property_id,
+        "lob": lob,
+        "totalInsurableValue2024": "$0M",
+        "totalInsurableValue2025": "$0M",
+        "coverages": []
+    }
+
+def default_limits(property_id: str, lob: str) -> dict:
+    return {
+        "propertyId": property_id,
+        "lob": lob,
+        "categories": []
+    }
+
+def default_whatif(property_id: str, lob: str, exposure: Optional[dict] = None) -> dict:
+    # Start from the exposure's coverages when nothing has been saved yet
+    return {
+        "propertyId": property_id,
+        "lob": lob,
+        "coverages": exposure.get("coverages", []) if exposure else [],
+        "totalPremium": "0"
+    }
+
+def whatif_premium_cents(whatif: dict) -> int:
+    # Older what-ifs only carry the display string
+    cents = whatif.get("totalPremiumCents")
+    if cents is None:
+        cents = parse_money(whatif.get("totalPremium")) or 0
+    return cents
+
+def build_multiline_quote(lobs: List[str], whatif_by_lob: dict) -> dict:
+    quote_items = []
+    total_cents = 0
+    
+    for lob in lobs:
+        whatif = whatif_by_lob.get(lob)
+        if whatif:
+            cents = whatif_premium_cents(whatif)
+            quote_items.append({
+                "product": lob,
+                "premium": format_millions(cents, 2),
+                "premiumCents": cents
+            })
+            total_cents += cents
     
     return {
-        "states": ["All"] + states,
-        "lobs": ["All", "Package", "Property", "Auto", "Inland Marine", "Umbrella", "General Liability"],
-        "customerIds": ["All"] + customer_ids
+        "items": quote_items,
+        "totalPremium": format_millions(total_cents, 2),
+        "totalPremiumCents": total_cents
     }
 
-# ============= PROPERTY DETAILS APIs =============
+WHATIF_QUOTE_PROJECTION = {"_id": 0, "propertyId": 1, "lob": 1, "totalPremium": 1, "totalPremiumCents": 1}
 
 @api_router.get("/properties/{property_id}")
 async def get_property_detail(property_id: str):
@@ -324,13 +869,7 @@ async def get_property_exposure(property_id: str, lob: str):
     exposure = await db.exposures.find_one({"propertyId": property_id, "lob": lob}, {"_id": 0})
     if not exposure:
         # Return default structure
-        return {
-            "propertyId": property_id,
-            "lob": lob,
-            "totalInsurableValue2024": "$0M",
-            "totalInsurableValue2025": "$0M",
-            "coverages": []
-        }
+        return default_exposure(property_id, lob)
     return exposure
 
 @api_router.get("/properties/{property_id}/limits/{lob}")
@@ -338,28 +877,38 @@ async def get_property_limits(property_id: str, lob: str):
     """Get limit of liabilities for a specific LOB"""
     limits = await db.limits.find_one({"propertyId": property_id, "lob": lob}, {"_id": 0})
     if not limits:
-        return {
-            "propertyId": property_id,
-            "lob": lob,
-            "categories": []
-        }
+        return default_limits(property_id, lob)
     return limits
 
 @api_router.post("/properties/{property_id}/whatif/{lob}")
-async def save_whatif_analysis(property_id: str, lob: str, data: dict):
+async def save_whatif_analysis(property_id: str, lob: str, data: WhatIfSave):
     """Save what-if analysis data"""
-    whatif_data = {
+    # Premiums are recomputed server-side; the client's total must agree
+    try:
+        coverages, total_cents = price_coverages([c.model_dump(exclude_unset=True) for c in data.coverages])
+    except PricingError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    
+    submitted_cents = parse_money(data.totalPremium)
+    if submitted_cents is not None and abs(submitted_cents - total_cents) > PREMIUM_TOLERANCE_CENTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"totalPremium {data.totalPremium} does not match computed premium {format_millions(total_cents, 2)}"
+        )
+    
+    whatif_data = with_typed_fields("whatif", {
         "propertyId": property_id,
         "lob": lob,
-        "coverages": data.get("coverages", []),
-        "totalPremium": data.get("totalPremium", "0"),
+        "coverages": coverages,
+        "totalPremium": format_millions(total_cents, 2),
+        "totalPremiumCents": total_cents,
         "updatedAt": datetime.now(timezone.utc).isoformat()
-    }
+    })
     
-    # Update or insert
+    # Update or insert; priced at the base rate, so no repricing job's factor applies any more
     await db.whatif.update_one(
         {"propertyId": property_id, "lob": lob},
-        {"$set": whatif_data},
+        {"$set": whatif_data, "$unset": {"rateFactor": "", "repricingJobId": ""}},
         upsert=True
     )
     
@@ -372,203 +921,457 @@ async def get_whatif_analysis(property_id: str, lob: str):
     if not whatif:
         # Get default from exposure
         exposure = await db.exposures.find_one({"propertyId": property_id, "lob": lob}, {"_id": 0})
-        if exposure:
-            return {
-                "propertyId": property_id,
-                "lob": lob,
-                "coverages": exposure.get("coverages", []),
-                "totalPremium": "0"
-            }
-        return {
-            "propertyId": property_id,
-            "lob": lob,
-            "coverages": [],
-            "totalPremium": "0"
-        }
+        return default_whatif(property_id, lob, exposure)
     return whatif
 
+@api_router.post("/properties/{property_id}/pricing/{lob}/surface")
+async def get_pricing_surface(property_id: str, lob: str, request: PricingSurfaceRequest):
+    """Price every coverage of a LOB over a grid of limit factors and deductibles"""
+    points = len(request.limitFactors) * len(request.deductibles)
+    if points > MAX_SURFACE_POINTS:
+        raise HTTPException(status_code=422, detail=f"Grid has {points} points; the maximum is {MAX_SURFACE_POINTS}")
+    
+    exposure = await db.exposures.find_one({"propertyId": property_id, "lob": lob}, {"_id": 0, "coverages": 1})
+    coverages = exposure.get("coverages", []) if exposure else []
+    try:
+        limits = coverage_limits(coverages)
+    except PricingError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    
+    deductible_cents = [parse_money(d * 1_000_000) for d in request.deductibles]
+    if None in deductible_cents:
+        raise HTTPException(status_code=422, detail="deductibles must be finite amounts")
+    surface = premium_surface(limits, request.limitFactors, deductible_cents, request.baseRate)
+    
+    return {
+        "propertyId": property_id,
+        "lob": lob,
+        "baseRate": request.baseRate,
+        "limitFactors": request.limitFactors,
+        "deductibles": request.deductibles,
+        "coverages": [
+            {"name": coverage.get("name"), "limitCents": int(limit), "premiumCents": grid}
+            for coverage, limit, grid in zip(coverages, limits.tolist(), surface.tolist())
+        ],
+        "totalPremiumCents": surface.sum(axis=0).tolist() if len(coverages) else []
+    }
+
 @api_router.get("/properties/{property_id}/multiline-quote")
 async def get_multiline_quote(property_id: str):
     """Get multi-line quote summary"""
-    property_data = await db.properties.find_one({"id": property_id}, {"_id": 0})
+    property_data, whatifs = await asyncio.gather(
+        db.properties.find_one({"id": property_id}, {"_id": 0, "lobs": 1}),
+        db.whatif.find({"propertyId": property_id}, WHATIF_QUOTE_PROJECTION).to_list(None)
+    )
     if not property_data:
         raise HTTPException(status_code=404, detail="Property not found")
     
-    lobs = property_data.get("lobs", [])
-    quote_items = []
-    total_premium = 0
+    whatif_by_lob = {whatif["lob"]: whatif for whatif in whatifs}
+    return build_multiline_quote(property_data.get("lobs", []), whatif_by_lob)
+
+@api_router.post("/properties/multiline-quotes")
+async def get_multiline_quotes(request: MultilineQuoteBatchRequest):
+    """Get multi-line quote summaries for many properties in two queries"""
+    property_ids = list(dict.fromkeys(request.propertyIds))
+    properties, whatifs = await asyncio.gather(
+        db.properties.find({"id": {"$in": property_ids}}, {"_id": 0, "id": 1, "lobs": 1}).to_list(None),
+        db.whatif.find({"propertyId": {"$in": property_ids}}, WHATIF_QUOTE_PROJECTION).to_list(None)
+    )
     
-    for lob in lobs:
-        whatif = await db.whatif.find_one({"propertyId": property_id, "lob": lob}, {"_id": 0})
-        if whatif:
-            premium_str = whatif.get("totalPremium", "0").replace("$", "").replace("M", "").replace(",", "")
-            premium = float(premium_str) if premium_str else 0
-            quote_items.append({
-                "product": lob,
-                "premium": f"${premium:.2f}M"
-            })
-            total_premium += premium
+    whatifs_by_property = {}
+    for whatif in whatifs:
+        whatifs_by_property.setdefault(whatif["propertyId"], {})[whatif["lob"]] = whatif
     
+    quotes = {
+        prop["id"]: build_multiline_quote(prop.get("lobs", []), whatifs_by_property.get(prop["id"], {}))
+        for prop in properties
+    }
+    total_cents = sum(quote["totalPremiumCents"] for quote in quotes.values())
     return {
-        "items": quote_items,
-        "totalPremium": f"${total_premium:.2f}M"
+        "quotes": quotes,
+        "missing": [pid for pid in property_ids if pid not in quotes],
+        "totalPremium": format_millions(total_cents, 2),
+        "totalPremiumCents": total_cents
     }
 
+BUNDLE_SECTIONS = ("property", "exposures", "limits", "whatif", "documents", "multilineQuote")
+
+@api_router.get("/properties/{property_id}/bundle")
+async def get_property_bundle(property_id: str, include: Optional[str] = None):
+    """Get everything the property workspace shows in one request.
+    
+    ``include`` is a comma-separated subset of BUNDLE_SECTIONS (default: all).
+    Per-LOB sections are keyed by LOB and fall back to the same defaults as
+    the single-LOB endpoints.
+    """
+    sections = set(BUNDLE_SECTIONS)
+    if include:
+        sections = {section.strip() for section in include.split(",") if section.strip()}
+        unknown = sections - set(BUNDLE_SECTIONS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(sorted(unknown))}")
+    
+    # Every collection is keyed by propertyId, so all lookups run concurrently
+    by_property = {"propertyId": property_id}
+    lookups = {"property": db.properties.find_one({"id": property_id}, {"_id": 0})}
+    if sections & {"exposures", "whatif"}:
+        lookups["exposures"] = db.exposures.find(by_property, {"_id": 0}).to_list(None)
+    if "limits" in sections:
+        lookups["limits"] = db.limits.find(by_property, {"_id": 0}).to_list(None)
+    if sections & {"whatif", "multilineQuote"}:
+        lookups["whatif"] = db.whatif.find(by_property, {"_id": 0}).to_list(None)
+    if "documents" in sections:
+        lookups["documents"] = db.documents.find(by_property, DOCUMENT_PROJECTION).to_list(100)
+    results = dict(zip(lookups, await asyncio.gather(*lookups.values())))
+    
+    property_data = results["property"]
+    if not property_data:
+        raise HTTPException(status_code=404, detail="Property not found")
+    lobs = property_data.get("lobs", [])
+    exposures = {doc["lob"]: doc for doc in results.get("exposures", [])}
+    limits = {doc["lob"]: doc for doc in results.get("limits", [])}
+    whatifs = {doc["lob"]: doc for doc in results.get("whatif", [])}
+    
+    bundle = {"propertyId": property_id}
+    if "property" in sections:
+        bundle["property"] = property_data
+    if "exposures" in sections:
+        bundle["exposures"] = {lob: exposures.get(lob) or default_exposure(property_id, lob) for lob in lobs}
+    if "limits" in sections:
+        bundle["limits"] = {lob: limits.get(lob) or default_limits(property_id, lob) for lob in lobs}
+    if "whatif" in sections:
+        bundle["whatif"] = {
+            lob: whatifs.get(lob) or default_whatif(property_id, lob, exposures.get(lob)) for lob in lobs
+        }
+    if "documents" in sections:
+        bundle["documents"] = results["documents"]
+    if "multilineQuote" in sections:
+        bundle["multilineQuote"] = build_multiline_quote(lobs, whatifs)
+    return bundle
+
+# ============= REPRICING JOB APIs =============
+
+@api_router.post("/repricing/jobs")
+async def create_repricing_job(job_data: RepricingJobCreate, user = Depends(get_current_user)):
+    """Start a portfolio repricing job in the background"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    job = {
+        "id": str(uuid.uuid4()),
+        "name": job_data.name,
+        "filters": {"state": job_data.state, "customerId": job_data.customerId, "lobs": job_data.lobs},
+        "rateFactor": job_data.rateFactor,
+        "dryRun": job_data.dryRun,
+        "status": "queued",
+        "totalProperties": None,
+        "processedProperties": 0,
+        "repriced": 0,
+        "skipped": 0,
+        "premiumBeforeCents": 0,
+        "premiumAfterCents": 0,
+        "createdBy": user["fullName"],
+        "createdAt": datetime.now(timezone.utc).isoformat()
+    }
+    await db.repricing_jobs.insert_one(dict(job))
+    
+    task = asyncio.create_task(outside_request(run_repricing_job(db, job["id"])))
+    background_tasks.append(task)
+    task.add_done_callback(background_tasks.remove)
+    return job
+
+@api_router.get("/repricing/jobs/{job_id}")
+async def get_repricing_job(job_id: str):
+    """Get repricing job status and progress"""
+    job = await db.repricing_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Repricing job not found")
+    return job
+
+@api_router.get("/repricing/jobs/{job_id}/progress")
+async def stream_repricing_progress(job_id: str, interval: float = Query(0.5, ge=0.1, le=10)):
+    """Stream job progress as server-sent events until the job finishes or is deleted"""
+    if not await db.repricing_jobs.find_one({"id": job_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Repricing job not found")
+    
+    async def events():
+        last = None
+        while True:
+            job = await db.repricing_jobs.find_one({"id": job_id}, {"_id": 0})
+            if job is None:
+                yield f"event: deleted\ndata: {json.dumps({'id': job_id})}\n\n"
+                break
+            if job != last:
+                yield f"event: progress\ndata: {json.dumps(job)}\n\n"
+                last = job
+            if job["status"] in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(interval)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 # ============= DOCUMENT MANAGEMENT APIs =============
 
+# Lease bookkeeping stays internal to the processing workers
+DOCUMENT_PROJECTION = {"_id": 0, "leaseExpiresAt": 0, "attempts": 0}
+
 @api_router.get("/properties/{property_id}/documents")
 async def get_property_documents(property_id: str):
     """Get documents for a property"""
-    documents = await db.documents.find({"propertyId": property_id}, {"_id": 0}).to_list(100)
+    documents = await db.documents.find({"propertyId": property_id}, DOCUMENT_PROJECTION).to_list(100)
     return documents
 
+MAX_DOCUMENT_BYTES = int(os.environ.get('MAX_DOCUMENT_BYTES', str(1024 * 1024 * 1024)))
+
+@api_router.get("/properties/{property_id}/documents/{document_id}")
+async def get_document(property_id: str, document_id: str):
+    """Get one document, including its processing status and extraction result"""
+    doc = await db.documents.find_one({"id": document_id, "propertyId": property_id}, DOCUMENT_PROJECTION)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return doc
+
 @api_router.post("/properties/{property_id}/documents")
-async def upload_document(property_id: str, document: dict):
-    """Upload a document (simulated)"""
-    doc_id = str(uuid.uuid4())
+async def upload_document(property_id: str, request: Request):
+    """Upload a document as multipart form field ``file``, streamed to blob storage.
+
+    Extraction runs in the background; poll the document for its status.
+    """
+    if not await db.properties.find_one({"id": property_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Property not found")
+    if await queue_depth(db) >= DOCUMENT_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503, detail="Document processing queue is full", headers={"Retry-After": "30"}
+        )
+
+    writer = BlobWriter(db, max_bytes=MAX_DOCUMENT_BYTES)
+    part = None
+    try:
+        async for item in stream_file_field(request):
+            if isinstance(item, FilePart):
+                part = item
+            else:
+                await writer.write(item)
+    except UploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except BlobTooLarge:
+        raise HTTPException(status_code=413, detail=f"Documents are limited to {format_size(MAX_DOCUMENT_BYTES)}")
+    blob = await writer.close()
+
+    now = datetime.now(timezone.utc)
     doc = {
-        "id": doc_id,
+        "id": str(uuid.uuid4()),
         "propertyId": property_id,
-        "name": document.get("name", "document.pdf"),
-        "size": document.get("size", "0 KB"),
-        "uploadedAt": datetime.now(timezone.utc).strftime("%m/%d/%Y"),
-        "status": "completed",
-        "confidence": 85
+        "name": part.filename or "document",
+        "size": format_size(blob["size"]),
+        "sizeBytes": blob["size"],
+        "contentType": part.content_type,
+        "sha256": blob["id"],
+        "uploadedAt": now.strftime("%m/%d/%Y"),
+        "uploadedOn": parse_date(now),
+        "queuedAt": now.isoformat(),
+        "status": "queued",
+        "confidence": None,
+        "attempts": 0
     }
     await db.documents.insert_one(doc)
-    # Return without _id
-    return {
-        "id": doc_id,
-        "propertyId": property_id,
-        "name": doc["name"],
-        "size": doc["size"],
-        "uploadedAt": doc["uploadedAt"],
-        "status": doc["status"],
-        "confidence": doc["confidence"]
+    notify_workers()
+    doc.pop("_id", None)
+    return doc
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Inclusive (start, end) for a single ``bytes=`` range; None serves the whole body"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, dash, last = header[len("bytes="):].strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the final N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+@api_router.get("/properties/{property_id}/documents/{document_id}/download")
+async def download_document(
+    property_id: str,
+    document_id: str,
+    range_header: Optional[str] = Header(None, alias="Range")
+):
+    """Stream a document's bytes; honours a single HTTP Range"""
+    doc = await db.documents.find_one({"id": document_id, "propertyId": property_id}, DOCUMENT_PROJECTION)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    # Documents uploaded before blob storage have metadata only
+    blob = await get_blob(db, doc["sha256"]) if doc.get("sha256") else None
+    if not blob:
+        raise HTTPException(status_code=404, detail="Document has no stored content")
+
+    size = blob["size"]
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{blob["_id"]}"',
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(doc['name'])}"
     }
+    byte_range = parse_range(range_header, size) if size else None
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
+    body = read_blob(db, blob, start, end) if size else iter(())
+    return StreamingResponse(
+        body, status_code=status_code, media_type=doc.get("contentType") or "application/octet-stream", headers=headers
+    )
 
 @api_router.delete("/properties/{property_id}/documents/{document_id}")
 async def delete_document(property_id: str, document_id: str):
     """Delete a document"""
-    result = await db.documents.delete_one({"id": document_id, "propertyId": property_id})
-    if result.deleted_count == 0:
+    doc = await db.documents.find_one_and_delete({"id": document_id, "propertyId": property_id}, {"sha256": 1})
+    if doc is None:
         raise HTTPException(status_code=404, detail="Document not found")
+    if doc.get("sha256"):
+        await release_blob(db, doc["sha256"])
     return {"success": True, "message": "Document deleted"}
 
 # ============= FULL ASSESSMENT API =============
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
 @api_router.get("/properties/{property_id}/full-assessment")
-async def get_full_assessment(property_id: str):
+async def get_full_assessment(
+    property_id: str,
+    years: int = Query(DEFAULT_YEARS, ge=1000, le=MAX_YEARS),
+    seed: Optional[int] = Query(None, ge=0),
+    if_none_match: Optional[str] = Header(None)
+):
     """Get full risk assessment for a property"""
-    property_data = await db.properties.find_one({"id": property_id}, {"_id": 0})
+    property_data, exposures = await asyncio.gather(
+        db.properties.find_one({"id": property_id}, {"_id": 0}),
+        db.exposures.find({"propertyId": property_id}, EXPOSURE_INPUT_PROJECTION).to_list(100)
+    )
     if not property_data:
         raise HTTPException(status_code=404, detail="Property not found")
-    
-    # Generate comprehensive assessment data
-    assessment = {
-        "propertyId": property_id,
-        "propertyName": property_data.get("propertyName", property_data.get("customerName")),
-        "overallRiskScore": 48.5,
-        "riskAnalysisSummary": {
-            "moderateRisk": "This property has been classified as MODERATE RISK based on comprehensive catastrophic modeling. The overall risk score indicates a balanced exposure with moderate mitigation strategies and hurricane risks being the primary concerns. Advanced mitigation strategies are recommended for these specific perils.",
-            "recommendation": "Implement comprehensive flood mitigation measures including elevation and drainage improvements."
-        },
-        "riskComponents": [
-            {
-                "name": "Earthquake Risk",
-                "score": 42.0,
-                "severity": "moderate",
-                "description": "Moderate seismic activity possible. Building age and construction type influence vulnerability. Regular structural assessments recommended.",
-                "recommendation": "Seismic retrofitting, Foundation reinforcement"
-            },
-            {
-                "name": "Wildfire Risk",
-                "score": 20.0,
-                "severity": "low",
-                "description": "Low to urban location, adequate fire protection. Fire protection infrastructure. Vegetation management and suppression systems in place.",
-                "recommendation": "Maintain defensible space, Fire-resistant landscaping"
-            },
-            {
-                "name": "Hurricane Risk",
-                "score": 65.0,
-                "severity": "high",
-                "description": "Elevated hurricane exposure based on coastal proximity. Wind speed ratings exceed regional standards. Potential surge risk, Vulnerable openings.",
-                "recommendation": "Impact-resistant windows, Storm shutters, Secure doors"
-            },
-            {
-                "name": "Flood Risk",
-                "score": 67.0,
-                "severity": "high",
-                "description": "High flood risk identified. Property located in FEMA flood zone with historical flooding data. Historical flooding events recorded.",
-                "recommendation": "Implement flood barriers, Improve drainage, Consider relocation"
-            }
-        ],
-        "catastrophicRiskModeling": [
-            {
-                "type": "Earthquake Risk",
-                "amount": "$336K",
-                "details": "PML (250yr): $336K, PML (500yr): $482K"
-            },
-            {
-                "type": "Flood Risk",
-                "amount": "$206K",
-                "details": "PML (100yr): $206K, PML (500yr): $398K"
-            },
-            {
-                "type": "Hurricane Risk",
-                "amount": "$286K",
-                "details": "PML (100yr): $286K, PML (250yr): $524K"
-            },
-            {
-                "type": "Wildfire Risk",
-                "amount": "$107K",
-                "details": "PML (100yr): $107K, PML (250yr): $198K"
-            }
-        ],
-        "locationIntelligence": {
-            "address": property_data.get("propertyName", "N/A"),
-            "city": property_data.get("state", "N/A"),
-            "coordinates": "41.8781,-87.6298",
-            "buildingType": property_data.get("operation", "N/A"),
-            "yearBuilt": "2010",
-            "constructionType": "Steel Frame"
-        },
-        "concentrationAnalysis": {
-            "totalInsuredValue": "$185.0M",
-            "businessType": property_data.get("operation", "N/A"),
-            "sicCode": property_data.get("sicCode", "N/A"),
-            "constructionType": "Steel Frame"
-        },
-        "mitigationRecommendations": [
-            "Implement comprehensive flood mitigation measures including elevation and drainage improvements",
-            "Upgrade hurricane resistance with impact-resistant windows and reinforced doors",
-            "Consider seismic retrofitting to reduce earthquake vulnerability exposure levels",
-            "Annual risk assessment and insurance coverage review"
-        ]
+
+    key = assessment_key(property_data, exposures, years, seed)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    async def compute() -> bytes:
+        # The simulation is CPU-bound; keep it off the event loop
+        assessment = await asyncio.to_thread(build_full_assessment, property_data, exposures, years, seed)
+        return json.dumps(assessment, separators=(",", ":")).encode()
+
+    body = await assessment_cache.get_or_compute(property_id, key, compute)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# ============= ACCUMULATION APIs =============
+
+MAX_ACCUMULATION_RADIUS_MILES = 250.0
+
+@api_router.get("/accumulation")
+async def get_accumulation(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    propertyId: Optional[str] = None,
+    radius: float = Query(1.0, gt=0, le=MAX_ACCUMULATION_RADIUS_MILES),
+    top: int = Query(10, ge=0, le=100)
+):
+    """Total insured value within ``radius`` miles of a point or a property"""
+    if propertyId:
+        property_data = await db.properties.find_one({"id": propertyId}, {"_id": 0, "location": 1})
+        if not property_data:
+            raise HTTPException(status_code=404, detail="Property not found")
+        center = coordinates(property_data)
+        if center is None:
+            raise HTTPException(status_code=400, detail="Property has no location")
+        lat, lng = center
+    elif lat is None or lng is None:
+        raise HTTPException(status_code=400, detail="Provide lat and lng or a propertyId")
+
+    result = await accumulation(db.properties, lat, lng, radius, top)
+    return {
+        "center": {"lat": lat, "lng": lng},
+        "radiusMiles": radius,
+        "propertyId": propertyId,
+        **result,
+        "totalInsuredValue": format_millions(result["tivCents"])
     }
-    
-    return assessment
+
+@api_router.get("/accumulation/hotspots")
+async def get_accumulation_hotspots(
+    cell: float = Query(1.0, ge=0.1, le=MAX_ACCUMULATION_RADIUS_MILES),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Portfolio grid cells of ``cell`` miles holding the most insured value"""
+    key = (cell, limit)
+    cells = hotspot_cache.get(key)
+    if cells is None:
+        generation = hotspot_cache.generation
+        cells = await hotspots(db.properties, cell, limit)
+        for row in cells:
+            row["totalInsuredValue"] = format_millions(row["tivCents"])
+        hotspot_cache.set(key, cells, generation=generation)
+    return {"cellMiles": cell, "hotspots": cells}
 
 # ============= SEED DATA =============
 
+# Upper bound per collection for seeding over HTTP; use manage.py generate-data beyond it
+MAX_SEED_COUNT = 100_000
+# force=true wipes every data collection; it needs a signed-in user unless
+# this is set, for development scripts running against a scratch database
+SEED_ALLOW_FORCE = os.environ.get('SEED_ALLOW_FORCE', 'false').lower() == 'true'
+
 @api_router.post("/seed")
-async def seed_database(force: bool = False):
-    # Check if data already exists
-    existing_users = await db.users.count_documents({})
-    if existing_users > 0 and not force:
-        return {"message": "Database already seeded, use force=true to reseed"}
-    
-    # Clear existing data if force is true
+async def seed_database(
+    force: bool = False,
+    users: int = Query(0, ge=0, le=MAX_SEED_COUNT),
+    proposals: int = Query(40, ge=0, le=MAX_SEED_COUNT),
+    properties: int = Query(10, ge=0, le=MAX_SEED_COUNT),
+    seed: int = DEFAULT_SEED,
+    user = Depends(get_current_user)
+):
+    """Load synthetic data; ``force`` drops the existing data first"""
     if force:
-        await db.users.delete_many({})
-        await db.proposals.delete_many({})
+        if not user and not SEED_ALLOW_FORCE:
+            raise HTTPException(status_code=401, detail="Sign in to reseed with force=true")
+    else:
+        # Seeded ids are deterministic and would collide with existing data
+        for name in DATA_COLLECTIONS:
+            if await db[name].find_one({}, {"_id": 1}):
+                raise HTTPException(
+                    status_code=409, detail=f"Database already has {name}; use force=true to reseed"
+                )
+    
+    password_hash = await hash_password("password123")
+    written = await populate(
+        db, users=users, proposals=proposals, properties=properties, seed=seed,
+        password_hash=password_hash, drop=force
+    )
     
-    # Create users
-    users = [
+    # Demo logins shown on the sign-in page
+    await db.users.insert_many([
         {
             "id": str(uuid.uuid4()),
             "username": "LARA",
-            "password": "password123",
+            "password": password_hash,
             "fullName": "Lara",
             "role": "UWR_B",
             "avatar": "https://api.dicebear.com/7.x/avataaars/svg?seed=Lara"
@@ -576,261 +1379,132 @@ async def seed_database(force: bool = False):
         {
             "id": str(uuid.uuid4()),
             "username": "ZARA",
-            "password": "password123",
+            "password": password_hash,
             "fullName": "Zara",
             "role": "UWR_C",
             "avatar": "https://api.dicebear.com/7.x/avataaars/svg?seed=Zara"
         }
-    ]
-    await db.users.insert_many(users)
+    ])
     
-    # Create sample proposals
-    sample_proposals = [
-        {
-            "id": "prop-001",
-            "title": "JW Marriott Chicago",
-            "client": "Marriott International Inc.",
-            "location": "Chicago, IL",
-            "priority": "high",
-            "status": "in_process",
-            "clientId": "CLT-60F86F01",
-            "firstNameInsured": "William",
-            "businessType": "Hotel & Hospitality",
-            "totalInsuredValue": "$185.0M",
-            "website": "www.marriottinterna.com",
-            "createdBy": "LARA",
-            "effectiveDate": "10/26/2025",
-            "expirationDate": "12/25/2025",
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
-        }
-    ]
-    
-    # Add more sample proposals with real property data
-    real_properties = [
-        {"title": "Austin Commercial Center", "client": "John's Bakery", "location": "Springfield, IL", "priority": "low", "status": "completed", "businessType": "Retail", "value": "$45.0M"},
-        {"title": "Austin Office Tower", "client": "Summit Commercial Inc.", "location": "Austin, TX", "priority": "medium", "status": "completed", "businessType": "Office", "value": "$78.0M"},
-        {"title": "Austin Retail Plaza", "client": "Coastal Properties LLC Inc.", "location": "Austin, TX", "priority": "high", "status": "completed", "businessType": "Retail", "value": "$52.0M"},
-        {"title": "Boston Commercial Center", "client": "Apex Real Estate Inc.", "location": "Boston, MA", "priority": "medium", "status": "completed", "businessType": "Office", "value": "$95.0M"},
-        {"title": "Boston Retail Plaza", "client": "Horizon Investments Inc.", "location": "Boston, MA", "priority": "medium", "status": "to_do", "businessType": "Retail", "value": "$38.0M"},
-        {"title": "Charlotte Office Tower", "client": "Apex Real Estate Inc.", "location": "Charlotte, NC", "priority": "low", "status": "completed", "businessType": "Office", "value": "$62.0M"},
-        {"title": "Denver Shopping Mall", "client": "Mountain View Properties", "location": "Denver, CO", "priority": "high", "status": "in_process", "businessType": "Retail", "value": "$120.0M"},
-        {"title": "Miami Beach Resort", "client": "Oceanfront Hotels Group", "location": "Miami, FL", "priority": "high", "status": "in_process", "businessType": "Hotel & Hospitality", "value": "$250.0M"},
-        {"title": "Seattle Tech Campus", "client": "Pacific Northwest Tech Inc.", "location": "Seattle, WA", "priority": "medium", "status": "to_do", "businessType": "Technology", "value": "$180.0M"},
-        {"title": "Portland Industrial Park", "client": "Northwest Manufacturing", "location": "Portland, OR", "priority": "low", "status": "completed", "businessType": "Manufacturing", "value": "$65.0M"},
-        {"title": "Phoenix Medical Center", "client": "Desert Healthcare Systems", "location": "Phoenix, AZ", "priority": "high", "status": "in_process", "businessType": "Healthcare", "value": "$145.0M"},
-        {"title": "Las Vegas Convention Center", "client": "Nevada Events Corp", "location": "Las Vegas, NV", "priority": "medium", "status": "in_process", "businessType": "Entertainment", "value": "$200.0M"},
-        {"title": "Atlanta Financial Tower", "client": "Southern Banking Group", "location": "Atlanta, GA", "priority": "high", "status": "to_do", "businessType": "Finance", "value": "$165.0M"},
-        {"title": "San Francisco Tech Hub", "client": "Bay Area Ventures LLC", "location": "San Francisco, CA", "priority": "high", "status": "in_process", "businessType": "Technology", "value": "$320.0M"},
-        {"title": "Houston Energy Complex", "client": "Texas Energy Holdings", "location": "Houston, TX", "priority": "medium", "status": "completed", "businessType": "Energy", "value": "$275.0M"},
-        {"title": "Detroit Manufacturing Plant", "client": "Great Lakes Industrial", "location": "Detroit, MI", "priority": "low", "status": "to_do", "businessType": "Manufacturing", "value": "$85.0M"},
-        {"title": "Philadelphia Historic Building", "client": "Liberty Properties Inc.", "location": "Philadelphia, PA", "priority": "medium", "status": "completed", "businessType": "Office", "value": "$72.0M"},
-        {"title": "Nashville Music Hall", "client": "Tennessee Entertainment LLC", "location": "Nashville, TN", "priority": "low", "status": "completed", "businessType": "Entertainment", "value": "$48.0M"},
-        {"title": "Minneapolis Corporate Center", "client": "Twin Cities Realty", "location": "Minneapolis, MN", "priority": "medium", "status": "in_process", "businessType": "Office", "value": "$98.0M"},
-        {"title": "San Diego Coastal Resort", "client": "Pacific Beachfront Hotels", "location": "San Diego, CA", "priority": "high", "status": "in_process", "businessType": "Hotel & Hospitality", "value": "$195.0M"},
-        {"title": "New Orleans Convention Hotel", "client": "Crescent City Hospitality", "location": "New Orleans, LA", "priority": "medium", "status": "to_do", "businessType": "Hotel & Hospitality", "value": "$125.0M"},
-        {"title": "Pittsburgh Innovation Center", "client": "Steel City Ventures", "location": "Pittsburgh, PA", "priority": "low", "status": "completed", "businessType": "Technology", "value": "$78.0M"},
-        {"title": "Indianapolis Distribution Hub", "client": "Midwest Logistics Corp", "location": "Indianapolis, IN", "priority": "medium", "status": "in_process", "businessType": "Logistics", "value": "$92.0M"},
-        {"title": "Tampa Bay Medical Plaza", "client": "Florida Healthcare Partners", "location": "Tampa, FL", "priority": "high", "status": "to_do", "businessType": "Healthcare", "value": "$115.0M"},
-        {"title": "Kansas City Business Park", "client": "Heartland Commercial Group", "location": "Kansas City, MO", "priority": "low", "status": "completed", "businessType": "Office", "value": "$68.0M"},
-        {"title": "Salt Lake City Ski Resort", "client": "Mountain Peak Resorts Inc.", "location": "Salt Lake City, UT", "priority": "high", "status": "in_process", "businessType": "Hotel & Hospitality", "value": "$155.0M"},
-        {"title": "Raleigh Research Facility", "client": "Triangle Innovation Partners", "location": "Raleigh, NC", "priority": "medium", "status": "completed", "businessType": "Technology", "value": "$88.0M"},
-        {"title": "Milwaukee Brewery Complex", "client": "Great Lakes Brewing Co", "location": "Milwaukee, WI", "priority": "low", "status": "to_do", "businessType": "Manufacturing", "value": "$42.0M"},
-        {"title": "Richmond Historic District", "client": "Virginia Heritage Properties", "location": "Richmond, VA", "priority": "medium", "status": "in_process", "businessType": "Mixed Use", "value": "$105.0M"},
-        {"title": "Oklahoma City Energy Tower", "client": "Plains Petroleum Group", "location": "Oklahoma City, OK", "priority": "high", "status": "completed", "businessType": "Energy", "value": "$132.0M"},
-        {"title": "Louisville Distribution Center", "client": "Kentucky Commerce Holdings", "location": "Louisville, KY", "priority": "medium", "status": "to_do", "businessType": "Logistics", "value": "$75.0M"},
-        {"title": "Tucson Desert Plaza", "client": "Southwest Retail Partners", "location": "Tucson, AZ", "priority": "low", "status": "completed", "businessType": "Retail", "value": "$55.0M"},
-        {"title": "Albuquerque Tech Park", "client": "Rio Grande Innovation LLC", "location": "Albuquerque, NM", "priority": "medium", "status": "in_process", "businessType": "Technology", "value": "$82.0M"},
-        {"title": "Buffalo Industrial Complex", "client": "Great Lakes Manufacturing", "location": "Buffalo, NY", "priority": "low", "status": "completed", "businessType": "Manufacturing", "value": "$58.0M"},
-        {"title": "Fresno Agricultural Center", "client": "Central Valley Agribusiness", "location": "Fresno, CA", "priority": "medium", "status": "to_do", "businessType": "Agriculture", "value": "$48.0M"},
-        {"title": "Omaha Financial Plaza", "client": "Midwest Banking Corporation", "location": "Omaha, NE", "priority": "high", "status": "in_process", "businessType": "Finance", "value": "$128.0M"},
-        {"title": "Boise Tech Campus", "client": "Mountain West Technology", "location": "Boise, ID", "priority": "medium", "status": "completed", "businessType": "Technology", "value": "$95.0M"},
-        {"title": "Charleston Historic Inn", "client": "Lowcountry Hospitality Group", "location": "Charleston, SC", "priority": "high", "status": "to_do", "businessType": "Hotel & Hospitality", "value": "$112.0M"},
-        {"title": "Spokane Medical Complex", "client": "Inland Northwest Healthcare", "location": "Spokane, WA", "priority": "medium", "status": "in_process", "businessType": "Healthcare", "value": "$98.0M"},
-    ]
-    
-    for i, prop_data in enumerate(real_properties, start=2):
-        proposal = {
-            "id": f"prop-{str(i).zfill(3)}",
-            "title": prop_data["title"],
-            "client": prop_data["client"],
-            "location": prop_data["location"],
-            "priority": prop_data["priority"],
-            "status": prop_data["status"],
-            "clientId": f"CLT-{uuid.uuid4().hex[:8].upper()}",
-            "firstNameInsured": prop_data["client"].split()[0],
-            "businessType": prop_data["businessType"],
-            "totalInsuredValue": prop_data["value"],
-            "website": f"www.{prop_data['client'].lower().replace(' ', '').replace('.', '').replace(',', '')[:15]}.com",
-            "createdBy": "LARA",
-            "effectiveDate": f"10/{(i % 28) + 1}/2025",
-            "expirationDate": f"12/{(i % 28) + 1}/2025",
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
-        }
-        sample_proposals.append(proposal)
-    
-    await db.proposals.insert_many(sample_proposals)
-    
-    # Create property data for UWR_C dashboard
-    us_states = ["California", "Texas", "Florida", "New York", "Illinois", "Pennsylvania", "Ohio", "Georgia", "North Carolina", "Michigan"]
-    property_types = ["new_business", "renewal", "endorsement"]
-    
-    properties_data = []
-    exposures_data = []
-    limits_data = []
-    
-    # Property coverage definitions by LOB
-    lob_coverages = {
-        "Property": {
-            "coverages": [
-                {"name": "Building & Contents", "limit": "50000000", "aggregate": "50000000"},
-                {"name": "Business Interruption", "limit": "25000000", "aggregate": "25000000"},
-                {"name": "Account Receivable", "limit": "10000000", "aggregate": "10000000"},
-                {"name": "Pipe Burst", "limit": "5000000", "aggregate": "5000000"},
-                {"name": "Boiler & Machinery - Property Damage", "limit": "8000000", "aggregate": "8000000"},
-                {"name": "Spoilage/Perishables/Water Damage", "limit": "7000000", "aggregate": "7000000"}
-            ]
-        },
-        "Umbrella": {
-            "coverages": [
-                {"name": "Excess Bodily Injury", "limit": "30000000", "aggregate": "30000000"},
-                {"name": "Excess Property Damage", "limit": "20000000", "aggregate": "20000000"},
-                {"name": "Excess Personal Injury", "limit": "15000000", "aggregate": "15000000"},
-                {"name": "Excess Products Liability", "limit": "10000000", "aggregate": "10000000"},
-                {"name": "Excess Contractual Liability", "limit": "10000000", "aggregate": "10000000"}
-            ]
-        },
-        "General Liability": {
-            "coverages": [
-                {"name": "Bodily Injury", "limit": "25000000", "aggregate": "25000000"},
-                {"name": "Cyber Liability", "limit": "15000000", "aggregate": "15000000"},
-                {"name": "Legal Liability", "limit": "20000000", "aggregate": "20000000"},
-                {"name": "EPLI", "limit": "10000000", "aggregate": "10000000"},
-                {"name": "Contractual Liability", "limit": "12000000", "aggregate": "12000000"},
-                {"name": "Liquor Liability", "limit": "8000000", "aggregate": "8000000"}
-            ]
-        },
-        "Package": {
-            "coverages": [
-                {"name": "Building & Contents", "limit": "40000000", "aggregate": "40000000"},
-                {"name": "Business Interruption", "limit": "20000000", "aggregate": "20000000"},
-                {"name": "General Liability", "limit": "15000000", "aggregate": "15000000"},
-                {"name": "Equipment Breakdown", "limit": "10000000", "aggregate": "10000000"},
-                {"name": "Crime Coverage", "limit": "5000000", "aggregate": "5000000"}
-            ]
-        },
-        "Auto": {
-            "coverages": [
-                {"name": "Liability Coverage", "limit": "20000000", "aggregate": "20000000"},
-                {"name": "Physical Damage", "limit": "15000000", "aggregate": "15000000"},
-                {"name": "Uninsured Motorist", "limit": "10000000", "aggregate": "10000000"},
-                {"name": "Medical Payments", "limit": "5000000", "aggregate": "5000000"}
-            ]
-        },
-        "Inland Marine": {
-            "coverages": [
-                {"name": "Contractors Equipment", "limit": "18000000", "aggregate": "18000000"},
-                {"name": "Transit Coverage", "limit": "12000000", "aggregate": "12000000"},
-                {"name": "Installation Floater", "limit": "10000000", "aggregate": "10000000"},
-                {"name": "Valuable Papers", "limit": "5000000", "aggregate": "5000000"}
-            ]
-        }
-    }
-    
-    # Sample properties with multiple LOBs
-    sample_properties_list = [
-        {"name": "Marriott Hotel Chicago", "customer": "Marriott", "lobs": ["Property", "Umbrella"], "state": "Illinois", "sicCode": "7011", "operation": "Hospitality", "customerId": "CLT-001", "product": "Multi Pro"},
-        {"name": "Houston Tech Center", "customer": "Tech Solutions Inc", "lobs": ["Property", "General Liability"], "state": "Texas", "sicCode": "7372", "operation": "Technology", "customerId": "CLT-002", "product": "Business Shield"},
-        {"name": "Miami Beach Resort", "customer": "Oceanfront Hotels", "lobs": ["Property", "Umbrella", "General Liability"], "state": "Florida", "sicCode": "7011", "operation": "Hospitality", "customerId": "CLT-003", "product": "Multi Pro"},
-        {"name": "San Francisco Office Tower", "customer": "Bay Properties LLC", "lobs": ["Package", "Property"], "state": "California", "sicCode": "6512", "operation": "Real Estate", "customerId": "CLT-004", "product": "Business Shield"},
-        {"name": "Atlanta Distribution Center", "customer": "Logistics Corp", "lobs": ["Property", "Auto", "Inland Marine"], "state": "Georgia", "sicCode": "4225", "operation": "Logistics", "customerId": "CLT-005", "product": "Multi Pro"},
-        {"name": "Phoenix Medical Plaza", "customer": "Healthcare Partners", "lobs": ["Property", "General Liability"], "state": "Texas", "sicCode": "8011", "operation": "Healthcare", "customerId": "CLT-006", "product": "Business Shield"},
-        {"name": "Boston Financial Tower", "customer": "Northeast Banking", "lobs": ["Package", "Umbrella"], "state": "New York", "sicCode": "6022", "operation": "Finance", "customerId": "CLT-007", "product": "Multi Pro"},
-        {"name": "Seattle Manufacturing Plant", "customer": "Pacific Manufacturing", "lobs": ["Property", "Auto", "General Liability"], "state": "California", "sicCode": "3711", "operation": "Manufacturing", "customerId": "CLT-008", "product": "Business Shield"},
-        {"name": "Denver Shopping Mall", "customer": "Retail Properties Inc", "lobs": ["Property", "Umbrella"], "state": "Texas", "sicCode": "5311", "operation": "Retail", "customerId": "CLT-009", "product": "Multi Pro"},
-        {"name": "Philadelphia Historic Building", "customer": "Heritage Properties", "lobs": ["Property"], "state": "Pennsylvania", "sicCode": "6512", "operation": "Real Estate", "customerId": "CLT-010", "product": "Business Shield"},
-    ]
-    
-    for i, prop in enumerate(sample_properties_list):
-        property_id = f"prop-uwrc-{str(i+1).zfill(3)}"
-        
-        # Create property
-        property_doc = {
-            "id": property_id,
-            "product": prop["product"],
-            "lobs": prop["lobs"],
-            "customerName": prop["customer"],
-            "effectiveDate": f"09/29/2024",
-            "sicCode": prop["sicCode"],
-            "operation": prop["operation"],
-            "state": prop["state"],
-            "customerId": prop["customerId"],
-            "type": property_types[i % 3],
-            "status": "pending" if i % 3 == 0 else "completed",
-            "premium": f"${(i+1)*2.5:.1f}M",
-            "propertyName": prop["name"]
-        }
-        properties_data.append(property_doc)
-        
-        # Create exposures for each LOB
-        for lob in prop["lobs"]:
-            if lob in lob_coverages:
-                total_2024 = sum([float(c["limit"]) for c in lob_coverages[lob]["coverages"]])
-                total_2025 = total_2024 * 1.1  # 10% increase for 2025
-                
-                exposure_doc = {
-                    "propertyId": property_id,
-                    "lob": lob,
-                    "propertyName": prop["name"],
-                    "totalInsurableValue2024": f"${total_2024/1000000:.1f}M",
-                    "totalInsurableValue2025": f"${total_2025/1000000:.1f}M",
-                    "coverages": [
-                        {
-                            "name": c["name"],
-                            "limit": f"${float(c['limit'])/1000000:.1f}M"
-                        } for c in lob_coverages[lob]["coverages"]
-                    ]
-                }
-                exposures_data.append(exposure_doc)
-                
-                # Create limits
-                limits_doc = {
-                    "propertyId": property_id,
-                    "lob": lob,
-                    "propertyName": prop["name"],
-                    "categories": [
-                        {
-                            "name": c["name"],
-                            "perOccurrenceLimit": f"${float(c['limit'])/1000000:.1f}M",
-                            "aggregateLimit": f"${float(c['aggregate'])/1000000:.1f}M"
-                        } for c in lob_coverages[lob]["coverages"]
-                    ] + [
-                        {
-                            "name": "War & Terrorism",
-                            "perOccurrenceLimit": "Not Covered",
-                            "aggregateLimit": "Not Covered"
-                        }
-                    ]
-                }
-                limits_data.append(limits_doc)
-    
-    # Insert property data
-    if properties_data:
-        await db.properties.insert_many(properties_data)
-    if exposures_data:
-        await db.exposures.insert_many(exposures_data)
-    if limits_data:
-        await db.limits.insert_many(limits_data)
+    if STATISTICS_COUNTERS:
+        await reconcile_proposal_counters(db.proposals, db.counters)
+    await rebuild_uwrc_rollup(db.properties, db.counters)
+    await invalidate_property_caches()
+    event_log.resync()
     
     return {
         "message": "Database seeded successfully", 
-        "proposals": len(sample_proposals),
-        "properties": len(properties_data),
-        "exposures": len(exposures_data),
-        "limits": len(limits_data)
+        "proposals": written.get("proposals", 0),
+        "properties": written.get("properties", 0),
+        "exposures": written.get("exposures", 0),
+        "limits": written.get("limits", 0),
+        "whatif": written.get("whatif", 0),
+        "documents": written.get("documents", 0),
+        "users": written.get("users", 0) + 2
     }
 
+# ============= LIVE EVENTS =============
+
+EVENT_TOPICS = ("proposals", "properties", "statistics")
+CHANGE_OPERATIONS = {"insert": "created", "update": "updated", "replace": "updated", "delete": "deleted"}
+pending_statistics_tasks = set()
+
+def publish_proposal_event(op: str, proposal_id: Optional[str], proposal: Optional[dict]):
+    event_log.publish("proposals", "proposal", {"op": op, "id": proposal_id, "proposal": proposal})
+    schedule_statistics_push("statistics")
+
+def publish_property_event(op: str, property_id: Optional[str], property_data: Optional[dict]):
+    event_log.publish("properties", "property", {"op": op, "id": property_id, "property": property_data})
+    # The statistics push follows the rebuild
+    schedule_rollup_rebuild()
+
+async def publish_change(change: dict):
+    """Turn a change stream event into a dashboard event"""
+    op = CHANGE_OPERATIONS[change["operationType"]]
+    # Deletes carry only the ObjectId, so subscribers get no id to drop and refetch instead
+    doc = change.get("fullDocument")
+    doc_id = doc.get("id") if doc else None
+    collection = change["ns"]["coll"]
+    if collection == "proposals":
+        publish_proposal_event(op, doc_id, doc)
+        return
+    # Assessments read the property and its exposures; without an id
+    # (a delete) every property's are dropped
+    await invalidate_property_caches(doc.get("propertyId", doc_id) if doc else None)
+    if collection == "properties":
+        publish_property_event(op, doc_id, doc)
+
+def schedule_statistics_push(kind: str):
+    """Push fresh statistics once a burst of writes settles, at most once per STATISTICS_PUSH_SECONDS"""
+    if kind in pending_statistics_tasks or not event_log.subscribers:
+        return
+    pending_statistics_tasks.add(kind)
+    task = asyncio.create_task(outside_request(push_statistics(kind)))
+    background_tasks.append(task)
+    task.add_done_callback(background_tasks.remove)
+
+def schedule_rollup_rebuild():
+    """Rebuild the UWR_C rollup once a burst of property writes settles"""
+    if "uwrc.rollup" in pending_statistics_tasks:
+        return
+    pending_statistics_tasks.add("uwrc.rollup")
+    task = asyncio.create_task(outside_request(rebuild_rollup_later()))
+    background_tasks.append(task)
+    task.add_done_callback(background_tasks.remove)
+
+async def rebuild_rollup_later():
+    await asyncio.sleep(UWRC_ROLLUP_REBUILD_SECONDS)
+    pending_statistics_tasks.discard("uwrc.rollup")
+    try:
+        await rebuild_uwrc_rollup(db.properties, db.counters)
+    except Exception:
+        logger.exception("Could not rebuild the UWR_C rollup")
+        return
+    schedule_statistics_push("uwrc.statistics")
+
+async def push_statistics(kind: str):
+    await asyncio.sleep(STATISTICS_PUSH_SECONDS)
+    pending_statistics_tasks.discard(kind)
+    try:
+        if kind == "statistics":
+            data = (await get_statistics()).model_dump()
+        else:
+            data = await get_uwrc_statistics()
+    except Exception:
+        logger.exception("Could not compute %s for push", kind)
+        return
+    event_log.publish("statistics", kind, data)
+
+@api_router.get("/events")
+async def stream_events(
+    topics: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Server-sent proposal, property and statistics changes.
+    
+    ``topics`` is a comma-separated subset of EVENT_TOPICS (default: all).
+    A ``resync`` event means changes were missed and the client should
+    refetch.
+    """
+    wanted = set(EVENT_TOPICS)
+    if topics:
+        wanted = {topic.strip() for topic in topics.split(",") if topic.strip()}
+        unknown = wanted - set(EVENT_TOPICS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+    return StreamingResponse(
+        event_stream(event_log, wanted, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ============= METRICS =============
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Request and MongoDB command metrics in Prometheus text format"""
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # ============= ROOT ROUTE =============
 
 @api_router.get("/")
@@ -848,6 +1522,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it is outermost and times the whole request
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, slow_ms=SLOW_REQUEST_MS)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -855,6 +1533,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def ensure_indexes():
+    report = await reconcile_indexes(db)
+    if report["created"] or report["rebuilt"]:
+        logger.info("Indexes created: %s; rebuilt: %s", report["created"], report["rebuilt"])
+    if INDEX_CHECK:
+        scans = await find_collection_scans(db)
+        if scans:
+            raise RuntimeError("Hot queries fall back to COLLSCAN:\n" + "\n".join(scans))
+
+async def reconcile_statistics_periodically():
+    while True:
+        try:
+            await reconcile_proposal_counters(db.proposals, db.counters)
+        except Exception:
+            logger.exception("Statistics reconciliation failed")
+        await asyncio.sleep(STATISTICS_RECONCILE_SECONDS)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    if STATISTICS_COUNTERS:
+        background_tasks.append(asyncio.create_task(reconcile_statistics_periodically()))
+    for _ in range(DOCUMENT_WORKERS):
+        background_tasks.append(asyncio.create_task(document_worker(db)))
+    if EVENTS_CHANGE_STREAMS:
+        background_tasks.append(asyncio.create_task(
+            watch_changes(db, event_log, ("proposals", "properties", "exposures"), publish_change)
+        ))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    for task in background_tasks:
+        task.cancel()
+    shutdown_hashing()
+    shutdown_pool()
+    shutdown_document_pool()
+    client.close()
@@ -0,0 +1,374 @@
+"""Synthetic portfolio data at any volume.
+
+``populate`` fills the database with users, proposals, properties and each
+property's exposures, limits, what-ifs and documents. Values are drawn from
+skewed, realistic distributions: log-normal insured values, states
+weighted towards large markets, and status mixes resembling a live book.
+One seeded RNG drives everything, so a seed and a set of counts always
+produce the same data; only timestamps move with the time of the load.
+
+Documents are generated and written in batches with unordered
+``insert_many``, several batches in flight at once. With ``drop=True`` the
+collections are dropped first and their indexes rebuilt after the load,
+which is much faster than maintaining them row by row.
+"""
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from geo import STATE_CENTERS, point
+from indexes import reconcile_indexes
+from money import format_millions
+from pricing import price_coverages
+from search import build_search_fields
+from typed_fields import with_typed_fields
+
+DEFAULT_SEED = 42
+BATCH_SIZE = 5000
+INSERT_CONCURRENCY = 4
+
+# Collections populate writes; dropped together so references stay consistent
+DATA_COLLECTIONS = ("users", "proposals", "properties", "exposures", "limits", "whatif", "documents", "blobs", "blob_chunks")
+
+# Coverage templates per line of business; limits and aggregates in dollars
+LOB_COVERAGES = {
+    "Property": [
+        ("Building & Contents", 50_000_000, 50_000_000),
+        ("Business Interruption", 25_000_000, 25_000_000),
+        ("Account Receivable", 10_000_000, 10_000_000),
+        ("Pipe Burst", 5_000_000, 5_000_000),
+        ("Boiler & Machinery - Property Damage", 8_000_000, 8_000_000),
+        ("Spoilage/Perishables/Water Damage", 7_000_000, 7_000_000),
+    ],
+    "Umbrella": [
+        ("Excess Bodily Injury", 30_000_000, 30_000_000),
+        ("Excess Property Damage", 20_000_000, 20_000_000),
+        ("Excess Personal Injury", 15_000_000, 15_000_000),
+        ("Excess Products Liability", 10_000_000, 10_000_000),
+        ("Excess Contractual Liability", 10_000_000, 10_000_000),
+    ],
+    "General Liability": [
+        ("Bodily Injury", 25_000_000, 25_000_000),
+        ("Cyber Liability", 15_000_000, 15_000_000),
+        ("Legal Liability", 20_000_000, 20_000_000),
+        ("EPLI", 10_000_000, 10_000_000),
+        ("Contractual Liability", 12_000_000, 12_000_000),
+        ("Liquor Liability", 8_000_000, 8_000_000),
+    ],
+    "Package": [
+        ("Building & Contents", 40_000_000, 40_000_000),
+        ("Business Interruption", 20_000_000, 20_000_000),
+        ("General Liability", 15_000_000, 15_000_000),
+        ("Equipment Breakdown", 10_000_000, 10_000_000),
+        ("Crime Coverage", 5_000_000, 5_000_000),
+    ],
+    "Auto": [
+        ("Liability Coverage", 20_000_000, 20_000_000),
+        ("Physical Damage", 15_000_000, 15_000_000),
+        ("Uninsured Motorist", 10_000_000, 10_000_000),
+        ("Medical Payments", 5_000_000, 5_000_000),
+    ],
+    "Inland Marine": [
+        ("Contractors Equipment", 18_000_000, 18_000_000),
+        ("Transit Coverage", 12_000_000, 12_000_000),
+        ("Installation Floater", 10_000_000, 10_000_000),
+        ("Valuable Papers", 5_000_000, 5_000_000),
+    ],
+}
+LOB_WEIGHTS = {"Property": 10, "General Liability": 6, "Umbrella": 5, "Package": 4, "Auto": 3, "Inland Marine": 2}
+
+# (city, state abbreviation, state, weight); states are the cat model's
+CITIES = [
+    ("Los Angeles", "CA", "California", 10), ("San Francisco", "CA", "California", 5), ("San Diego", "CA", "California", 4),
+    ("Houston", "TX", "Texas", 7), ("Dallas", "TX", "Texas", 6), ("Austin", "TX", "Texas", 4),
+    ("Miami", "FL", "Florida", 6), ("Tampa", "FL", "Florida", 3), ("Orlando", "FL", "Florida", 3),
+    ("New York", "NY", "New York", 10), ("Buffalo", "NY", "New York", 1),
+    ("Chicago", "IL", "Illinois", 7), ("Philadelphia", "PA", "Pennsylvania", 4), ("Pittsburgh", "PA", "Pennsylvania", 2),
+    ("Columbus", "OH", "Ohio", 2), ("Cleveland", "OH", "Ohio", 2), ("Atlanta", "GA", "Georgia", 5),
+    ("Charlotte", "NC", "North Carolina", 3), ("Raleigh", "NC", "North Carolina", 2), ("Detroit", "MI", "Michigan", 3),
+    ("Seattle", "WA", "Washington", 4), ("Portland", "OR", "Oregon", 2), ("Phoenix", "AZ", "Arizona", 4),
+    ("Denver", "CO", "Colorado", 3), ("Las Vegas", "NV", "Nevada", 2), ("Salt Lake City", "UT", "Utah", 1),
+    ("Boston", "MA", "Massachusetts", 4), ("Newark", "NJ", "New Jersey", 2), ("Richmond", "VA", "Virginia", 1),
+    ("Nashville", "TN", "Tennessee", 2), ("Kansas City", "MO", "Missouri", 1), ("New Orleans", "LA", "Louisiana", 2),
+    ("Oklahoma City", "OK", "Oklahoma", 1), ("Charleston", "SC", "South Carolina", 1), ("Honolulu", "HI", "Hawaii", 1),
+]
+# Spread of locations around a state's center, in degrees
+LOCATION_SPREAD = 0.35
+
+BUSINESS_TYPES = [
+    ("Office", "6512", 8), ("Retail", "5311", 7), ("Hotel & Hospitality", "7011", 5), ("Manufacturing", "3711", 5),
+    ("Technology", "7372", 4), ("Healthcare", "8011", 4), ("Logistics", "4225", 4), ("Finance", "6022", 3),
+    ("Energy", "1311", 2), ("Entertainment", "7922", 2), ("Mixed Use", "6513", 2), ("Agriculture", "0191", 1),
+]
+BUILDING_NAMES = ("Center", "Tower", "Plaza", "Campus", "Park", "Complex", "Hub", "Building", "Facility", "Resort")
+CLIENT_WORDS = (
+    "Apex", "Summit", "Coastal", "Horizon", "Pacific", "Atlantic", "Liberty", "Heritage", "Pinnacle", "Meridian",
+    "Keystone", "Harbor", "Granite", "Evergreen", "Frontier", "Northstar", "Sterling", "Crescent", "Union", "Cardinal",
+)
+CLIENT_SUFFIXES = ("Inc.", "LLC", "Group", "Holdings", "Partners", "Corp", "Properties")
+FIRST_NAMES = ("William", "Maria", "James", "Linda", "Robert", "Patricia", "David", "Jennifer", "Michael", "Elizabeth")
+
+PROPOSAL_STATUSES = (("to_do", 30), ("in_process", 35), ("completed", 35))
+PRIORITIES = (("high", 30), ("medium", 45), ("low", 25))
+PROPERTY_TYPES = (("new_business", 30), ("renewal", 55), ("endorsement", 15))
+PROPERTY_STATUSES = (("pending", 35), ("completed", 65))
+PRODUCTS = ("Multi Pro", "Business Shield")
+CONSTRUCTION_TYPES = ("Steel Frame", "Reinforced Concrete", "Masonry", "Tilt-Up Concrete", "Pre-Engineered Metal", "Wood Frame", "Brick")
+DOCUMENT_KINDS = (("SOV", ".xlsx", "sov"), ("Loss Run", ".pdf", "loss_run"), ("Schedule", ".csv", "sov"))
+
+# Median insured value (dollars) and log-normal spread
+TIV_MEDIAN = 60_000_000
+TIV_SIGMA = 0.8
+WHATIF_SHARE = 0.3
+DOCUMENTS_PER_PROPERTY = 2.0
+
+
+def _weighted(rng: random.Random, options):
+    return rng.choices(options, weights=[option[-1] for option in options])[0]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _money_m(dollars: float) -> str:
+    return f"${dollars / 1_000_000:.1f}M"
+
+
+class DataGenerator:
+    """Builds documents from a single seeded RNG"""
+
+    def __init__(self, seed: int = DEFAULT_SEED, now: Optional[datetime] = None):
+        self.rng = random.Random(seed)
+        self.now = now or datetime.now(timezone.utc)
+        self.usernames: List[str] = []
+
+    def _timestamp(self, max_days: int = 730) -> datetime:
+        return self.now - timedelta(seconds=self.rng.uniform(0, max_days * 86400))
+
+    def _client(self) -> str:
+        rng = self.rng
+        return f"{rng.choice(CLIENT_WORDS)} {rng.choice(CLIENT_WORDS)} {rng.choice(CLIENT_SUFFIXES)}"
+
+    def user(self, index: int, password_hash: str) -> dict:
+        role = "UWR_B" if self.rng.random() < 0.6 else "UWR_C"
+        username = f"UWR{index:06d}"
+        if role == "UWR_B":
+            self.usernames.append(username)
+        return {
+            "id": _uuid(self.rng),
+            "username": username,
+            "password": password_hash,
+            "fullName": f"{self.rng.choice(FIRST_NAMES)} {username}",
+            "role": role,
+            "avatar": f"https://api.dicebear.com/7.x/avataaars/svg?seed={username}"
+        }
+
+    def proposal(self, proposal_id: str) -> dict:
+        rng = self.rng
+        city, state_code, _, _ = _weighted(rng, CITIES)
+        business_type, _, _ = _weighted(rng, BUSINESS_TYPES)
+        client = self._client()
+        created = self._timestamp()
+        updated = min(created + timedelta(days=rng.expovariate(1 / 20)), self.now)
+        effective = created + timedelta(days=rng.randint(15, 90))
+        proposal = {
+            "id": proposal_id,
+            "title": f"{city} {business_type.split(' &')[0]} {rng.choice(BUILDING_NAMES)}",
+            "client": client,
+            "location": f"{city}, {state_code}",
+            "priority": _weighted(rng, PRIORITIES)[0],
+            "status": _weighted(rng, PROPOSAL_STATUSES)[0],
+            "clientId": f"CLT-{rng.getrandbits(32):08X}",
+            "firstNameInsured": rng.choice(FIRST_NAMES),
+            "businessType": business_type,
+            "totalInsuredValue": _money_m(rng.lognormvariate(0, TIV_SIGMA) * TIV_MEDIAN),
+            "website": f"www.{client.lower().replace(' ', '').replace('.', '')[:15]}.com",
+            "createdBy": rng.choice(self.usernames) if self.usernames else "LARA",
+            "effectiveDate": effective.strftime("%m/%d/%Y"),
+            "expirationDate": (effective + timedelta(days=365)).strftime("%m/%d/%Y"),
+            "createdAt": created.isoformat(),
+            "updatedAt": updated.isoformat()
+        }
+        proposal.update(build_search_fields(proposal))
+        return with_typed_fields("proposals", proposal)
+
+    def property(self, property_id: str) -> Dict[str, List[dict]]:
+        """A property with its exposures, limits, what-ifs and documents"""
+        rng = self.rng
+        city, _, state, _ = _weighted(rng, CITIES)
+        business_type, sic_code, _ = _weighted(rng, BUSINESS_TYPES)
+        lat, lng = STATE_CENTERS[state]
+        lob_names = list(LOB_WEIGHTS)
+        lobs = []
+        while not lobs or (len(lobs) < len(lob_names) and rng.random() < 0.45):
+            lob = rng.choices(lob_names, weights=list(LOB_WEIGHTS.values()))[0]
+            if lob not in lobs:
+                lobs.append(lob)
+        # Every coverage of the property scales with its size
+        scale = rng.lognormvariate(0, TIV_SIGMA) * TIV_MEDIAN / 105_000_000
+        name = f"{city} {business_type.split(' &')[0]} {rng.choice(BUILDING_NAMES)}"
+
+        exposures, limits, whatifs = [], [], []
+        tiv_cents = 0
+        for lob in lobs:
+            coverages = [(coverage, limit * scale, aggregate * scale) for coverage, limit, aggregate in LOB_COVERAGES[lob]]
+            total = sum(limit for _, limit, _ in coverages) * 1.1
+            if lob in ("Property", "Package", "Inland Marine"):
+                tiv_cents += round(total) * 100
+            exposures.append({
+                "propertyId": property_id,
+                "lob": lob,
+                "propertyName": name,
+                "totalInsurableValue2024": _money_m(total / 1.1),
+                "totalInsurableValue2025": _money_m(total),
+                "coverages": [{"name": coverage, "limit": _money_m(limit)} for coverage, limit, _ in coverages]
+            })
+            limits.append({
+                "propertyId": property_id,
+                "lob": lob,
+                "propertyName": name,
+                "categories": [
+                    {"name": coverage, "perOccurrenceLimit": _money_m(limit), "aggregateLimit": _money_m(aggregate)}
+                    for coverage, limit, aggregate in coverages
+                ] + [{"name": "War & Terrorism", "perOccurrenceLimit": "Not Covered", "aggregateLimit": "Not Covered"}]
+            })
+            if rng.random() < WHATIF_SHARE:
+                deductible = int(rng.choice((1, 2.5, 5, 10, 25)) * 100_000_000)
+                priced, total_cents = price_coverages([
+                    {"name": coverage, "limit": _money_m(limit * rng.uniform(0.8, 1.5)), "deductible": format_millions(deductible)}
+                    for coverage, limit, _ in coverages
+                ])
+                whatifs.append({
+                    "propertyId": property_id,
+                    "lob": lob,
+                    "coverages": priced,
+                    "totalPremium": format_millions(total_cents, 2),
+                    "totalPremiumCents": total_cents,
+                    "updatedAt": self._timestamp(90).isoformat()
+                })
+
+        # A property's premium runs at roughly 0.5-2% of its insured value
+        premium_cents = int(round(max(tiv_cents, 100_000_000) * rng.uniform(0.005, 0.02), -4))
+        property_doc = {
+            "id": property_id,
+            "product": rng.choice(PRODUCTS),
+            "lobs": lobs,
+            "customerName": self._client(),
+            "effectiveDate": self._timestamp(365).strftime("%m/%d/%Y"),
+            "sicCode": sic_code,
+            "operation": business_type,
+            "state": state,
+            "customerId": f"CLT-{rng.randint(1, 99_999):05d}",
+            "type": _weighted(rng, PROPERTY_TYPES)[0],
+            "status": _weighted(rng, PROPERTY_STATUSES)[0],
+            "premium": format_millions(premium_cents),
+            "premiumCents": premium_cents,
+            "propertyName": name,
+            "location": point(
+                round(lat + rng.gauss(0, LOCATION_SPREAD), 6), round(lng + rng.gauss(0, LOCATION_SPREAD), 6)
+            ),
+            "tivCents": tiv_cents,
+            "yearBuilt": str(min(int(rng.triangular(1900, 2024, 1995)), 2024)),
+            "constructionType": rng.choice(CONSTRUCTION_TYPES)
+        }
+
+        documents = []
+        for _ in range(min(int(rng.expovariate(1 / DOCUMENTS_PER_PROPERTY)), 10)):
+            label, suffix, doc_type = rng.choice(DOCUMENT_KINDS)
+            size = int(rng.lognormvariate(13, 1.5))
+            uploaded = self._timestamp(365)
+            documents.append({
+                "id": _uuid(rng),
+                "propertyId": property_id,
+                "name": f"{label} {uploaded:%Y-%m}{suffix}",
+                "size": f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.1f} KB",
+                "sizeBytes": size,
+                "uploadedAt": uploaded.strftime("%m/%d/%Y"),
+                "queuedAt": uploaded.isoformat(),
+                "status": "completed",
+                "confidence": rng.randint(40, 98),
+                "extraction": {"documentType": doc_type}
+            })
+
+        docs = {"properties": [property_doc], "exposures": exposures, "limits": limits, "whatif": whatifs, "documents": documents}
+        return {name: [with_typed_fields(name, doc) for doc in batch] for name, batch in docs.items()}
+
+
+def _id_width(count: int) -> int:
+    return max(3, len(str(count)))
+
+
+def _batches(make: Callable[[int], Dict[str, List[dict]]], count: int, batch_size: int) -> Iterator[Dict[str, List[dict]]]:
+    batch: Dict[str, List[dict]] = {}
+    rows = 0
+    for index in range(1, count + 1):
+        for collection, docs in make(index).items():
+            batch.setdefault(collection, []).extend(docs)
+            rows += len(docs)
+        if rows >= batch_size:
+            yield batch
+            batch, rows = {}, 0
+    if batch:
+        yield batch
+
+
+async def populate(
+    db,
+    users: int = 0,
+    proposals: int = 40,
+    properties: int = 10,
+    seed: int = DEFAULT_SEED,
+    password_hash: Optional[str] = None,
+    drop: bool = False,
+    batch_size: int = BATCH_SIZE,
+    progress: Optional[Callable[[str, int], None]] = None
+) -> Dict[str, int]:
+    """Generate and insert synthetic data; returns the documents written per collection.
+
+    Synthetic users share ``password_hash``, so bcrypt runs once per load.
+    """
+    if drop:
+        for name in DATA_COLLECTIONS:
+            await db[name].drop()
+
+    generator = DataGenerator(seed)
+    written: Dict[str, int] = {}
+    in_flight = asyncio.Semaphore(INSERT_CONCURRENCY)
+    tasks: List[asyncio.Task] = []
+
+    async def insert(collection: str, docs: List[dict]) -> None:
+        try:
+            await db[collection].insert_many(docs, ordered=False)
+        finally:
+            in_flight.release()
+
+    async def load(make, count: int, label: str) -> None:
+        batches = _batches(make, count, batch_size)
+        while True:
+            # Building a batch is CPU work; keep the event loop serving requests meanwhile
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            for collection, docs in batch.items():
+                if not docs:
+                    continue
+                await in_flight.acquire()
+                tasks.append(asyncio.create_task(insert(collection, docs)))
+                written[collection] = written.get(collection, 0) + len(docs)
+            if progress:
+                progress(label, written.get(label, 0))
+
+    if users:
+        await load(lambda i: {"users": [generator.user(i, password_hash)]}, users, "users")
+    width = _id_width(proposals)
+    await load(lambda i: {"proposals": [generator.proposal(f"prop-{i:0{width}d}")]}, proposals, "proposals")
+    width = _id_width(properties)
+    await load(lambda i: generator.property(f"prop-uwrc-{i:0{width}d}"), properties, "properties")
+    await asyncio.gather(*tasks)
+
+    if drop:
+        await reconcile_indexes(db)
+    return written
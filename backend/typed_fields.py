@@ -0,0 +1,208 @@
+"""Typed copies of money and date fields.
+
+Many amounts and dates arrive and are displayed as strings, such as
+``"$185.0M"`` or ``"10/26/2025"``. Each one is also stored in a typed
+field: integer cents (see ``money``) or a BSON date. Sums, sorts and
+range filters use the typed field, so they run in MongoDB over indexes
+instead of in Python after parsing every string. The display strings stay
+as they are, so existing clients see the same documents.
+
+``TYPED_FIELDS`` lists, per collection, each display field with its typed
+field. ``"coverages.limit"`` means the ``limit`` of every element of the
+``coverages`` array. Writers pass documents and partial updates through
+``with_typed_fields``. ``migrate_typed_fields`` converts documents written
+before the typed fields existed.
+"""
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from pymongo import UpdateOne
+
+from money import parse_money
+
+logger = logging.getLogger(__name__)
+
+MONEY = "money"
+DATE = "date"
+
+# Writers that compute the exact amount (premiumCents, totalPremiumCents)
+# set it themselves; their display strings are rounded and are not listed
+TYPED_FIELDS: Dict[str, List[Tuple[str, str, str]]] = {
+    "proposals": [
+        ("totalInsuredValue", "totalInsuredValueCents", MONEY),
+        ("effectiveDate", "effectiveOn", DATE),
+        ("expirationDate", "expiresOn", DATE),
+    ],
+    "properties": [
+        ("effectiveDate", "effectiveOn", DATE),
+    ],
+    "exposures": [
+        ("totalInsurableValue2024", "totalInsurableValue2024Cents", MONEY),
+        ("totalInsurableValue2025", "totalInsurableValue2025Cents", MONEY),
+        ("coverages.limit", "coverages.limitCents", MONEY),
+    ],
+    "limits": [
+        ("categories.perOccurrenceLimit", "categories.perOccurrenceLimitCents", MONEY),
+        ("categories.aggregateLimit", "categories.aggregateLimitCents", MONEY),
+    ],
+    "whatif": [
+        ("coverages.limit", "coverages.limitCents", MONEY),
+        ("coverages.deductible", "coverages.deductibleCents", MONEY),
+    ],
+    "documents": [
+        ("uploadedAt", "uploadedOn", DATE),
+    ],
+}
+
+# Cents fields written as floats by older loaders
+INTEGER_FIELDS: Dict[str, List[str]] = {
+    "properties": ["premiumCents", "tivCents"],
+    "whatif": ["totalPremiumCents"],
+}
+
+DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d")
+
+
+def parse_date(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Convert ``"10/26/2025"``, ``"2025-10-26"`` or an ISO timestamp to a UTC midnight date"""
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    return datetime(parsed.year, parsed.month, parsed.day)
+
+
+def format_date(value: Optional[datetime]) -> str:
+    """Format a stored date the way the UI displays it, e.g. ``"10/26/2025"``"""
+    return value.strftime("%m/%d/%Y") if value else ""
+
+
+PARSERS: Dict[str, Callable] = {MONEY: parse_money, DATE: parse_date}
+
+
+def _parse(kind: str, value):
+    try:
+        return PARSERS[kind](value)
+    except (TypeError, AttributeError):
+        return None
+
+
+def typed_values(collection: str, doc: dict) -> dict:
+    """The typed fields for the display fields ``doc`` sets, as a ``$set`` document.
+
+    Arrays come back whole, each element with its typed fields added.
+    Values that do not parse, such as ``"Not Covered"``, are stored as None.
+    """
+    values = {}
+    for display, typed, kind in TYPED_FIELDS.get(collection, []):
+        array, _, display_key = display.rpartition(".")
+        if not array:
+            if display in doc:
+                values[typed] = _parse(kind, doc[display])
+            continue
+        elements = values.get(array, doc.get(array))
+        if not isinstance(elements, list):
+            continue
+        typed_key = typed.rpartition(".")[2]
+        values[array] = [
+            {**element, typed_key: _parse(kind, element[display_key])}
+            if isinstance(element, dict) and display_key in element else element
+            for element in elements
+        ]
+    return values
+
+
+def with_typed_fields(collection: str, doc: dict) -> dict:
+    """``doc`` with typed fields derived from the display fields it sets"""
+    return {**doc, **typed_values(collection, doc)}
+
+
+def _needs_conversion(collection: str) -> dict:
+    clauses = []
+    for display, typed, _ in TYPED_FIELDS.get(collection, []):
+        array, _, display_key = display.rpartition(".")
+        if array:
+            clauses.append({array: {"$elemMatch": {
+                display_key: {"$exists": True}, typed.rpartition(".")[2]: {"$exists": False}
+            }}})
+        else:
+            clauses.append({display: {"$exists": True}, typed: {"$exists": False}})
+    return {"$or": clauses} if clauses else {}
+
+
+async def _convert_integers(collection, fields: List[str], dry_run: bool) -> int:
+    converted = 0
+    for field in fields:
+        query = {field: {"$type": "double"}}
+        if dry_run:
+            converted += await collection.count_documents(query)
+            continue
+        result = await collection.update_many(query, [{"$set": {field: {"$toLong": {"$round": [f"${field}", 0]}}}}])
+        converted += result.modified_count
+    return converted
+
+
+async def migrate_collection(collection, name: str, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    """Add the typed fields to every document of one collection that lacks them.
+
+    Safe to run while the API serves traffic and to rerun after an
+    interruption. Documents are read in ``_id`` order and written in
+    unordered bulk batches. Each write only applies if the display fields
+    still hold the values the typed fields were parsed from. A document
+    changed in between counts as skipped and is picked up by the next run.
+    With ``dry_run`` the documents needing conversion are only counted.
+    """
+    report = {"converted": 0, "skipped": 0, "unparsed": 0}
+    report["integers"] = await _convert_integers(collection, INTEGER_FIELDS.get(name, []), dry_run)
+    query = _needs_conversion(name)
+    if not query:
+        return report
+    if dry_run:
+        report["converted"] = await collection.count_documents(query)
+        return report
+
+    sources = {display.split(".")[0] for display, _, _ in TYPED_FIELDS[name]}
+    projection = {field: 1 for field in sources}
+    batch: List[UpdateOne] = []
+
+    async def flush():
+        result = await collection.bulk_write(batch, ordered=False)
+        report["converted"] += result.matched_count
+        report["skipped"] += len(batch) - result.matched_count
+
+    cursor = collection.find(query, projection).sort("_id", 1)
+    async for doc in cursor.batch_size(batch_size):
+        values = typed_values(name, doc)
+        report["unparsed"] += sum(
+            1 for display, typed, _ in TYPED_FIELDS[name]
+            if "." not in typed and values.get(typed) is None and doc.get(display) is not None
+        )
+        guard = {"_id": doc["_id"], **{field: doc.get(field) for field in sources}}
+        batch.append(UpdateOne(guard, {"$set": values}))
+        if len(batch) >= batch_size:
+            await flush()
+            batch = []
+    if batch:
+        await flush()
+    return report
+
+
+async def migrate_typed_fields(db, collections: Optional[List[str]] = None, batch_size: int = 1000,
+                               dry_run: bool = False) -> Dict[str, dict]:
+    """Run ``migrate_collection`` over each collection with typed fields"""
+    reports = {}
+    for name in collections or sorted(set(TYPED_FIELDS) | set(INTEGER_FIELDS)):
+        reports[name] = await migrate_collection(db[name], name, batch_size, dry_run)
+        logger.info("Typed fields for %s: %s", name, reports[name])
+    return reports
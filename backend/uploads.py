@@ -0,0 +1,87 @@
+"""Streaming multipart parsing for file uploads.
+
+Starlette's ``request.form()`` spools every file part to a temporary file
+before the handler runs. ``stream_file_field`` instead feeds the request
+body to the multipart parser as it arrives and yields one named file
+field's bytes straight to the caller, so a handler can hash and store an
+upload of any size with flat memory.
+"""
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Union
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+class UploadError(ValueError):
+    pass
+
+
+@dataclass
+class FilePart:
+    filename: str
+    content_type: str
+
+
+async def stream_file_field(request, field: str = "file") -> AsyncIterator[Union[FilePart, bytes]]:
+    """Yield the ``field`` part's ``FilePart`` header, then its data in pieces.
+
+    Other form fields are skipped. Raises ``UploadError`` when the body is
+    not multipart or carries no such file.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected a multipart/form-data body")
+
+    state = {"field": None, "value": b"", "headers": {}, "active": False, "found": False}
+    pending: List[Union[FilePart, bytes]] = []
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        state["field"] = (state["field"] or b"") + data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        state["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"], state["value"] = None, b""
+
+    def on_headers_finished() -> None:
+        headers, state["headers"] = state["headers"], {}
+        _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("latin-1")
+        filename = disposition.get(b"filename")
+        state["active"] = name == field and filename is not None and not state["found"]
+        if state["active"]:
+            state["found"] = True
+            pending.append(FilePart(
+                filename=filename.decode("utf-8", "replace"),
+                content_type=headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+            ))
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if state["active"]:
+            pending.append(data[start:end])
+
+    def on_part_end() -> None:
+        state["active"] = False
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    async for chunk in request.stream():
+        parser.write(chunk)
+        # Hand over what this chunk produced before reading the next one
+        for item in pending:
+            yield item
+        pending.clear()
+    parser.finalize()
+    if not state["found"]:
+        raise UploadError(f"No file in form field '{field}'")
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { Card, CardContent } from './ui/card';
@@ -8,16 +8,35 @@ import { FileText } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const PENDING_STATUSES = ['queued', 'processing'];
+const DOCUMENT_POLL_MS = 2000;
+const STATUS_BADGE_CLASSES = {
+  queued: 'bg-gray-400',
+  processing: 'bg-yellow-500',
+  completed: 'bg-green-500',
+  failed: 'bg-red-500'
+};
 
 const PropertyOverview = ({ property }) => {
   const navigate = useNavigate();
   const [documents, setDocuments] = useState([]);
   const [uploading, setUploading] = useState(false);
+  const fileInputRef = useRef(null);
 
   useEffect(() => {
     fetchDocuments();
   }, [property.id]);
 
+  // Poll while any document is still being extracted
+  const hasPendingDocuments = documents.some((doc) => PENDING_STATUSES.includes(doc.status));
+  useEffect(() => {
+    if (!hasPendingDocuments) {
+      return undefined;
+    }
+    const timer = setInterval(fetchDocuments, DOCUMENT_POLL_MS);
+    return () => clearInterval(timer);
+  }, [hasPendingDocuments, property.id]);
+
   const fetchDocuments = async () => {
     try {
       const response = await axios.get(`${API}/properties/${property.id}/documents`);
@@ -36,24 +55,35 @@ const PropertyOverview = ({ property }) => {
     }
   };
 
-  const handleUploadDocument = async () => {
+  const handleUploadDocument = () => {
+    fileInputRef.current?.click();
+  };
+
+  const handleFileSelected = async (event) => {
+    const file = event.target.files?.[0];
+    event.target.value = '';
+    if (!file) {
+      return;
+    }
     setUploading(true);
     try {
-      const newDoc = {
-        name: `Document_${Date.now()}.pdf`,
-        size: '2.5 MB'
-      };
-      await axios.post(`${API}/properties/${property.id}/documents`, newDoc);
+      const formData = new FormData();
+      formData.append('file', file);
+      await axios.post(`${API}/properties/${property.id}/documents`, formData);
       await fetchDocuments();
-      alert('Document uploaded successfully!');
+      alert('Document uploaded; extraction is running in the background.');
     } catch (error) {
       console.error('Error uploading document:', error);
-      alert('Error uploading document');
+      alert(error.response?.status === 503 ? 'Document processing is busy, please try again shortly' : 'Error uploading document');
     } finally {
       setUploading(false);
     }
   };
 
+  const handleDownloadDocument = (documentId) => {
+    window.open(`${API}/properties/${property.id}/documents/${documentId}/download`, '_blank');
+  };
+
   const handleDeleteDocument = async (documentId) => {
     if (!window.confirm('Are you sure you want to delete this document?')) {
       return;
@@ -144,6 +174,13 @@ const PropertyOverview = ({ property }) => {
           </svg>
           {uploading ? 'Uploading...' : 'Upload Document'}
         </Button>
+        <input
+          type="file"
+          ref={fileInputRef}
+          className="hidden"
+          onChange={handleFileSelected}
+          data-testid="upload-document-input"
+        />
 
         {documents.map((doc, index) => (
           <div key={doc.id || index} className="flex items-center justify-between p-4 bg-gray-50 rounded-lg border border-gray-200 mb-3">
@@ -154,8 +191,9 @@ const PropertyOverview = ({ property }) => {
               <div>
                 <p className="text-gray-900 font-semibold text-lg">{doc.name}</p>
                 <p className="text-gray-500 text-sm">{doc.size} • Uploaded {doc.uploadedAt}</p>
-                <Badge className="mt-2 bg-green-500 text-white border-0">
-                  {doc.status.toUpperCase()} ({doc.confidence}% confidence)
+                <Badge className={`mt-2 ${STATUS_BADGE_CLASSES[doc.status] || 'bg-green-500'} text-white border-0`}>
+                  {doc.status.toUpperCase()}
+                  {doc.confidence !== null && doc.confidence !== undefined && ` (${doc.confidence}% confidence)`}
                 </Badge>
               </div>
             </div>
@@ -175,6 +213,8 @@ const PropertyOverview = ({ property }) => {
                 variant="outline" 
                 className="text-green-600 border-green-300 hover:bg-green-50"
                 data-testid="download-button"
+                onClick={() => handleDownloadDocument(doc.id)}
+                disabled={!doc.sha256}
               >
                 <svg className="w-4 h-4 mr-2" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                   <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4" />
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { Button } from '../components/ui/button';
@@ -24,6 +24,7 @@ const Dashboard = ({ user, onLogout }) => {
   const navigate = useNavigate();
   const [statistics, setStatistics] = useState(null);
   const [proposals, setProposals] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [filteredProposals, setFilteredProposals] = useState([]);
   const [activeTab, setActiveTab] = useState('all');
   const [searchQuery, setSearchQuery] = useState('');
@@ -45,22 +46,63 @@ const Dashboard = ({ user, onLogout }) => {
     expirationDate: ''
   });
 
+  // The first page follows the active tab and search; typing is debounced
   useEffect(() => {
-    fetchData();
-  }, []);
+    const timer = setTimeout(fetchData, searchQuery ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [activeTab, searchQuery]);
 
   useEffect(() => {
     filterProposals();
-  }, [proposals, activeTab, searchQuery]);
+  }, [proposals, activeTab]);
+
+  // Live updates are subscribed once; refetch with the current filters
+  const fetchDataRef = useRef(null);
+  fetchDataRef.current = () => fetchData();
+
+  // Live updates: merge pushed proposal changes, refetch when changes were missed
+  useEffect(() => {
+    const source = new EventSource(`${API}/events?topics=proposals,statistics`);
+    let refetchTimer = null;
+    const refetchSoon = () => {
+      clearTimeout(refetchTimer);
+      refetchTimer = setTimeout(() => fetchDataRef.current(), 1000);
+    };
+    source.addEventListener('statistics', (e) => setStatistics(JSON.parse(e.data)));
+    source.addEventListener('proposal', (e) => {
+      const { op, id, proposal } = JSON.parse(e.data);
+      if (op === 'deleted' && id) {
+        setProposals(current => current.filter(p => p.id !== id));
+      } else if (op === 'updated' && proposal) {
+        setProposals(current => current.map(p => (p.id === id ? proposal : p)));
+      } else if (op === 'created' && proposal) {
+        setProposals(current => (current.some(p => p.id === id) ? current : [proposal, ...current]));
+      } else {
+        refetchSoon();
+      }
+    });
+    source.addEventListener('resync', refetchSoon);
+    return () => {
+      clearTimeout(refetchTimer);
+      source.close();
+    };
+  }, []);
+
+  // Query params for the proposal list; every page must use the same ones
+  const proposalParams = () => ({
+    ...(activeTab !== 'all' && { status: activeTab }),
+    ...(searchQuery.trim() && { search: searchQuery.trim() })
+  });
 
   const fetchData = async () => {
     try {
       const [statsRes, proposalsRes] = await Promise.all([
         axios.get(`${API}/statistics`),
-        axios.get(`${API}/proposals`)
+        axios.get(`${API}/proposals`, { params: proposalParams() })
       ]);
       setStatistics(statsRes.data);
-      setProposals(proposalsRes.data);
+      setProposals(proposalsRes.data.items);
+      setNextCursor(proposalsRes.data.next_cursor);
       setLoading(false);
     } catch (error) {
       console.error('Error fetching data:', error);
@@ -68,23 +110,25 @@ const Dashboard = ({ user, onLogout }) => {
     }
   };
 
+  const loadMoreProposals = async () => {
+    try {
+      const response = await axios.get(`${API}/proposals`, { params: { ...proposalParams(), cursor: nextCursor } });
+      setProposals([...proposals, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error loading more proposals:', error);
+    }
+  };
+
   const filterProposals = () => {
     let filtered = [...proposals];
 
-    // Filter by status
+    // Filter by status; pages already match, but pushed changes may not.
+    // Search runs on the server only, since it also matches typos
     if (activeTab !== 'all') {
       filtered = filtered.filter(p => p.status === activeTab);
     }
 
-    // Filter by search query
-    if (searchQuery) {
-      filtered = filtered.filter(p => 
-        p.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        p.client.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        p.location.toLowerCase().includes(searchQuery.toLowerCase())
-      );
-    }
-
     setFilteredProposals(filtered);
   };
 
@@ -492,6 +536,17 @@ const Dashboard = ({ user, onLogout }) => {
               </TableBody>
             </Table>
           </div>
+          {nextCursor && (
+            <div className="flex justify-center mt-4">
+              <Button
+                variant="outline"
+                onClick={loadMoreProposals}
+                data-testid="load-more-proposals"
+              >
+                Load More
+              </Button>
+            </div>
+          )}
         </div>
       </div>
     </div>
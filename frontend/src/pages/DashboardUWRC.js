@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { Button } from '../components/ui/button';
@@ -29,6 +29,26 @@ const DashboardUWRC = ({ user, onLogout }) => {
     fetchProperties();
   }, [selectedState, selectedLOB, selectedCustomerId]);
 
+  // Live updates; the ref keeps the handlers on the current filter selection
+  const fetchDataRef = useRef(null);
+  fetchDataRef.current = () => fetchData();
+
+  useEffect(() => {
+    const source = new EventSource(`${API}/events?topics=properties,statistics`);
+    let refetchTimer = null;
+    const refetchSoon = () => {
+      clearTimeout(refetchTimer);
+      refetchTimer = setTimeout(() => fetchDataRef.current(), 1000);
+    };
+    source.addEventListener('uwrc.statistics', (e) => setStatistics(JSON.parse(e.data)));
+    source.addEventListener('property', refetchSoon);
+    source.addEventListener('resync', refetchSoon);
+    return () => {
+      clearTimeout(refetchTimer);
+      source.close();
+    };
+  }, []);
+
   const fetchData = async () => {
     try {
       const [statsRes, filtersRes] = await Promise.all([
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from assessment import AssessmentCache
+
+
+def test_concurrent_requests_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"body"
+
+    async def run():
+        cache = AssessmentCache(1024)
+        bodies = await asyncio.gather(*(cache.get_or_compute("p1", "k", compute) for _ in range(3)))
+        return bodies, await cache.get("p1", "k"), cache._pending
+
+    bodies, cached, pending = asyncio.run(run())
+    assert bodies == [b"body"] * 3
+    assert cached == b"body" and calls == [1] and pending == {}
+
+
+def test_cancelled_first_request_does_not_fail_the_others():
+    async def run():
+        cache = AssessmentCache(1024)
+        running = asyncio.Event()
+
+        async def compute():
+            running.set()
+            await asyncio.sleep(0.05)
+            return b"body"
+
+        first = asyncio.create_task(cache.get_or_compute("p1", "k", compute))
+        await running.wait()
+        second = asyncio.create_task(cache.get_or_compute("p1", "k", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, await cache.get("p1", "k")
+
+    assert asyncio.run(run()) == (b"body", b"body")
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model failed")
+
+    async def run():
+        cache = AssessmentCache(1024)
+        results = await asyncio.gather(*(cache.get_or_compute("p1", "k", compute) for _ in range(2)),
+                                       return_exceptions=True)
+        return results, await cache.get("p1", "k"), cache._pending
+
+    results, cached, pending = asyncio.run(run())
+    assert [str(result) for result in results] == ["model failed"] * 2
+    assert cached is None and pending == {}
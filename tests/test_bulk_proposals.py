@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+import server
+from rollups import count_proposals_by_status, read_proposal_counters, reconcile_proposal_counters
+from search import build_search_fields
+from typed_fields import with_typed_fields
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+USER = {"fullName": "Test User"}
+
+
+def proposal(title: str, **fields) -> dict:
+    return {
+        "title": title, "client": "Acme Holdings", "location": "Austin, TX", "priority": "medium",
+        "clientId": "CLT-1", "firstNameInsured": "Ann", "businessType": "Office", "totalInsuredValue": "$1.0M",
+        "website": "www.acme.com", "effectiveDate": "01/01/2026", "expirationDate": "01/01/2027", **fields,
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "STATISTICS_COUNTERS", True)
+
+    async def seed():
+        docs = []
+        for number, status in enumerate(["to_do", "to_do", "in_process", "in_process", "completed"], 1):
+            doc = server.Proposal(**proposal(f"Proposal {number}", status=status), createdBy="Seed").model_dump()
+            doc = with_typed_fields("proposals", {**doc, "id": f"p{number}"})
+            docs.append({**doc, **build_search_fields(doc)})
+        await db.proposals.insert_many(docs)
+        await db.proposals.create_index("id", unique=True)
+        await reconcile_proposal_counters(db.proposals, db.counters)
+
+    asyncio.run(seed())
+    return db
+
+
+def bulk(operations):
+    return asyncio.run(server.bulk_write_proposals(server.BulkProposalRequest(operations=operations), USER))
+
+
+def counters(db):
+    async def read():
+        return await read_proposal_counters(db.counters), await count_proposals_by_status(db.proposals)
+    stored, actual = asyncio.run(read())
+    assert stored == actual
+    return stored
+
+
+def before_bulk_write(monkeypatch, db, change):
+    """Run ``change`` after the batch's pre-read, just before its bulk write"""
+    collection_type = type(db.proposals)
+    bulk_write = collection_type.bulk_write
+
+    async def racing_bulk_write(self, requests, **kwargs):
+        await change()
+        return await bulk_write(self, requests, **kwargs)
+
+    monkeypatch.setattr(collection_type, "bulk_write", racing_bulk_write)
+
+
+def statuses(response):
+    return [(result["op"], result.get("id"), result["status"]) for result in response["results"]]
+
+
+def test_mixed_batch(db):
+    response = bulk([
+        {"op": "create", "proposal": proposal("Harbor Warehouse")},
+        {"op": "update", "id": "p1", "changes": {"status": "completed", "title": "Renamed"}},
+        {"op": "delete", "id": "p3"},
+        {"op": "update", "id": "missing", "changes": {"status": "completed"}},
+        {"op": "create", "proposal": {"title": "incomplete"}},
+    ])
+    created = response["results"][0]["id"]
+    assert statuses(response) == [
+        ("create", created, "created"),
+        ("update", "p1", "updated"),
+        ("delete", "p3", "deleted"),
+        ("update", "missing", "not_found"),
+        ("create", None, "invalid"),
+    ]
+    assert {key: response[key] for key in server.BULK_STATUSES} == {
+        "created": 1, "updated": 1, "deleted": 1, "not_found": 1, "invalid": 1, "failed": 0
+    }
+    assert counters(db) == {"to_do": 2, "in_process": 1, "completed": 2}
+    renamed = asyncio.run(db.proposals.find_one({"id": "p1"}))
+    assert renamed["title"] == "Renamed"
+    assert "renamed" in renamed["searchTokens"] and "proposal" not in renamed["searchTokens"]
+
+
+def test_update_after_status_changed(db, monkeypatch):
+    async def change():
+        # A concurrent single update, counted the way update_proposal counts it
+        await db.proposals.update_one({"id": "p1"}, {"$set": {"status": "in_process"}})
+        await server.record_proposal_status(db.counters, "to_do", "in_process")
+
+    before_bulk_write(monkeypatch, db, change)
+    response = bulk([
+        {"op": "update", "id": "p1", "changes": {"status": "completed"}},
+        {"op": "update", "id": "p2", "changes": {"status": "completed"}},
+    ])
+    assert statuses(response) == [("update", "p1", "updated"), ("update", "p2", "updated")]
+    assert counters(db) == {"in_process": 2, "completed": 3}
+
+
+def remove_p3(db):
+    async def change():
+        await db.proposals.delete_one({"id": "p3"})
+        await server.record_proposal_status(db.counters, "in_process", None)
+    return change
+
+
+def test_delete_already_removed(db, monkeypatch):
+    before_bulk_write(monkeypatch, db, remove_p3(db))
+    response = bulk([{"op": "delete", "id": "p3"}, {"op": "update", "id": "p5", "changes": {"status": "to_do"}}])
+    assert statuses(response) == [("delete", "p3", "not_found"), ("update", "p5", "updated")]
+    assert counters(db) == {"to_do": 3, "in_process": 1}
+
+
+def test_delete_race_that_cannot_be_attributed_reconciles_counters(db, monkeypatch):
+    # One of two deletes matched, but the bulk result does not say which
+    before_bulk_write(monkeypatch, db, remove_p3(db))
+    response = bulk([{"op": "delete", "id": "p3"}, {"op": "delete", "id": "p5"}])
+    assert statuses(response) == [("delete", "p3", "deleted"), ("delete", "p5", "deleted")]
+    assert counters(db) == {"to_do": 2, "in_process": 1}
+
+
+def test_write_error_on_one_create(db):
+    asyncio.run(db.proposals.create_index("title", unique=True))
+    response = bulk([
+        {"op": "create", "proposal": proposal("Proposal 1")},
+        {"op": "create", "proposal": proposal("Harbor Warehouse", status="in_process")},
+        {"op": "update", "id": "p2", "changes": {"status": "completed"}},
+    ])
+    results = response["results"]
+    assert [result["status"] for result in results] == ["failed", "created", "updated"]
+    assert results[0]["error"]
+    assert response["failed"] == 1
+    assert counters(db) == {"to_do": 1, "in_process": 3, "completed": 2}
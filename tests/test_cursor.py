@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from queries import keyset_after, match_all, proposal_sort
+from server import decode_cursor, encode_cursor
+
+ROWS = [
+    {"id": "p1", "totalInsuredValueCents": 300},
+    {"id": "p2", "totalInsuredValueCents": None},
+    {"id": "p3", "totalInsuredValueCents": 100},
+    {"id": "p4"},
+    {"id": "p5", "totalInsuredValueCents": 300},
+    {"id": "p6", "totalInsuredValueCents": None},
+    {"id": "p7", "totalInsuredValueCents": 200},
+]
+
+
+@pytest.mark.parametrize("value", [None, 1_250_000_000, "2025-10-26T00:00:00+00:00", "O'Brien & Sons"])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor("totalInsuredValueCents", "desc", value, "p-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "totalInsuredValueCents", "desc") == (value, "p-1")
+
+
+def test_cursor_rejects_other_sort_and_garbage():
+    cursor = encode_cursor("title", "asc", "A", "p1")
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "title", "desc")
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException):
+        decode_cursor("not a cursor", "title", "asc")
+
+
+def test_keyset_after_matches_nulls_explicitly():
+    # MongoDB range operators only compare values of one type, so nothing is
+    # ever $gt or $lt null; the null rows need their own clauses
+    assert keyset_after("tiv", "asc", None, "p2") == {"$or": [
+        {"tiv": None, "id": {"$gt": "p2"}},
+        {"tiv": {"$ne": None}},
+    ]}
+    assert keyset_after("tiv", "desc", None, "p6") == {"$or": [{"tiv": None, "id": {"$lt": "p6"}}]}
+    assert keyset_after("tiv", "desc", 100, "p3") == {"$or": [
+        {"tiv": {"$lt": 100}},
+        {"tiv": 100, "id": {"$lt": "p3"}},
+        {"tiv": None},
+    ]}
+    assert keyset_after("tiv", "asc", 100, "p3") == {"$or": [
+        {"tiv": {"$gt": 100}},
+        {"tiv": 100, "id": {"$gt": "p3"}},
+    ]}
+
+
+def _expected(order):
+    # Missing and null keys sort together, before every value
+    def key(row):
+        value = row.get("totalInsuredValueCents")
+        return (value is not None, value or 0, row["id"])
+    return [row["id"] for row in sorted(ROWS, key=key, reverse=order == "desc")]
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pages_through_null_sort_keys(order):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    sort = "totalInsuredValueCents"
+
+    async def run():
+        collection = mongomock_motor.AsyncMongoMockClient()["test"]["proposals"]
+        await collection.insert_many([dict(row) for row in ROWS])
+        seen, cursor = [], None
+        while True:
+            filters = []
+            if cursor:
+                value, last_id = decode_cursor(cursor, sort, order)
+                filters.append(keyset_after(sort, order, value, last_id))
+            page = await collection.find(match_all(filters), {"_id": 0}).sort(proposal_sort(sort, order)).to_list(2)
+            seen += [row["id"] for row in page]
+            if len(page) < 2:
+                return seen
+            cursor = encode_cursor(sort, order, page[-1].get(sort), page[-1]["id"])
+
+    assert asyncio.run(run()) == _expected(order)
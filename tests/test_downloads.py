@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import parse_range
+from uploads import FilePart, UploadError, stream_file_field
+
+BOUNDARY = "test-boundary"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes= 5-5", (5, 5)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None, "", "items=0-9", "bytes=0-9,20-29", "bytes=-0", "bytes=a-b", "bytes=-", "bytes=5",
+])
+def test_parse_range_serves_whole_body(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=50-10"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(HTTPException) as error:
+        parse_range(header, 1000)
+    assert error.value.status_code == 416
+    assert error.value.headers == {"Content-Range": "bytes */1000"}
+
+
+def multipart(*parts) -> bytes:
+    body = b""
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename is not None else "")
+        body += (f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+                 f"Content-Type: text/csv\r\n\r\n").encode() + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+class FakeRequest:
+    def __init__(self, body: bytes, chunk_size: int = 7, content_type: str = f"multipart/form-data; boundary={BOUNDARY}"):
+        self.headers = {"content-type": content_type}
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+def collect(request, field="file"):
+    async def run():
+        return [item async for item in stream_file_field(request, field)]
+    return asyncio.run(run())
+
+
+def test_stream_file_field_across_chunks():
+    data = b"a,b\n" * 50
+    items = collect(FakeRequest(multipart(("note", None, b"skip me"), ("file", "rates.csv", data))))
+    assert items[0] == FilePart(filename="rates.csv", content_type="text/csv")
+    assert all(isinstance(item, bytes) for item in items[1:])
+    assert len(items) > 2
+    assert b"".join(items[1:]) == data
+
+
+def test_stream_file_field_first_file_only():
+    items = collect(FakeRequest(multipart(("file", "a.csv", b"first"), ("file", "b.csv", b"second")), 1000))
+    assert items == [FilePart(filename="a.csv", content_type="text/csv"), b"first"]
+
+
+def test_stream_file_field_empty_file():
+    items = collect(FakeRequest(multipart(("file", "empty.csv", b""))))
+    assert items[0].filename == "empty.csv"
+    assert b"".join(items[1:]) == b""
+
+
+@pytest.mark.parametrize("body", [
+    multipart(("other", "a.csv", b"data")),
+    multipart(("file", None, b"a plain form value")),
+])
+def test_stream_file_field_missing_field(body):
+    with pytest.raises(UploadError, match="No file in form field 'file'"):
+        collect(FakeRequest(body))
+
+
+def test_stream_file_field_not_multipart():
+    with pytest.raises(UploadError, match="multipart"):
+        collect(FakeRequest(b"{}", content_type="application/json"))
+
+
+def test_upload_size_limit(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    httpx = pytest.importorskip("httpx")
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "MAX_DOCUMENT_BYTES", 100)
+    monkeypatch.setattr(server, "notify_workers", lambda: None)
+
+    async def upload(data: bytes):
+        await db.properties.update_one({"id": "prop-1"}, {"$set": {"id": "prop-1"}}, upsert=True)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/properties/prop-1/documents", content=multipart(("file", "rates.csv", data)),
+                headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+            )
+
+    assert asyncio.run(upload(b"x" * 100)).json()["sizeBytes"] == 100
+    too_large = asyncio.run(upload(b"x" * 101))
+    assert too_large.status_code == 413
+    assert asyncio.run(db.documents.count_documents({})) == 1
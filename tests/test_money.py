@@ -0,0 +1,36 @@
+import pytest
+
+from money import format_compact, format_millions, parse_money
+
+
+@pytest.mark.parametrize("value, cents", [
+    ("$12.5M", 1_250_000_000),
+    ("$336K", 33_600_000),
+    ("$1,250", 125_000),
+    (" $2.1b ", 210_000_000_000),
+    ("$0.1", 10),
+    (1250, 125_000),
+    (12.34, 1_234),
+])
+def test_parse_money(value, cents):
+    assert parse_money(value) == cents
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "  ", "Not Covered", "$M",
+    "inf", "-inf", "nan", "1e400", "$1e300B", float("inf"), float("nan"), 1e300, 10 ** 400,
+])
+def test_parse_money_unparsed(value):
+    assert parse_money(value) is None
+
+
+def test_parse_money_int64_bounds():
+    assert parse_money((2 ** 63 - 1) // 100) == (2 ** 63 - 1) // 100 * 100
+    assert parse_money(2 ** 63 // 100 + 1) is None
+
+
+def test_format_round_trip():
+    assert format_millions(parse_money("$185.0M")) == "$185.0M"
+    assert format_millions(None) == "$0.0M"
+    assert format_compact(parse_money("$336K")) == "$336K"
+    assert format_compact(-parse_money("$1.2M")) == "-$1.2M"
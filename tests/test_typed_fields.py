@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from typed_fields import format_date, migrate_collection, parse_date, typed_values, with_typed_fields
+
+
+@pytest.mark.parametrize("value", ["10/26/2025", "2025-10-26", "2025-10-26T15:30:00+00:00", datetime(2025, 10, 26, 9)])
+def test_parse_date(value):
+    assert parse_date(value) == datetime(2025, 10, 26)
+
+
+@pytest.mark.parametrize("value", [None, "", "TBD", "13/45/2025", 20251026])
+def test_parse_date_unparsed(value):
+    assert parse_date(value) is None
+
+
+def test_format_date():
+    assert format_date(parse_date("2025-10-26")) == "10/26/2025"
+    assert format_date(None) == ""
+
+
+def test_typed_values_only_covers_given_fields():
+    assert typed_values("proposals", {"totalInsuredValue": "$185.0M", "title": "x"}) == {
+        "totalInsuredValueCents": 18_500_000_000
+    }
+
+
+def test_typed_values_arrays():
+    doc = {"coverages": [{"limit": "$10M", "deductible": "$25K"}, {"limit": "Not Covered"}, "legacy"]}
+    assert typed_values("whatif", doc) == {"coverages": [
+        {"limit": "$10M", "deductible": "$25K", "limitCents": 1_000_000_000, "deductibleCents": 2_500_000},
+        {"limit": "Not Covered", "limitCents": None},
+        "legacy",
+    ]}
+
+
+def test_with_typed_fields_keeps_display_values():
+    doc = with_typed_fields("proposals", {"effectiveDate": "10/26/2025"})
+    assert doc == {"effectiveDate": "10/26/2025", "effectiveOn": datetime(2025, 10, 26)}
+
+
+def test_migrate_collection_skips_documents_changed_mid_batch():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def run():
+        collection = mongomock_motor.AsyncMongoMockClient()["test"]["proposals"]
+        await collection.insert_many([
+            {"id": "a", "totalInsuredValue": "$1.0M", "effectiveDate": "10/26/2025"},
+            {"id": "b", "totalInsuredValue": "$2.0M"},
+            {"id": "c", "totalInsuredValue": "TBD"},
+            {"id": "d", "totalInsuredValueCents": 5, "totalInsuredValue": "$0.05"},
+        ])
+        # Another writer changes "b" after the migration read it
+        bulk_write = collection.bulk_write
+
+        async def racing_bulk_write(requests, ordered):
+            await collection.update_one({"id": "b"}, {"$set": {"totalInsuredValue": "$3.0M"}})
+            return await bulk_write(requests, ordered=ordered)
+
+        collection.bulk_write = racing_bulk_write
+        report = await migrate_collection(collection, "proposals", batch_size=10)
+        docs = {doc["id"]: doc async for doc in collection.find({}, {"_id": 0})}
+        collection.bulk_write = bulk_write
+        rerun = await migrate_collection(collection, "proposals", batch_size=10)
+        return report, docs, rerun, {doc["id"]: doc async for doc in collection.find({}, {"_id": 0})}
+
+    report, docs, rerun, final = asyncio.run(run())
+    assert report == {"converted": 2, "skipped": 1, "unparsed": 1, "integers": 0}
+    assert docs["a"]["totalInsuredValueCents"] == 100_000_000
+    assert docs["a"]["effectiveOn"] == datetime(2025, 10, 26)
+    assert docs["c"]["totalInsuredValueCents"] is None
+    assert "totalInsuredValueCents" not in docs["b"]
+    assert docs["d"]["totalInsuredValueCents"] == 5
+    assert rerun["converted"] == 1 and rerun["skipped"] == 0
+    assert final["b"]["totalInsuredValueCents"] == 300_000_000